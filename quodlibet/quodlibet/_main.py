@@ -180,7 +180,14 @@ def get_build_description():
     return version_string + note
 
 
-def init_plugins(no_plugins=False):
+def init_plugins(no_plugins=False, rescan=True):
+    """Creates the plugin manager and registers the plugin handlers of
+    the editing dialogs.
+
+    If `rescan` is False, the plugins don't get imported and enabled until
+    `PluginManager.rescan()` gets called.
+    """
+
     print_d("Starting plugin manager")
 
     from quodlibet import plugins
@@ -189,7 +196,8 @@ def init_plugins(no_plugins=False):
     folders.append(os.path.join(get_user_dir(), "plugins"))
     print_d("Scanning folders: %s" % folders)
     pm = plugins.init(folders, no_plugins)
-    pm.rescan()
+    if rescan:
+        pm.rescan()
 
     from quodlibet.qltk.edittags import EditTags
     from quodlibet.qltk.renamefiles import RenameFiles
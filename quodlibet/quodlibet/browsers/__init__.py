@@ -10,6 +10,7 @@
 from quodlibet import util
 from quodlibet.compat import listfilter
 from quodlibet.util.importhelper import load_dir_modules
+from quodlibet.util.dprint import print_d
 
 from ._base import Browser
 
@@ -17,6 +18,9 @@ from ._base import Browser
 browsers = []
 default = None
 
+# browser classes waiting for init(): library
+_pending = {}
+
 
 def init():
     """Import all browsers from this package and from the user directory.
@@ -60,6 +64,32 @@ def init():
         raise SystemExit("Default browser not found!")
 
 
+def setup(library, lazy=False):
+    """Calls `Browser.init()` for all browsers.
+
+    If `lazy` is True, the browsers which allow it (see `Browser.lazy_init`)
+    only get initialized once `prepare()` gets called for them.
+    """
+
+    for Kind in browsers:
+        if lazy and Kind.lazy_init:
+            _pending[Kind] = library
+        else:
+            Kind.init(library)
+
+
+def prepare(Kind):
+    """Initializes the browser class if `setup()` deferred it.
+
+    Needs to be called before creating an instance.
+    """
+
+    library = _pending.pop(Kind, None)
+    if library is not None:
+        print_d("Initializing %r" % Kind.__name__)
+        Kind.init(library)
+
+
 def name(browser):
     """Return the name of the browser"""
 
@@ -200,11 +200,17 @@ class Browser(Gtk.Box, Filter):
 
     @classmethod
     def init(klass, library):
-        """Called after library and MainWindow initialization, before the
-        GTK main loop starts.
+        """Called after library initialization, before the first instance
+        gets created. Unless `lazy_init` is False it might not be called
+        at startup, but only once the browser gets used.
         """
         pass
 
+    lazy_init = True
+    """Whether init() can wait until the browser gets used. Should be
+    False if other parts depend on state set up by init().
+    """
+
     def save(self):
         """Save the selected songlist. Browsers should save whatever
         they need to recreate the criteria for the current song list (not
@@ -12,7 +12,7 @@ from __future__ import absolute_import
 
 import os
 
-from gi.repository import Gtk, Pango, Gdk, GLib, Gio
+from gi.repository import Gtk, Pango, Gdk, GLib
 
 from quodlibet.util.i18n import numeric_phrase
 from .prefs import Preferences, DEFAULT_PATTERN_TEXT
@@ -38,11 +38,12 @@ from quodlibet.qltk.x import SymbolicIconImage
 from quodlibet.qltk.searchbar import SearchBarBox
 from quodlibet.qltk.menubutton import MenuButton
 from quodlibet.qltk import Icons
-from quodlibet.util import copool, connect_destroy
+from quodlibet.util import connect_destroy
 from quodlibet.util.library import background_filter
 from quodlibet.util import connect_obj, DeferredSignal, gdecode
-from quodlibet.qltk.cover import get_no_cover_pixbuf
-from quodlibet.qltk.image import add_border_widget, get_surface_for_pixbuf
+from quodlibet.util.thread import Cancellable, Priority
+from quodlibet.qltk.cover import get_no_cover_pixbuf, get_cover_surface
+from quodlibet.qltk.image import get_surface_for_pixbuf
 from quodlibet.compat import cmp
 
 
@@ -246,7 +247,7 @@ class VisibleUpdate(object):
         connect_destroy(
             sw.get_vadjustment(), "value-changed", self.__stop_update, view)
 
-        self.__pending_paths = []
+        self.__cancel = Cancellable()
         self.__update_deferred = DeferredSignal(
             self.__update_visible_rows, timeout=50, priority=GLib.PRIORITY_LOW)
         self.__column = column
@@ -257,27 +258,30 @@ class VisibleUpdate(object):
             self.__update_deferred.abort
             self.__update_deferred = None
 
-        if self.__pending_paths:
-            copool.remove(self.__scan_paths)
-
+        self.__cancel.cancel()
         self.__column = None
-        self.__pending_paths = []
 
     def _row_needs_update(self, model, iter_):
         """Should return True if the rows should be updated"""
 
         raise NotImplementedError
 
-    def _update_row(self, model, iter_):
-        """Do whatever is needed to update the row."""
+    def _update_row(self, model, iter_, cancel, priority):
+        """Do whatever is needed to update the row.
+
+        Work in the background should stop once `cancel` is cancelled.
+        `priority` is Priority.HIGH for visible rows and
+        Priority.BACKGROUND for rows around them.
+        """
 
         raise NotImplementedError
 
     def __stop_update(self, adj, view):
-        if self.__pending_paths:
-            copool.remove(self.__scan_paths)
-            self.__pending_paths = []
-            self.__update_visibility(view)
+        # rows which got scrolled away don't need updates anymore,
+        # the ones still in range get requested again
+        self.__cancel.cancel()
+        self.__cancel = Cancellable()
+        self.__update_visibility(view)
 
     def __update_visibility(self, view, *args):
         if not self.__column.get_visible():
@@ -287,21 +291,9 @@ class VisibleUpdate(object):
         if self.__first_expose:
             self.__first_expose = False
             self.__update_visible_rows(view, 0)
-            for i in self.__scan_paths():
-                pass
 
         self.__update_deferred(view, self.PRELOAD_COUNT)
 
-    def __scan_paths(self):
-        while self.__pending_paths:
-            model, path = self.__pending_paths.pop()
-            try:
-                iter_ = model.get_iter(path)
-            except ValueError:
-                continue
-            self._update_row(model, iter_)
-            yield True
-
     def __update_visible_rows(self, view, preload):
         vrange = view.get_visible_range()
         if vrange is None:
@@ -317,8 +309,10 @@ class VisibleUpdate(object):
         if not start or not end:
             return
 
-        start = start.get_indices()[0] - preload - 1
-        end = end.get_indices()[0] + preload
+        first_visible = start.get_indices()[0]
+        last_visible = end.get_indices()[0]
+        start = first_visible - preload - 1
+        end = last_visible + preload
 
         vlist = list(range(end, start, -1))
         top = vlist[:len(vlist) // 2]
@@ -333,20 +327,18 @@ class VisibleUpdate(object):
                 vlist_new.append(bottom.pop())
         vlist_new = filter(lambda s: s >= 0, vlist_new)
 
-        vlist_new = map(Gtk.TreePath, vlist_new)
-
-        visible_paths = []
-        for path in vlist_new:
+        cancel = self.__cancel
+        for index in vlist_new:
             try:
-                iter_ = model.get_iter(path)
+                iter_ = model.get_iter(Gtk.TreePath(index))
             except ValueError:
                 continue
             if self._row_needs_update(model, iter_):
-                visible_paths.append((model, path))
-
-        if not self.__pending_paths and visible_paths:
-            copool.add(self.__scan_paths)
-        self.__pending_paths = visible_paths
+                if first_visible <= index <= last_visible:
+                    priority = Priority.HIGH
+                else:
+                    priority = Priority.BACKGROUND
+                self._update_row(model, iter_, cancel, priority)
 
 
 class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
@@ -417,8 +409,6 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
         if self.__model is None:
             self._init_model(library)
 
-        self._cover_cancel = Gio.Cancellable()
-
         sw = ScrolledWindow()
         sw.set_shadow_type(Gtk.ShadowType.IN)
         self.view = view = AllTreeView()
@@ -444,11 +434,10 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
             if item.album is None:
                 surface = None
             elif item.cover:
-                pixbuf = item.cover
-                pixbuf = add_border_widget(pixbuf, self.view)
-                surface = get_surface_for_pixbuf(self, pixbuf)
-                # don't cache, too much state has an effect on the result
-                self.__last_render_surface = None
+                cover = item.cover
+                size = (cover.get_width(), cover.get_height())
+                surface = get_cover_surface(
+                    self.view, item.album.key, "album", size, lambda: cover)
             else:
                 surface = no_cover
 
@@ -537,7 +526,7 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
         for iter_, item in model.iterrows():
             album = item.album
             if album is not None and songs & album.songs:
-                item.scanned = False
+                item.reset_cover()
                 model.row_changed(model.get_path(iter_), iter_)
 
     def __key_pressed(self, widget, event, librarian):
@@ -559,7 +548,7 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
         item = model.get_value(iter_)
         return item.album is not None and not item.scanned
 
-    def _update_row(self, filter_model, iter_):
+    def _update_row(self, filter_model, iter_, cancel, priority):
         sort_model = filter_model.get_model()
         model = sort_model.get_model()
         iter_ = filter_model.convert_iter_to_child_iter(iter_)
@@ -575,10 +564,10 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
         scale_factor = self.get_scale_factor()
         item.scan_cover(scale_factor=scale_factor,
                         callback=callback,
-                        cancel=self._cover_cancel)
+                        cancel=cancel,
+                        priority=priority)
 
     def __destroy(self, browser):
-        self._cover_cancel.cancel()
         self.disable_row_update()
 
         self.view.set_model(None)
@@ -662,7 +651,9 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
     def __refresh_album(self, menuitem, view):
         items = self.__get_selected_items()
         for item in items:
-            item.scanned = False
+            item.reset_cover()
+        app.cover_manager.surfaces.invalidate(
+            {item.album.key for item in items if item.album is not None})
         model = self.view.get_model()
         for iter_, item in model.iterrows():
             if item in items:
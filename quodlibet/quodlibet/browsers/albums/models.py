@@ -9,6 +9,7 @@ from quodlibet import app
 from quodlibet import config
 from quodlibet.qltk.models import ObjectStore, ObjectModelFilter
 from quodlibet.qltk.models import ObjectModelSort
+from quodlibet.util.thread import Priority
 from quodlibet.compat import itervalues
 
 
@@ -16,6 +17,8 @@ class AlbumItem(object):
 
     cover = None
     scanned = False
+    _loading = None
+    _generation = 0
 
     def __init__(self, album):
         self.album = album
@@ -27,20 +30,43 @@ class AlbumItem(object):
             size = 48
         return size
 
+    def reset_cover(self):
+        """Makes the next scan_cover() load the cover again, also if a
+        load is still in progress.
+        """
+
+        self.scanned = False
+        self._loading = None
+        self._generation += 1
+
     def scan_cover(self, force=False, scale_factor=1,
-            callback=None, cancel=None):
+            callback=None, cancel=None, priority=Priority.HIGH):
         if (self.scanned and not force) or not self.album or \
                 not self.album.songs:
             return
-        self.scanned = True
+        if not force and self._loading is not None and \
+                not self._loading.is_cancelled():
+            return
+        self._loading = cancel
+        generation = self._generation
 
         def set_cover_cb(pixbuf):
+            if generation != self._generation:
+                # reset in the meantime, this might be the old cover
+                return
+            if self.cover is not None:
+                # the old cover might have been drawn in the meantime
+                app.cover_manager.surfaces.invalidate([self.album.key])
+            self._loading = None
+            self.scanned = True
             self.cover = pixbuf
             callback()
 
         s = self.COVER_SIZE * scale_factor
-        app.cover_manager.get_pixbuf_many_async(
-            self.album.songs, s, s, cancel, set_cover_cb)
+        # a reset cover shouldn't share the load of the old one
+        app.cover_manager.loader.load(
+            (self.album.key, generation), self.album.songs, s, s, cancel,
+            set_cover_cb, priority)
 
     def __repr__(self):
         return repr(self.album)
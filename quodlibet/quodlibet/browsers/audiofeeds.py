@@ -267,6 +267,8 @@ class AudioFeeds(Browser):
     keys = ["AudioFeeds"]
     priority = 20
     uses_main_library = False
+    # init() schedules the periodic feed check
+    lazy_init = False
 
     def pack(self, songpane):
         container = qltk.ConfigRHPaned("browsers", "audiofeeds_pos", 0.4)
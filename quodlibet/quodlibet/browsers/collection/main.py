@@ -22,7 +22,7 @@ from quodlibet.qltk.searchbar import SearchBarBox
 from quodlibet.qltk.songsmenu import SongsMenu
 from quodlibet.qltk.views import AllTreeView
 from quodlibet.qltk import Icons
-from quodlibet.qltk.image import add_border_widget, get_surface_for_pixbuf
+from quodlibet.qltk.cover import get_cover_surface
 from quodlibet.qltk.x import ScrolledWindow, Align, SymbolicIconImage
 from quodlibet.util import connect_obj
 from quodlibet.util.library import background_filter
@@ -197,8 +197,9 @@ class CollectionBrowser(Browser, util.InstanceTracker):
                 item = model.get_value(iter_)
                 cover = get_scaled_cover(item)
                 if cover:
-                    cover = add_border_widget(cover, view)
-                    surface = get_surface_for_pixbuf(self, cover)
+                    size = (cover.get_width(), cover.get_height())
+                    surface = get_cover_surface(
+                        view, album.key, "album", size, lambda: cover)
                     cell.set_property("surface", surface)
                 else:
                     cell.set_property('icon-name', Icons.MEDIA_OPTICAL)
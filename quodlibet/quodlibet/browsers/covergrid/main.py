@@ -12,7 +12,7 @@ from __future__ import absolute_import
 
 import os
 
-from gi.repository import Gtk, Pango, Gdk, Gio
+from gi.repository import Gtk, Pango, Gdk
 
 from .prefs import Preferences, DEFAULT_PATTERN_TEXT
 from quodlibet.browsers.albums.models import (AlbumModel,
@@ -41,8 +41,8 @@ from quodlibet.qltk import Icons
 from quodlibet.util import connect_destroy
 from quodlibet.util.library import background_filter
 from quodlibet.util import connect_obj
-from quodlibet.qltk.cover import get_no_cover_pixbuf
-from quodlibet.qltk.image import add_border_widget, get_surface_for_pixbuf
+from quodlibet.qltk.cover import get_no_cover_pixbuf, get_cover_surface
+from quodlibet.qltk.image import get_surface_for_pixbuf
 from quodlibet.qltk import popup_menu_at_widget
 
 
@@ -178,7 +178,7 @@ class CoverGrid(Browser, util.InstanceTracker, VisibleUpdate,
         for iter_, item in model.iterrows():
             album = item.album
             if album is not None:
-                item.scanned = False
+                item.reset_cover()
                 model.row_changed(model.get_path(iter_), iter_)
 
     @classmethod
@@ -216,8 +216,6 @@ class CoverGrid(Browser, util.InstanceTracker, VisibleUpdate,
         if self.__model is None:
             self._init_model(library)
 
-        self._cover_cancel = Gio.Cancellable()
-
         self.scrollwin = sw = ScrolledWindow()
         sw.set_shadow_type(Gtk.ShadowType.IN)
         model_sort = AlbumSortModel(model=self.__model)
@@ -251,11 +249,10 @@ class CoverGrid(Browser, util.InstanceTracker, VisibleUpdate,
             if item.album is None:
                 surface = None
             elif item.cover:
-                pixbuf = item.cover
-                pixbuf = add_border_widget(pixbuf, self.view)
-                surface = get_surface_for_pixbuf(self, pixbuf)
-                # don't cache, too much state has an effect on the result
-                self.__last_render_surface = None
+                cover = item.cover
+                size = (cover.get_width(), cover.get_height())
+                surface = get_cover_surface(
+                    self.view, item.album.key, "album", size, lambda: cover)
             else:
                 surface = no_cover
 
@@ -344,7 +341,7 @@ class CoverGrid(Browser, util.InstanceTracker, VisibleUpdate,
         for iter_, item in model.iterrows():
             album = item.album
             if album is not None and songs & album.songs:
-                item.scanned = False
+                item.reset_cover()
                 model.row_changed(model.get_path(iter_), iter_)
 
     def __key_pressed(self, widget, event, librarian):
@@ -366,7 +363,7 @@ class CoverGrid(Browser, util.InstanceTracker, VisibleUpdate,
         item = model.get_value(iter_)
         return item.album is not None and not item.scanned
 
-    def _update_row(self, filter_model, iter_):
+    def _update_row(self, filter_model, iter_, cancel, priority):
         sort_model = filter_model.get_model()
         model = sort_model.get_model()
         iter_ = filter_model.convert_iter_to_child_iter(iter_)
@@ -385,10 +382,10 @@ class CoverGrid(Browser, util.InstanceTracker, VisibleUpdate,
         scale_factor = self.get_scale_factor() * mag
         item.scan_cover(scale_factor=scale_factor,
                         callback=callback,
-                        cancel=self._cover_cancel)
+                        cancel=cancel,
+                        priority=priority)
 
     def __destroy(self, browser):
-        self._cover_cancel.cancel()
         self.disable_row_update()
 
         self.view.set_model(None)
@@ -500,7 +497,9 @@ class CoverGrid(Browser, util.InstanceTracker, VisibleUpdate,
     def __refresh_album(self, menuitem, view):
         items = self.__get_selected_items()
         for item in items:
-            item.scanned = False
+            item.reset_cover()
+        app.cover_manager.surfaces.invalidate(
+            {item.album.key for item in items if item.album is not None})
         model = self.view.get_model()
         for iter_, item in model.iterrows():
             if item in items:
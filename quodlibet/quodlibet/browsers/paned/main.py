@@ -42,6 +42,9 @@ class PanedBrowser(Browser, util.InstanceTracker):
     keys = ["Paned", "PanedBrowser"]
     priority = 3
 
+    PENDING_INTERVAL = 100
+    """Time in ms between checks if library changes can be applied"""
+
     def pack(self, songpane):
         container = Gtk.HBox()
         self.show()
@@ -94,9 +97,11 @@ class PanedBrowser(Browser, util.InstanceTracker):
         prefs = PreferencesButton(self)
         sbb.pack_start(prefs, False, True, 0)
 
-        connect_destroy(library, 'changed', self.__changed)
-        connect_destroy(library, 'added', self.__added)
-        connect_destroy(library, 'removed', self.__removed)
+        self.__pending_changes = []
+        self.__pending_id = None
+        connect_destroy(library, 'changed', self.__deferred, self.__changed)
+        connect_destroy(library, 'added', self.__deferred, self.__added)
+        connect_destroy(library, 'removed', self.__deferred, self.__removed)
 
         self.connect('destroy', self.__destroy)
 
@@ -112,6 +117,9 @@ class PanedBrowser(Browser, util.InstanceTracker):
             child.show_all()
 
     def __destroy(self, *args):
+        if self.__pending_id is not None:
+            GLib.source_remove(self.__pending_id)
+            self.__pending_id = None
         del self._sb_box
 
     def set_wide_mode(self, do_wide):
@@ -151,6 +159,29 @@ class PanedBrowser(Browser, util.InstanceTracker):
         self._panes[-1].uninhibit()
         self._panes[-1].get_selection().emit('changed')
 
+    def __deferred(self, library, songs, handler):
+        # While panes get filled in the background their content gets
+        # replaced later on, so changes have to wait until then.
+        if self.__pending_id is None and \
+                not any(p.filling for p in self._panes):
+            handler(library, songs)
+            return
+
+        self.__pending_changes.append((handler, library, list(songs)))
+        if self.__pending_id is None:
+            self.__pending_id = GLib.timeout_add(
+                self.PENDING_INTERVAL, self.__apply_pending)
+
+    def __apply_pending(self):
+        if any(p.filling for p in self._panes):
+            return True
+
+        self.__pending_id = None
+        changes, self.__pending_changes = self.__pending_changes, []
+        for handler, library, songs in changes:
+            handler(library, songs)
+        return False
+
     def __added(self, library, songs):
         songs = filter(self._filter, songs)
         for pane in self._panes:
@@ -186,10 +217,13 @@ class PanedBrowser(Browser, util.InstanceTracker):
         query = Query(self._get_text(), star.keys())
         if query.is_parsable:
             self._filter = query.search
-            songs = filter(self._filter, self._library)
+            songs = filter(self._filter, list(self._library))
             bg = background_filter()
             if bg:
                 songs = filter(bg, songs)
+            # for large libraries let the first pane filter in a thread
+            if len(self._library) < Pane.ASYNC_FILL:
+                songs = list(songs)
             self._panes[0].fill(songs)
 
     def scroll(self, song):
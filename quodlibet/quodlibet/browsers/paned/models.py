@@ -5,8 +5,11 @@
 # it under the terms of the GNU General Public License version 2 as
 # published by the Free Software Foundation
 
+import bisect
 import re
 
+from gi.repository import Gtk
+
 from quodlibet import _
 from quodlibet import util
 from quodlibet.qltk.models import ObjectStore
@@ -119,15 +122,20 @@ class PaneModel(ObjectStore):
         super(PaneModel, self).__init__()
         self.__sort_cache = {} # text to sort text cache
         self.__key_cache = {} # song to key cache
+        self.__entries = {} # key to SongsEntry, without unknown
+        self.__sorted = [] # (sort, key) of the entries in row order
+        self.__emptied = set() # keys of empty entries which were kept
         self.config = pattern_config
 
+    def __format_keys(self, song):
+        # We filter out empty values, so Unknown can be ""
+        return listfilter(lambda v: v[0], self.config.format(song))
+
     def get_format_keys(self, song):
         try:
             return self.__key_cache[song]
         except KeyError:
-            # We filter out empty values, so Unknown can be ""
-            self.__key_cache[song] = listfilter(
-                lambda v: v[0], self.config.format(song))
+            self.__key_cache[song] = self.__format_keys(song)
             return self.__key_cache[song]
 
     def __human_sort_key(self, text, reg=re.compile('<.*?>')):
@@ -142,6 +150,27 @@ class PaneModel(ObjectStore):
             self.__sort_cache[text] = util.human_sort_key(text_stripped)
             return self.__sort_cache[text], text
 
+    def __offset(self):
+        """Row index of the first SongsEntry"""
+
+        first = self.get_iter_first()
+        if first is not None and isinstance(self.get_value(first), AllEntry):
+            return 1
+        return 0
+
+    def __unknown_iter(self):
+        if not len(self):
+            return
+        iter_ = self.get_iter((len(self) - 1,))
+        if isinstance(self.get_value(iter_), UnknownEntry):
+            return iter_
+
+    def clear(self):
+        self.__entries.clear()
+        del self.__sorted[:]
+        self.__emptied.clear()
+        super(PaneModel, self).clear()
+
     def get_songs(self, paths):
         """Get all songs for the given paths (from a selection e.g.)"""
 
@@ -169,32 +198,61 @@ class PaneModel(ObjectStore):
         """
 
         songs = set(songs)
+        entries = self.__entries
 
+        # the cached keys are the ones the songs got added with
+        affected = {}
+        unknown = False
         for song in songs:
-            if song in self.__key_cache:
-                del self.__key_cache[song]
-
-        to_remove = []
-        for iter_, entry in self.iterrows():
-            if isinstance(entry, AllEntry):
+            keys = self.__key_cache.pop(song, None)
+            if keys is None:
                 continue
+            if not keys:
+                unknown = True
+            for key, sort in keys:
+                entry = entries.get(key)
+                if entry is not None:
+                    affected[key] = entry
+
+        offset = self.__offset()
+        sorted_ = self.__sorted
+        for key, entry in iteritems(affected):
+            entry.songs -= songs
+            entry.finalize()
+            index = bisect.bisect_left(sorted_, (entry.sort, key))
+            self.path_changed(Gtk.TreePath((offset + index,)))
+
+        unknown_iter = self.__unknown_iter()
+        if unknown and unknown_iter is not None:
+            entry = self.get_value(unknown_iter)
             entry.songs -= songs
             entry.finalize()
-            self.row_changed(self.get_path(iter_), iter_)
-            if not entry.songs:
-                to_remove.append(iter_)
+            self.iter_changed(unknown_iter)
 
         if not remove_if_empty:
+            self.__emptied.update(
+                k for k, e in iteritems(affected) if not e.songs)
             return
 
+        affected.update((k, entries[k]) for k in self.__emptied
+                        if k in entries)
+        self.__emptied.clear()
+        to_remove = [e for e in affected.values() if not e.songs]
+
         # remove from cache and the model
-        for iter_ in to_remove:
-            try:
-                key = self.get_value(iter_).key
-                del(self.__sort_cache[key])
-            except KeyError:
-                pass
-            self.remove(iter_)
+        for entry in to_remove:
+            key = entry.key
+            self.__sort_cache.pop(key, None)
+            del entries[key]
+            index = bisect.bisect_left(sorted_, (entry.sort, key))
+            del sorted_[index]
+            self.remove(self.get_iter((offset + index,)))
+
+        unknown_iter = self.__unknown_iter()
+        if unknown_iter is not None and \
+                not self.get_value(unknown_iter).songs:
+            to_remove.append(self.get_value(unknown_iter))
+            self.remove(unknown_iter)
 
         if len(self) == 1 and isinstance(self[0][0], AllEntry):
             # only All is left.. clear everything
@@ -206,11 +264,31 @@ class PaneModel(ObjectStore):
     def add_songs(self, songs):
         """Add new songs to the list, creating new rows"""
 
+        self.add_grouped(self.group_songs(songs))
+
+    def group_songs(self, songs, cancellable=None):
+        """The expensive part of add_songs(). Doesn't change the model, so
+        it can be called from a thread as long as `songs` doesn't change
+        in the meantime.
+
+        Returns a value to pass to add_grouped() or None if `cancellable`
+        got cancelled.
+        """
+
+        cached = self.__key_cache.get
+        format_keys = self.__format_keys
+        song_keys = {}
         collection = {}
         unknown = UnknownEntry()
         human_sort = self.__human_sort_key
-        for song in songs:
-            items = self.get_format_keys(song)
+        for i, song in enumerate(songs):
+            if cancellable is not None and not i % 1000 and \
+                    cancellable.is_cancelled():
+                return
+            items = cached(song)
+            if items is None:
+                items = format_keys(song)
+            song_keys[song] = items
             if not items:
                 unknown.songs.add(song)
             for key, sort in items:
@@ -226,58 +304,47 @@ class PaneModel(ObjectStore):
                     collection[key] = (entry, hsort, bool(sort))
                     entry.songs.add(song)
 
-        items = sorted(iteritems(collection),
-                       key=lambda s: s[1][1],
-                       reverse=True)
+        return song_keys, collection, unknown
+
+    def add_grouped(self, grouped):
+        """Add songs grouped by group_songs()"""
+
+        song_keys, collection, unknown = grouped
+        # keep the keys the songs get added with, see remove_songs()
+        self.__key_cache.update(song_keys)
+        entries = self.__entries
+        sorted_ = self.__sorted
 
         # fast path
         if not len(self):
+            items = sorted(
+                (e.sort, k) for k, (e, s, p) in iteritems(collection))
+            if len(items) + bool(unknown.songs) > 1:
+                self.append(row=[AllEntry()])
+            if items:
+                self.append_many([collection[k][0] for s, k in items])
             if unknown.songs:
-                self.insert(0, [unknown])
-            entries = []
-            for key, (val, sort_key, srtp) in items:
-                entries.append(val)
-            self.insert_many(0, reversed(entries))
-            if len(self) > 1:
-                self.insert(0, [AllEntry()])
+                self.append(row=[unknown])
+            for key, (entry, sort_key, srtp) in iteritems(collection):
+                entries[key] = entry
+            sorted_.extend(items)
             return
 
-        # insert all new songs
-        key = None
-        val = None
-        sort_key = None
-
-        for iter_, entry in self.iterrows():
-            if not isinstance(entry, SongsEntry):
-                continue
-
-            if key is None:
-                if not items:
-                    break
-                key, (val, sort_key, srtp) = items.pop(-1)
-
-            if key == entry.key: # Display strings the same
+        # merge into existing entries or insert at their sort position
+        offset = self.__offset()
+        for key, (val, sort_key, srtp) in iteritems(collection):
+            entry = entries.get(key)
+            if entry is not None:
+                index = bisect.bisect_left(sorted_, (entry.sort, key))
                 entry.songs |= val.songs
                 entry.finalize()
-                self.row_changed(self.get_path(iter_), iter_)
-                key = None
-            elif sort_key < entry.sort:
-                self.insert_before(iter_, row=[val])
-                key = None
-
-        # the last one failed, add it again
-        if key:
-            items.append((key, (val, sort_key, srtp)))
-
-        # insert the left over songs
-        if items:
-            entries = []
-            for key, (val, srt, srtp) in items:
-                entries.append(val)
-            if isinstance(self[-1][0], UnknownEntry):
-                self.insert_many(len(self) - 1, entries)
+                self.path_changed(Gtk.TreePath((offset + index,)))
             else:
-                self.append_many(entries)
+                item = (sort_key, key)
+                index = bisect.bisect_right(sorted_, item)
+                sorted_.insert(index, item)
+                entries[key] = val
+                self.insert(offset + index, [val])
 
         # check if All needs to be inserted
         if len(self) > 1 and not isinstance(self[0][0], AllEntry):
@@ -285,14 +352,16 @@ class PaneModel(ObjectStore):
 
         # check if Unknown needs to be inserted or updated
         if unknown.songs:
-            last_row = self[-1]
-            entry = last_row[0]
-            if isinstance(entry, UnknownEntry):
+            unknown_iter = self.__unknown_iter()
+            if unknown_iter is not None:
+                entry = self.get_value(unknown_iter)
                 entry.songs |= unknown.songs
                 entry.finalize()
-                self.row_changed(last_row.path, last_row.iter)
+                self.iter_changed(unknown_iter)
             else:
                 self.append(row=[unknown])
+                if len(self) == 2:
+                    self.insert(0, [AllEntry()])
 
     def matches(self, paths, song):
         """If the song is included in the selection defined by the paths.
@@ -313,11 +382,10 @@ class PaneModel(ObjectStore):
         if not keys and isinstance(self[paths[-1]][0], UnknownEntry):
             return True
 
-        for path in paths:
-            entry = self.get_value(self.get_iter(path))
-            for key in keys:
-                if entry.key == (key[0] if isinstance(key, tuple) else key):
-                    return True
+        selected = self.get_keys(paths)
+        for key in keys:
+            if (key[0] if isinstance(key, tuple) else key) in selected:
+                return True
 
         return False
 
@@ -13,19 +13,33 @@ from quodlibet import qltk
 from quodlibet.qltk.views import AllTreeView, TreeViewColumnButton
 from quodlibet.qltk.songsmenu import SongsMenu
 from quodlibet.qltk import is_accel
-from quodlibet.util import connect_obj, gdecode
+from quodlibet.util import connect_obj, gdecode, print_exc
+from quodlibet.util.thread import call_async, Cancellable
 from quodlibet.compat import text_type
 
 from .models import PaneModel
 from .util import PaneConfig
 
 
+def _group_songs(model, songs, cancellable):
+    # call_async() drops the callback if this raises, which would leave
+    # the pane filling forever
+    try:
+        return model.group_songs(songs, cancellable)
+    except Exception:
+        print_exc()
+
+
 class Pane(AllTreeView):
     """Pane of the paned browser"""
 
     TARGET_INFO_QL = 1
     TARGET_INFO_URI_LIST = 2
 
+    ASYNC_FILL = 2000
+    """Fill with at least this many songs (or an iterable without a
+    length) and the songs get grouped in a thread"""
+
     def __init__(self, library, prefs, next_=None):
         super(Pane, self).__init__()
         self.set_fixed_height_mode(True)
@@ -35,6 +49,7 @@ class Pane(AllTreeView):
         self.__restore_values = None
 
         self.__no_fill = 0
+        self.__fill_cancellable = None
 
         column = TreeViewColumnButton(title=self.config.title)
 
@@ -158,6 +173,7 @@ class Pane(AllTreeView):
         return self.config.tags
 
     def __destroy(self, *args):
+        self.__cancel_fill()
         # needed for gc
         self.__next = None
 
@@ -212,7 +228,46 @@ class Pane(AllTreeView):
         self.handler_unblock(self.__sig)
         self.__no_fill -= 1
 
+    @property
+    def filling(self):
+        """If a fill() is still in progress"""
+
+        return self.__fill_cancellable is not None
+
+    def __cancel_fill(self):
+        if self.__fill_cancellable is not None:
+            self.__fill_cancellable.cancel()
+            self.__fill_cancellable = None
+
     def fill(self, songs):
+        """Replace all entries by ones for `songs`.
+
+        Large fills happen in the background. Only the last of multiple
+        fills in a row replaces the content, and `songs` must not change
+        until it does.
+        """
+
+        self.__cancel_fill()
+        model = self.get_model()
+
+        try:
+            count = len(songs)
+        except TypeError:
+            count = None
+        if count is not None and count < self.ASYNC_FILL:
+            self.__filled(model.group_songs(songs))
+            return
+
+        cancellable = self.__fill_cancellable = Cancellable()
+        call_async(_group_songs, cancellable, self.__filled,
+                   args=(model, songs, cancellable))
+
+    def __filled(self, grouped):
+        self.__fill_cancellable = None
+        if grouped is None:
+            # grouping failed, keep the old entries
+            return
+
         # Restore the selection
         if self.__restore_values is not None:
             selected = self.__restore_values
@@ -228,7 +283,7 @@ class Pane(AllTreeView):
         self.inhibit()
         with self.without_model():
             model.clear()
-            model.add_songs(songs)
+            model.add_grouped(grouped)
 
         self.set_selected(selected, jump=True)
         self.uninhibit()
@@ -33,7 +33,7 @@ from quodlibet.qltk import Icons
 from quodlibet.qltk.chooser import choose_files, create_chooser_filter
 from quodlibet.util import connect_obj
 from quodlibet.util.dprint import print_d, print_w
-from quodlibet.util.collection import FileBackedPlaylist
+from quodlibet.util.collection import FileBackedPlaylist, Playlist
 from quodlibet.util.urllib import urlopen
 
 from .util import parse_m3u, parse_pls, PLAYLISTS,\
@@ -69,6 +69,10 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
         container.remove(self._rh_box)
         container.remove(self)
 
+    # the song menus list the playlists and they have to follow
+    # library changes
+    lazy_init = False
+
     @classmethod
     def init(klass, library):
         klass.library = library
@@ -91,6 +95,7 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
 
     @classmethod
     def deinit(cls, library):
+        Playlist.write_pending()
         model = cls.__lists.get_model()
         model.clear()
 
@@ -110,32 +115,43 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
                 if refresh:
                     print_d("Refreshing playlist %s..." % row[0])
                     klass.__lists.row_changed(row.path, row.iter)
-                playlist.write()
+                playlist.write_later()
                 break
         else:
             model.get_model().append(row=[playlist])
-            playlist.write()
+            playlist.write_later()
+
+    @classmethod
+    def __featuring(klass, items):
+        """The playlists containing any of the songs or (masked) filenames
+        in `items`
+        """
+
+        featuring = set()
+        for item in items:
+            featuring.update(Playlist.playlists_featuring(item))
+        if not featuring:
+            return []
+        return [p for p in klass.playlists() if p in featuring]
 
     @classmethod
     def __removed(klass, library, songs):
-        for playlist in klass.playlists():
+        for playlist in klass.__featuring(songs):
             if playlist.remove_songs(songs):
                 klass.changed(playlist)
 
     @classmethod
     def __added(klass, library, songs):
         filenames = {song("~filename") for song in songs}
-        for playlist in klass.playlists():
+        for playlist in klass.__featuring(filenames):
             if playlist.add_songs(filenames, library):
                 klass.changed(playlist)
 
     @classmethod
     def __changed(klass, library, songs):
-        for playlist in klass.playlists():
-            for song in songs:
-                if song in playlist.songs:
-                    klass.changed(playlist)
-                    break
+        for playlist in klass.__featuring(songs):
+            playlist.songs_changed(songs)
+            klass.changed(playlist)
 
     def cell_data(self, col, cell, model, iter, data):
         playlist = model[iter][0]
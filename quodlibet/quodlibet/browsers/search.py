@@ -100,7 +100,9 @@ class SearchBar(Browser):
 
     def _get_songs(self):
         self._query = self._sb_box.query
-        return self._query.filter(self._library) if self._query else None
+        if not self._query:
+            return None
+        return self._library.filter_query(self._query)
 
     def activate(self):
         songs = self._get_songs()
@@ -112,6 +112,8 @@ def process_arguments(argv):
         ("print-queue", _("Print the contents of the queue")),
         ("print-query-text", _("Print the active text query")),
         ("no-plugins", _("Start without plugins")),
+        ("print-startup-times",
+            _("Print how long the startup phases and plugin imports took")),
         ("run", _("Start Quod Libet if it isn't running")),
         ("quit", _("Exit Quod Libet")),
             ]:
@@ -251,6 +253,8 @@ def process_arguments(argv):
             actions.append(command)
         elif command == "no-plugins":
             actions.append(command)
+        elif command == "print-startup-times":
+            actions.append(command)
         elif command == "run":
             actions.append(command)
 
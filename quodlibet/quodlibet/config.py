@@ -52,6 +52,8 @@ INITIAL = {
     "library": {
         "exclude": "",
         "refresh_on_start": "true",
+        # watch the scan directories for changes while running
+        "watch": "false",
     },
 
     # State about the player, to restore on startup
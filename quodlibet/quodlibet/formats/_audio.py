@@ -151,13 +151,27 @@ class AudioFile(dict, ImageContainer):
     def sort_key(self):
         return [self.album_key, self.__song_key()]
 
+    @util.cached_property
+    def _sort_cache(self):
+        # tag -> sort key, see sort_by_func()
+        return {}
+
     @staticmethod
     def sort_by_func(tag):
         """Returns a fast sort function for a specific tag (or pattern).
-        Some keys are already in the sort cache, so we can use them."""
+        Some keys are already in the sort cache, so we can use them.
+        Others get cached until the song changes."""
         def artist_sort(song):
             return song.sort_key[1][2]
 
+        def cached_sort(song):
+            cache = song._sort_cache
+            try:
+                return cache[tag]
+            except KeyError:
+                key = cache[tag] = human(song(tag))
+                return key
+
         if callable(tag):
             return lambda song: human(tag(song))
         elif tag == "artistsort":
@@ -166,7 +180,7 @@ class AudioFile(dict, ImageContainer):
             return lambda song: fsn2text(song(tag))
         elif tag.startswith("~#") and "~" not in tag[2:]:
             return lambda song: song(tag)
-        return lambda song: human(song(tag))
+        return cached_sort
 
     def __getstate__(self):
         """Don't pickle anything from __dict__"""
@@ -212,6 +226,7 @@ class AudioFile(dict, ImageContainer):
         pop = self.__dict__.pop
         pop("album_key", None)
         pop("sort_key", None)
+        pop("_sort_cache", None)
 
     def __delitem__(self, key):
         dict.__delitem__(self, key)
@@ -219,6 +234,7 @@ class AudioFile(dict, ImageContainer):
         pop = self.__dict__.pop
         pop("album_key", None)
         pop("sort_key", None)
+        pop("_sort_cache", None)
 
     @property
     def key(self):
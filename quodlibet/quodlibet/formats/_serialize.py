@@ -20,9 +20,19 @@ class SerializationError(Exception):
     pass
 
 
+_SHARE_MAX_LENGTH = 200
+"""Values up to this length get deduplicated on load"""
+
+
 def _py2_to_py3(items):
     assert PY3
 
+    # Equal keys and (short) values share one object after loading,
+    # tag names and things like artist/album/genre repeat a lot.
+    shared = {}
+    share = shared.setdefault
+    max_length = _SHARE_MAX_LENGTH
+
     for i in items:
         try:
             l = list(i.items())
@@ -56,6 +66,9 @@ def _py2_to_py3(items):
                 except UnicodeEncodeError:
                     v = v.encode("utf-8", "replace").decode("utf-8")
 
+            k = share(k, k)
+            if isinstance(v, text_type) and len(v) <= max_length:
+                v = share(v, v)
             i[k] = v
 
     return items
@@ -127,6 +140,31 @@ def _py2_to_py2(items):
     return items
 
 
+def _py2_share_strings(items):
+    """Makes equal keys and (short) values share one object, like
+    _py2_to_py3() does on Python 3.
+    """
+
+    assert not PY3
+
+    shared = {}
+    share = shared.setdefault
+    max_length = _SHARE_MAX_LENGTH
+    str_types = (bytes, text_type)
+
+    for i in items:
+        l = i.items()
+        dict.clear(i)
+        for k, v in l:
+            # str and unicode compare equal, keep the types apart
+            k = share((type(k), k), k)
+            if isinstance(v, str_types) and len(v) <= max_length:
+                v = share((type(v), v), v)
+            dict.__setitem__(i, k, v)
+
+    return items
+
+
 def load_audio_files(data, process=True):
     """unpickles the item list and if some class isn't found unpickle
     as a dict and filter them out afterwards.
@@ -183,7 +221,7 @@ def load_audio_files(data, process=True):
         if PY3:
             items = _py2_to_py3(items)
         else:
-            items = _py2_to_py2(items)
+            items = _py2_share_strings(_py2_to_py2(items))
 
     try:
         for i in items:
@@ -19,7 +19,6 @@ from quodlibet import print_d
 
 from quodlibet.library.libraries import SongFileLibrary, SongLibrary
 from quodlibet.library.librarians import SongLibrarian
-from quodlibet.util.path import mtime
 
 
 def init(cache_fn=None):
@@ -51,5 +50,6 @@ def save(save_period=None):
         if not filename or not lib.dirty:
             continue
 
-        if not save_period or abs(time.time() - mtime(filename)) > save_period:
+        last_save = lib.get_save_time()
+        if not save_period or abs(time.time() - last_save) > save_period:
             lib.save()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017 Quod Libet contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation
+
+"""A persistent cache of directory listings used when scanning for new
+files.
+
+Adding, removing or renaming an entry changes the modification time of
+the containing directory, so as long as that stays the same the last
+listing (including which entries are directories and where symlinks
+point to) can be reused. Scanning an unchanged tree then only needs one
+stat() per directory instead of looking at every file.
+"""
+
+import os
+import time
+
+from senf import fsnative
+
+from quodlibet.util.atomic import atomic_save
+from quodlibet.util.picklehelper import pickle_loads, pickle_dumps, \
+    PickleError
+from quodlibet.util.dprint import print_d, print_w
+
+
+class _Scan(object):
+
+    def __init__(self, roots):
+        self.roots = tuple(roots)
+        self.used = set()
+
+
+class DirectoryCache(object):
+    """Directory listings keyed by path, valid as long as the mtime of the
+    directory doesn't change.
+
+    Args:
+        filename (fsnative or None): where to persist the cache
+    """
+
+    MTIME_SLACK = 2
+    """Directories changed less than this many seconds before getting
+    listed don't get cached, the mtime resolution of some file systems
+    is too coarse to notice further changes"""
+
+    def __init__(self, filename=None):
+        assert filename is None or isinstance(filename, fsnative)
+
+        self.filename = filename
+        self._entries = {}
+        # scans started but not finished yet
+        self._scans = []
+        if filename is not None:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.filename, "rb") as fileobj:
+                entries = pickle_loads(fileobj.read())
+        except EnvironmentError:
+            return
+        except PickleError:
+            print_w("Couldn't load directory cache %r" % self.filename)
+            return
+
+        if isinstance(entries, dict):
+            self._entries = entries
+
+    def start(self, roots):
+        """Start a new scan of the directories `roots`.
+
+        Returns a token which has to be passed to finish() once done.
+        Multiple scans can run at the same time.
+        """
+
+        scan = _Scan(roots)
+        self._scans.append(scan)
+        return scan
+
+    def finish(self, scan):
+        """Drop the listings of directories in the roots of `scan` which
+        weren't used since its start() and save the cache.
+        """
+
+        self._scans.remove(scan)
+        roots = scan.roots
+        prefixes = tuple(os.path.join(r, fsnative(u"")) for r in roots)
+        for path in set(self._entries) - scan.used:
+            if path in roots or path.startswith(prefixes):
+                del self._entries[path]
+
+        if self.filename is None:
+            return
+
+        print_d("Saving %d directory listings" % len(self._entries))
+        try:
+            with atomic_save(self.filename, "wb") as fileobj:
+                fileobj.write(pickle_dumps(self._entries, 2))
+        except EnvironmentError:
+            print_w("Couldn't save directory cache %r" % self.filename)
+
+    def listdir(self, path):
+        """Returns a (dirs, files) tuple. `dirs` are the names of sub
+        directories which aren't symlinks and `files` a list of
+        (name, real path) tuples for all other entries.
+
+        Raises:
+            EnvironmentError
+        """
+
+        mtime = os.stat(path).st_mtime
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == mtime:
+            self._mark_used(path)
+            return entry[1], entry[2]
+
+        now = time.time()
+        dirs = []
+        files = []
+        for name in os.listdir(path):
+            fullname = os.path.join(path, name)
+            if os.path.isdir(fullname):
+                # like os.walk, don't follow directory symlinks
+                if not os.path.islink(fullname):
+                    dirs.append(name)
+            else:
+                files.append((name, os.path.realpath(fullname)))
+
+        if now - mtime > self.MTIME_SLACK:
+            self._entries[path] = (mtime, dirs, files)
+            self._mark_used(path)
+        return dirs, files
+
+    def _mark_used(self, path):
+        # listdir() doesn't know which scan it is called for, but an
+        # entry used by any of them is still valid
+        for scan in list(self._scans):
+            scan.used.add(path)
+
+    def walk(self, root):
+        """Like os.walk(root) but yields (path, dirs, files) with files
+        like in listdir(). Removing names from `dirs` prunes the walk.
+        """
+
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            try:
+                dirs, files = self.listdir(path)
+            except EnvironmentError:
+                continue
+            dirs = list(dirs)
+            yield path, dirs, files
+            stack.extend(os.path.join(path, d) for d in reversed(dirs))
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017 Quod Libet contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation
+
+"""Lookup tables for answering queries without looking at every song.
+
+All lookups return a superset of the songs which can match, the caller
+still has to run the query on the result. Tables get built the first time
+a tag is looked up and are kept up to date by the library from then on.
+"""
+
+import bisect
+
+from quodlibet.compat import iteritems, text_type, number_types
+
+
+def _is_ascii(text):
+    try:
+        text.encode("ascii")
+    except UnicodeError:
+        return False
+    return True
+
+
+class _TextTable(object):
+    """Maps lower cased lines of a tag value to songs.
+
+    Songs with non-ASCII values can match ASCII text in ways
+    lower() doesn't cover (ignore case, unicode variants), so they always
+    get returned.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lines = {}
+        self.residue = set()
+        self._keys = {}
+        self._sorted = None
+
+    def _value(self, song):
+        # same lookup as Tag.search
+        value = song.get(self.name)
+        if value is None:
+            value = song.get("~" + self.name, u"")
+        return value
+
+    def add(self, songs):
+        lines = self.lines
+        residue = self.residue
+        keys = self._keys
+        for song in songs:
+            value = self._value(song)
+            if not isinstance(value, text_type) or not _is_ascii(value):
+                residue.add(song)
+                keys[song] = None
+                continue
+            song_keys = set(value.lower().split(u"\n"))
+            for key in song_keys:
+                lines.setdefault(key, set()).add(song)
+            keys[song] = song_keys
+        self._sorted = None
+
+    def remove(self, songs):
+        lines = self.lines
+        keys = self._keys
+        for song in songs:
+            song_keys = keys.pop(song, None)
+            if song_keys is None:
+                self.residue.discard(song)
+                continue
+            for key in song_keys:
+                entry = lines[key]
+                entry.discard(song)
+                if not entry:
+                    del lines[key]
+        self._sorted = None
+
+    def _matching(self, text, exact):
+        if exact:
+            entry = self.lines.get(text)
+            return [entry] if entry else []
+
+        if self._sorted is None:
+            self._sorted = sorted(self.lines)
+        keys = self._sorted
+        lines = self.lines
+        entries = []
+        for i in range(bisect.bisect_left(keys, text), len(keys)):
+            key = keys[i]
+            if not key.startswith(text):
+                break
+            entries.append(lines[key])
+        return entries
+
+    def lookup(self, text, exact):
+        result = set(self.residue)
+        for entry in self._matching(text, exact):
+            result.update(entry)
+        return result
+
+    def count(self, text, exact):
+        # songs with multiple matching lines get counted more than once
+        return len(self.residue) + sum(
+            len(e) for e in self._matching(text, exact))
+
+
+class _NumericTable(object):
+    """Keeps songs sorted by the stored value of a numeric tag.
+
+    Songs for which the value doesn't only depend on the song itself
+    (the default rating) always get returned.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.values = {}
+        self.residue = set()
+        self._sorted = None
+
+    def add(self, songs):
+        name = self.name
+        values = self.values
+        residue = self.residue
+        for song in songs:
+            value = song(name, None)
+            if value is None:
+                # can't match any numeric comparison
+                continue
+            if not isinstance(value, number_types) or \
+                    (name == "~#rating" and name not in song):
+                residue.add(song)
+            else:
+                values[song] = value
+        self._sorted = None
+
+    def remove(self, songs):
+        values = self.values
+        residue = self.residue
+        for song in songs:
+            values.pop(song, None)
+            residue.discard(song)
+        self._sorted = None
+
+    def _range(self, lower, upper):
+        if self._sorted is None:
+            items = sorted(iteritems(self.values), key=lambda i: i[1])
+            self._sorted = (
+                [i[1] for i in items], [i[0] for i in items])
+        values, songs = self._sorted
+
+        start = 0 if lower is None else bisect.bisect_left(values, lower)
+        end = len(values) if upper is None else \
+            bisect.bisect_right(values, upper)
+        return songs, start, end
+
+    def lookup(self, lower, upper):
+        songs, start, end = self._range(lower, upper)
+        result = set(self.residue)
+        result.update(songs[start:end])
+        return result
+
+    def count(self, lower, upper):
+        songs, start, end = self._range(lower, upper)
+        return len(self.residue) + max(end - start, 0)
+
+
+class SongIndex(object):
+    """Text and numeric lookup tables for the songs of a library.
+
+    The library has to call add(), remove() and change() before
+    notifying anyone else about changes, see `SongLibrary.emit`.
+    """
+
+    def __init__(self, library):
+        self._library = library
+        self._text = {}
+        self._numeric = {}
+
+    def _tables(self):
+        return list(self._text.values()) + list(self._numeric.values())
+
+    def add(self, songs):
+        for table in self._tables():
+            table.add(songs)
+
+    def remove(self, songs):
+        for table in self._tables():
+            table.remove(songs)
+
+    def change(self, songs):
+        for table in self._tables():
+            table.remove(songs)
+            table.add(songs)
+
+    def clear(self):
+        """Drop all tables, they get rebuilt on the next lookup"""
+
+        self._text.clear()
+        self._numeric.clear()
+
+    def __len__(self):
+        return len(self._library)
+
+    def _text_table(self, name):
+        try:
+            return self._text[name]
+        except KeyError:
+            table = self._text[name] = _TextTable(name)
+            table.add(self._library.values())
+            return table
+
+    def _numeric_table(self, name):
+        try:
+            return self._numeric[name]
+        except KeyError:
+            table = self._numeric[name] = _NumericTable(name)
+            table.add(self._library.values())
+            return table
+
+    def text_count(self, name, text, exact):
+        """Like text_candidates() but only returns the (approximate)
+        number of songs.
+        """
+
+        return self._text_table(name).count(text, exact)
+
+    def numeric_count(self, name, lower, upper):
+        """Like numeric_candidates() but only returns the number of songs
+        """
+
+        return self._numeric_table(name).count(lower, upper)
+
+    def text_candidates(self, name, text, exact):
+        """Songs for which a line of the tag value starts with or is
+        equal to `text`.
+
+        Args:
+            name (str): the tag name, not synthesized
+            text (text_type): an ASCII lower case string
+            exact (bool): if the whole line has to match
+        Returns:
+            set
+        """
+
+        return self._text_table(name).lookup(text, exact)
+
+    def numeric_candidates(self, name, lower, upper):
+        """Songs for which the numeric tag is in the given (inclusive)
+        range.
+
+        Args:
+            name (str): the numeric tag name, e.g. "~#rating"
+            lower (float or None): the lower bound or None
+            upper (float or None): the upper bound or None
+        Returns:
+            set
+        """
+
+        return self._numeric_table(name).lookup(lower, upper)
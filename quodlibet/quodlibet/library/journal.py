@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017 Quod Libet contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation
+
+"""An append-only change log stored next to a pickled library file.
+
+The library file itself stays in the format written by
+`dump_audio_files()`. Saving only appends the items which were
+added/changed/removed since the last save to "<library>.journal", and
+loading replays the journal on top of the library file.
+
+Compaction rotates the journal to "<library>.journal.old", writes a new
+library file (this can happen in a thread) and then removes the rotated
+journal. Since replaying a journal is idempotent a crash at any point
+leaves a library which loads fine.
+"""
+
+import os
+import struct
+
+from senf import fsnative, fsn2bytes, bytes2fsn
+
+from quodlibet.formats import load_audio_files, dump_audio_files, \
+    SerializationError
+from quodlibet.util.picklehelper import pickle_loads, pickle_dumps, \
+    PickleError
+from quodlibet.util.dprint import print_d, print_w
+from quodlibet.util.path import filesize, mtime
+
+
+_HEADER = struct.Struct(">cI")
+
+_CHANGED = b"C"
+_REMOVED = b"R"
+
+
+class LibraryJournal(object):
+    """Manages the change log for one library file.
+
+    Args:
+        filename (fsnative): path of the library file
+    """
+
+    COMPACT_MIN_SIZE = 2 * 1024 * 1024
+    """Journals smaller than this (bytes) never need compaction"""
+
+    COMPACT_RATIO = 0.25
+    """Compact if the journal exceeds this fraction of the library file"""
+
+    def __init__(self, filename):
+        assert isinstance(filename, fsnative)
+
+        self.filename = filename
+        self.path = filename + fsnative(u".journal")
+        self.old_path = filename + fsnative(u".journal.old")
+
+    def mtime(self):
+        """The time of the last write to the library file or journal"""
+
+        return max(mtime(self.filename), mtime(self.path))
+
+    def needs_compaction(self):
+        """If the journal has grown large enough to be worth folding back
+        into the library file.
+        """
+
+        size = filesize(self.path) + filesize(self.old_path)
+        if size < self.COMPACT_MIN_SIZE:
+            return False
+        return size > filesize(self.filename) * self.COMPACT_RATIO
+
+    def append(self, changed, removed):
+        """Append one batch of changes.
+
+        Args:
+            changed (List[AudioFile]): items which were added or changed
+            removed (List[fsnative]): keys of items which are gone
+        Raises:
+            EnvironmentError
+        """
+
+        data = []
+        if changed:
+            try:
+                data.append(_encode(_CHANGED, dump_audio_files(changed)))
+            except SerializationError:
+                # not much we can do, better lose a change than the journal
+                print_w("Couldn't serialize changed items")
+        if removed:
+            keys = [fsn2bytes(k, "utf-8") for k in removed]
+            data.append(_encode(_REMOVED, pickle_dumps(keys, 2)))
+
+        if not data:
+            return
+
+        with open(self.path, "ab") as fileobj:
+            fileobj.write(b"".join(data))
+            fileobj.flush()
+            os.fsync(fileobj.fileno())
+
+    def replay(self, items):
+        """Apply the journal(s) to the items loaded from the library file.
+
+        Args:
+            items (List[AudioFile])
+        Returns:
+            List[AudioFile]
+        """
+
+        if not os.path.exists(self.path) and \
+                not os.path.exists(self.old_path):
+            return items
+
+        contents = dict((item.key, item) for item in items)
+        for path in [self.old_path, self.path]:
+            count = 0
+            for op, payload in _read_records(path):
+                if op == _CHANGED:
+                    for item in payload:
+                        contents[item.key] = item
+                elif op == _REMOVED:
+                    for key in payload:
+                        contents.pop(key, None)
+                count += 1
+            if count:
+                print_d("Replayed %d journal entries from %r" % (count, path))
+
+        return list(contents.values())
+
+    def rotate(self):
+        """Move the current journal out of the way before compacting.
+
+        Everything appended afterwards goes into a new journal which
+        the compacted library file will not include.
+
+        Raises:
+            EnvironmentError
+        """
+
+        if not os.path.exists(self.path):
+            return
+
+        if not os.path.exists(self.old_path):
+            os.rename(self.path, self.old_path)
+            return
+
+        # left over from an interrupted compaction, keep the order
+        with open(self.path, "rb") as src:
+            data = src.read()
+        with open(self.old_path, "ab") as dst:
+            dst.write(data)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.unlink(self.path)
+
+    def finish_compaction(self):
+        """Remove the rotated journal once the library file including its
+        changes was written.
+        """
+
+        _unlink(self.old_path)
+
+    def clear(self):
+        """Remove all journals, e.g. after the library file was written
+        in full.
+        """
+
+        _unlink(self.path)
+        _unlink(self.old_path)
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _encode(op, payload):
+    return _HEADER.pack(op, len(payload)) + payload
+
+
+def _decode_keys(data):
+    keys = pickle_loads(data)
+    if not isinstance(keys, list):
+        raise SerializationError("invalid key list")
+    return [bytes2fsn(k, "utf-8") for k in keys]
+
+
+def _read_records(path):
+    """Yields (op, payload) tuples.
+
+    Stops at the first incomplete or invalid record, which is what
+    a crash while appending leaves behind.
+    """
+
+    try:
+        with open(path, "rb") as fileobj:
+            data = fileobj.read()
+    except EnvironmentError:
+        return
+
+    offset = 0
+    while offset < len(data):
+        header = data[offset:offset + _HEADER.size]
+        if len(header) != _HEADER.size:
+            print_w("Truncated journal entry in %r" % path)
+            return
+        op, size = _HEADER.unpack(header)
+        offset += _HEADER.size
+        payload = data[offset:offset + size]
+        offset += size
+        if len(payload) != size:
+            print_w("Truncated journal entry in %r" % path)
+            return
+
+        try:
+            if op == _CHANGED:
+                yield op, load_audio_files(payload)
+            elif op == _REMOVED:
+                yield op, _decode_keys(payload)
+            else:
+                print_w("Unknown journal entry in %r" % path)
+                return
+        except (SerializationError, PickleError, ValueError, TypeError):
+            print_w("Invalid journal entry in %r" % path)
+            return
@@ -11,11 +11,12 @@ Librarians for libraries.
 """
 
 import itertools
+from contextlib import contextmanager
 
 from gi.repository import GObject
 
 from quodlibet.util.dprint import print_d
-from quodlibet.compat import itervalues
+from quodlibet.compat import itervalues, iteritems
 
 
 class Librarian(GObject.GObject):
@@ -41,6 +42,83 @@ class Librarian(GObject.GObject):
         super(Librarian, self).__init__()
         self.libraries = {}
         self.__signals = {}
+        self.__batch_depth = 0
+        self.__moving = False
+        # library -> (added, changed, removed) sets not emitted yet
+        self.__pending = {}
+        # (added, changed, removed) of all libraries while committing
+        self.__combined = None
+
+    @contextmanager
+    def batch(self):
+        """Collect the signals of all registered libraries and emit them
+        once per library and signal at the end, removed first, then added,
+        then changed. The librarian combines the ones of all libraries.
+
+        Items added and removed again don't get signaled, changes of
+        added or removed items are covered by those signals.
+
+        Can be nested, only the outermost one emits.
+        """
+
+        self.__batch_depth += 1
+        try:
+            yield
+        finally:
+            self.__batch_depth -= 1
+            if not self.__batch_depth:
+                self.__commit()
+
+    def _queue(self, library, signal_name, items):
+        """Returns True if the signal was queued by a running batch()
+        and shouldn't be emitted by the library now.
+        """
+
+        if not self.__batch_depth or self.__moving or \
+                library not in self.__signals or \
+                signal_name not in ("added", "changed", "removed"):
+            return False
+
+        added, changed, removed = self.__pending.setdefault(
+            library, (set(), set(), set()))
+        if signal_name == "added":
+            added.update(items)
+            changed.difference_update(items)
+        elif signal_name == "removed":
+            for item in items:
+                if item in added:
+                    added.discard(item)
+                else:
+                    removed.add(item)
+            changed.difference_update(items)
+        else:
+            changed.update(
+                i for i in items if i not in added and i not in removed)
+        return True
+
+    def __commit(self):
+        pending = self.__pending
+        self.__pending = {}
+        self.__combined = combined = (set(), set(), set())
+        try:
+            for library, (added, changed, removed) in iteritems(pending):
+                # skip the library emit() overrides, they've been called
+                if removed:
+                    GObject.GObject.emit(library, 'removed', removed)
+                if added:
+                    GObject.GObject.emit(library, 'added', added)
+                if changed:
+                    GObject.GObject.emit(library, 'changed', changed)
+        finally:
+            self.__combined = None
+
+        added, changed, removed = combined
+        if removed:
+            self.emit('removed', removed)
+        if added:
+            self.emit('added', added)
+        if changed:
+            self.emit('changed', changed)
 
     def destroy(self):
         pass
@@ -65,19 +143,23 @@ class Librarian(GObject.GObject):
             library.disconnect(signal_id)
         del(self.__signals[library])
 
-    # FIXME: We can be smarter about this -- queue a list of items
-    # and fire the signal after a short wait, to take advantage of
-    # a case where many libraries fire a signal at the same time (or
-    # one fires a signal often).
-
     def __changed(self, library, items):
-        self.emit('changed', items)
+        if self.__combined is not None:
+            self.__combined[1].update(items)
+        else:
+            self.emit('changed', items)
 
     def __added(self, library, items):
-        self.emit('added', items)
+        if self.__combined is not None:
+            self.__combined[0].update(items)
+        else:
+            self.emit('added', items)
 
     def __removed(self, library, items):
-        self.emit('removed', items)
+        if self.__combined is not None:
+            self.__combined[2].update(items)
+        else:
+            self.emit('removed', items)
 
     def changed(self, items):
         """Triage the items and inform their real libraries."""
@@ -130,9 +212,12 @@ class Librarian(GObject.GObject):
         try:
             from_.handler_block(self.__signals[from_][1])
             to.handler_block(self.__signals[to][0])
+            # the blocked handlers have to see the signals
+            self.__moving = True
             from_.remove(items)
             to.add(items)
         finally:
+            self.__moving = False
             from_.handler_unblock(self.__signals[from_][1])
             to.handler_unblock(self.__signals[to][0])
 
@@ -164,6 +249,7 @@ class SongLibrarian(Librarian):
             except KeyError:
                 pass
             else:
+                library._journal_note([song.key])
                 re_add.append(library)
         song.rename(newname)
         for library in re_add:
@@ -16,6 +16,9 @@ least useful but most content-agnostic.
 import os
 import shutil
 import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
 
 from gi.repository import GObject
 from senf import fsn2text, fsnative
@@ -23,8 +26,11 @@ from senf import fsn2text, fsnative
 from quodlibet import _
 from quodlibet.formats import MusicFile, AudioFileError, load_audio_files, \
     dump_audio_files, SerializationError
-from quodlibet.query import Query
+from quodlibet.query import Query, QueryType
 from quodlibet.qltk.notif import Task
+from quodlibet.library.index import SongIndex
+from quodlibet.library.journal import LibraryJournal
+from quodlibet.library.dircache import DirectoryCache
 from quodlibet.util.atomic import atomic_save
 from quodlibet.util.collection import Album
 from quodlibet.util.collections import DictMixin
@@ -32,9 +38,11 @@ from quodlibet import util
 from quodlibet import formats
 from quodlibet.util.dprint import print_d, print_w
 from quodlibet.util.path import unexpand, mkdir, normalize_path, ishidden, \
-    ismount
+    ismount, mtime
+from quodlibet.util.thread import call_async_background, Cancellable, \
+    iter_parallel
 from quodlibet.compat import iteritems, iterkeys, itervalues, listkeys, \
-    listvalues, listfilter
+    listvalues
 
 
 class Library(GObject.GObject, DictMixin):
@@ -74,6 +82,25 @@ class Library(GObject.GObject, DictMixin):
         if self.librarian is not None and self._name is not None:
             self.librarian._unregister(self, self._name)
 
+    @contextmanager
+    def batch(self):
+        """Same as `Librarian.batch` of the librarian of this library, if
+        there is one.
+        """
+
+        if self.librarian is None:
+            yield
+        else:
+            with self.librarian.batch():
+                yield
+
+    def emit(self, signal_name, *args):
+        # the librarian might want to emit it later, see Librarian.batch()
+        if self.librarian is not None and args and \
+                self.librarian._queue(self, signal_name, args[0]):
+            return
+        return super(Library, self).emit(signal_name, *args)
+
     def changed(self, items):
         """Alert other users that these items have changed.
 
@@ -236,10 +263,19 @@ def _load_items(filename):
 
 
 class PicklingMixin(object):
-    """A mixin to provide persistence of a library by pickling to disk"""
+    """A mixin to provide persistence of a library by pickling to disk.
+
+    After the first full save only the changes since the last save get
+    appended to a journal (see `LibraryJournal`), which is compacted back
+    into the library file in a thread once it gets too large.
+    """
 
     filename = None
 
+    _journal = None
+    _journal_keys = None
+    _compacting = False
+
     def load(self, filename):
         """Load a library from a file, containing a picked list.
 
@@ -249,7 +285,9 @@ class PicklingMixin(object):
         self.filename = filename
         print_d("Loading contents of %r." % filename, self)
 
-        items = _load_items(filename)
+        self._journal = LibraryJournal(filename)
+        self._journal_keys = set()
+        items = self._journal.replay(_load_items(filename))
 
         # this loads all items without checking their validity, but makes
         # sure that non-mounted items are masked
@@ -257,12 +295,42 @@ class PicklingMixin(object):
 
         print_d("Done loading contents of %r." % filename, self)
 
+    def _journal_note(self, keys):
+        """Mark the items for the given keys as changed for the next
+        journal write. Keys which no longer resolve to an item at save time
+        get journaled as removed.
+        """
+
+        if self._journal_keys is not None:
+            self._journal_keys.update(keys)
+
+    def _journal_items(self, library, items):
+        self._journal_note(item.key for item in items)
+
+    def _get_saved_item(self, key):
+        """Return the item which would be saved for `key` or None"""
+
+        return self._contents.get(key)
+
+    def get_save_time(self):
+        """Return the time of the last save or 0"""
+
+        if self._journal is not None:
+            return self._journal.mtime()
+        return mtime(self.filename)
+
     def save(self, filename=None):
         """Save the library to the given filename, or the default if `None`"""
 
         if filename is None:
             filename = self.filename
 
+        journal = self._journal
+        if journal is not None and journal.filename == filename and \
+                os.path.exists(filename):
+            self._save_journal()
+            return
+
         print_d("Saving contents to %r." % filename, self)
 
         try:
@@ -276,6 +344,79 @@ class PicklingMixin(object):
             print_w("Couldn't save library to path: %r" % filename)
         else:
             self.dirty = False
+            if journal is not None and journal.filename == filename \
+                    and not self._compacting:
+                journal.clear()
+                self._journal_keys.clear()
+
+    def _save_journal(self):
+        journal = self._journal
+        keys = self._journal_keys
+        self._journal_keys = set()
+
+        changed = []
+        removed = []
+        for key in keys:
+            item = self._get_saved_item(key)
+            if item is None:
+                removed.append(key)
+            else:
+                changed.append(item)
+
+        print_d("Journaling %d changed and %d removed items to %r." % (
+            len(changed), len(removed), journal.path), self)
+
+        try:
+            journal.append(changed, removed)
+        except EnvironmentError:
+            print_w("Couldn't write library journal: %r" % journal.path)
+            self._journal_keys |= keys
+            return
+
+        self.dirty = False
+
+        if not self._compacting and journal.needs_compaction():
+            self._compact()
+
+    def _compact(self):
+        """Write a full library file in a thread, replacing the journal"""
+
+        journal = self._journal
+        try:
+            journal.rotate()
+        except EnvironmentError:
+            print_w("Couldn't rotate library journal: %r" % journal.path)
+            return
+
+        print_d("Compacting %r." % journal.filename, self)
+        self._compacting = True
+
+        # Copy the dicts here, so the thread doesn't see the items change
+        # while pickling them. Everything changed from now on ends up in
+        # the new journal.
+        items = []
+        for item in self.get_content():
+            copy = dict.__new__(type(item))
+            dict.update(copy, item)
+            items.append(copy)
+
+        def write_snapshot(items):
+            try:
+                with atomic_save(journal.filename, "wb") as fileobj:
+                    fileobj.write(dump_audio_files(items))
+            except EnvironmentError:
+                print_w("Couldn't compact library: %r" % journal.filename)
+                return False
+            return True
+
+        def done(success):
+            self._compacting = False
+            if success:
+                journal.finish_compaction()
+                print_d("Done compacting %r." % journal.filename, self)
+
+        call_async_background(
+            write_snapshot, Cancellable(), done, args=(items,))
 
 
 class PicklingLibrary(Library, PicklingMixin):
@@ -284,6 +425,18 @@ class PicklingLibrary(Library, PicklingMixin):
         print_d("Using pickling persistence for library \"%s\"" % name)
         PicklingMixin.__init__(self)
         Library.__init__(self, name)
+        self.connect('added', self._journal_items)
+        self.connect('changed', self._journal_items)
+        self.connect('removed', self._journal_items)
+
+
+def _delta(deltas, album):
+    # (added, removed, changed) songs of an album, see Album.update()
+    try:
+        return deltas[album]
+    except KeyError:
+        delta = deltas[album] = ([], [], [])
+        return delta
 
 
 class AlbumLibrary(Library):
@@ -302,6 +455,8 @@ class AlbumLibrary(Library):
             "AlbumLibrary for %s" % library._name)
 
         self._library = library
+        # song -> Album, so changed songs don't have to be searched for
+        self._albums = {}
         self._asig = library.connect('added', self.__added)
         self._rsig = library.connect('removed', self.__removed)
         self._csig = library.connect('changed', self.__changed)
@@ -318,27 +473,41 @@ class AlbumLibrary(Library):
     def _get(self, item):
         return self._contents.get(item)
 
-    def __add(self, items):
+    def __add(self, items, deltas):
         changed = set()
         new = set()
+        albums = self._albums
         for song in items:
             key = song.album_key
             if key in self._contents:
-                changed.add(self._contents[key])
+                album = self._contents[key]
+                changed.add(album)
             else:
                 album = Album(song)
                 self._contents[key] = album
                 new.add(album)
-            self._contents[key].songs.add(song)
+            album.songs.add(song)
+            albums[song] = album
+            _delta(deltas, album)[0].append(song)
 
         changed -= new
         return changed, new
 
+    def __remove(self, song, changed, removed, deltas):
+        album = self._albums.pop(song)
+        album.songs.remove(song)
+        _delta(deltas, album)[1].append(song)
+        if not album.songs:
+            removed.add(album)
+        else:
+            changed.add(album)
+
     def __added(self, library, items, signal=True):
-        changed, new = self.__add(items)
+        deltas = {}
+        changed, new = self.__add(items, deltas)
 
         for album in changed:
-            album.finalize()
+            album.update(*deltas[album])
 
         if signal:
             if new:
@@ -349,19 +518,16 @@ class AlbumLibrary(Library):
     def __removed(self, library, items):
         changed = set()
         removed = set()
+        deltas = {}
         for song in items:
-            key = song.album_key
-            album = self._contents[key]
-            album.songs.remove(song)
-            changed.add(album)
-            if not album.songs:
-                removed.add(album)
-                del self._contents[key]
+            self.__remove(song, changed, removed, deltas)
 
         changed -= removed
+        for album in removed:
+            del self._contents[album.key]
 
         for album in changed:
-            album.finalize()
+            album.update(*deltas[album])
 
         if removed:
             self.emit('removed', removed)
@@ -369,40 +535,38 @@ class AlbumLibrary(Library):
             self.emit('changed', changed)
 
     def __changed(self, library, items):
-        """Album keys could change between already existing ones.. so we
-        have to do it the hard way and search by id."""
+        """Album keys could change between already existing ones, so look
+        up the old album of each song and move it if needed."""
         print_d("Updating affected albums for %d items" % len(items))
         changed = set()
         removed = set()
         to_add = []
+        deltas = {}
+        albums = self._albums
         for song in items:
-            # in case the key hasn't changed
-            key = song.album_key
-            if key in self._contents and song in self._contents[key].songs:
-                changed.add(self._contents[key])
-            else:  # key changed.. look for it in each album
+            album = albums.get(song)
+            if album is not None and album.key == song.album_key:
+                changed.add(album)
+                _delta(deltas, album)[2].append(song)
+            else:
                 to_add.append(song)
-                for key, album in iteritems(self._contents):
-                    if song in album.songs:
-                        album.songs.remove(song)
-                        if not album.songs:
-                            removed.add(album)
-                        else:
-                            changed.add(album)
-                        break
+                if album is not None:
+                    self.__remove(song, changed, removed, deltas)
 
         # get new albums and changed ones because keys could have changed
-        add_changed, new = self.__add(to_add)
+        add_changed, new = self.__add(to_add, deltas)
         changed |= add_changed
 
         # check if albums that were empty at some point are still empty
-        for album in removed:
-            if not album.songs:
+        for album in list(removed):
+            if album.songs:
+                removed.discard(album)
+            else:
                 del self._contents[album.key]
                 changed.discard(album)
 
         for album in changed:
-            album.finalize()
+            album.update(*deltas[album])
 
         if removed:
             self.emit("removed", removed)
@@ -419,18 +583,54 @@ class SongLibrary(PicklingLibrary):
     interface.
     """
 
+    QUERY_CACHE_SIZE = 10
+    """Number of recent text query results kept for refining"""
+
     def __init__(self, *args, **kwargs):
         super(SongLibrary, self).__init__(*args, **kwargs)
+        # (query string, star) -> (Query, songs), least recent first
+        self._query_results = OrderedDict()
+        # Query -> filter planned with the current index
+        self._query_plans = weakref.WeakKeyDictionary()
 
     @util.cached_property
     def albums(self):
         return AlbumLibrary(self)
 
+    @util.cached_property
+    def index(self):
+        return SongIndex(self)
+
     def destroy(self):
         super(SongLibrary, self).destroy()
         if "albums" in self.__dict__:
             self.albums.destroy()
 
+    def emit(self, signal_name, *args):
+        # The index has to be up to date before any handler can query us
+        if signal_name in ("added", "removed", "changed"):
+            self._query_results.clear()
+            self._query_plans.clear()
+        if "index" in self.__dict__:
+            if signal_name == "added":
+                self.index.add(args[0])
+            elif signal_name == "removed":
+                self.index.remove(args[0])
+            elif signal_name == "changed":
+                self.index.change(args[0])
+        if signal_name == "changed":
+            # sort keys can depend on more than the song's tags
+            for song in args[0]:
+                song.__dict__.pop("_sort_cache", None)
+        return super(SongLibrary, self).emit(signal_name, *args)
+
+    def _load_init(self, items):
+        super(SongLibrary, self)._load_init(items)
+        self._query_results.clear()
+        self._query_plans.clear()
+        if "index" in self.__dict__:
+            self.index.clear()
+
     def tag_values(self, tag):
         """Return a set of all values for the given tag."""
         return {value for song in itervalues(self)
@@ -450,6 +650,7 @@ class SongLibrary(PicklingLibrary):
         """
         print_d("Renaming %r to %r" % (song.key, newname), self)
         del(self._contents[song.key])
+        self._journal_note([song.key])
         song.rename(newname)
         self._contents[song.key] = song
         if changed is not None:
@@ -465,11 +666,83 @@ class SongLibrary(PicklingLibrary):
 
         songs = self.values()
         if text != "":
-            songs = listfilter(Query(text, star).search, songs)
+            songs = self.filter_query(Query(text, star))
         return songs
 
+    def filter_query(self, query):
+        """Returns a list of songs matching the passed `Query`.
+
+        Uses the index to only look at songs which can match and to
+        decide the order in which the parts of the query get checked.
+        Text queries extending a recent one (search as you type) only
+        look at the songs the previous one returned.
+        """
+
+        if query.type != QueryType.TEXT:
+            return self._filter_query(query, None)
+
+        results = self._query_results
+        key = (query.string, tuple(query.star))
+        if key in results:
+            songs = results.pop(key)[1]
+            results[key] = (query, songs)
+            return list(songs)
+
+        previous = None
+        for other, songs in itervalues(results):
+            if query.is_refinement_of(other):
+                if previous is None or len(songs) < len(previous):
+                    previous = songs
+
+        songs = self._filter_query(query, previous)
+        results[key] = (query, songs)
+        while len(results) > self.QUERY_CACHE_SIZE:
+            results.popitem(last=False)
+        return list(songs)
+
+    def _filter_query(self, query, songs):
+        filter_ = self._query_plans.get(query)
+        if filter_ is None:
+            filter_ = self._query_plans[query] = \
+                query.planned_filter(self.index)
+        if songs is None:
+            songs = query.candidates(self.index)
+        if songs is None:
+            songs = self.values()
+        return filter_(songs)
+
+
+def _check_valid(entry):
+    return entry[1].valid()
+
+
+def _walk_jobs(root, cache=None):
+    """Splits walking `root` into (path, recursive) arguments for
+    iter_paths(), one for each sub directory, which together yield the
+    same paths as iter_paths(root).
+    """
+
+    if cache is None:
+        cache = DirectoryCache()
+    jobs = [(root, False)]
+    if ishidden(root):
+        return jobs
+    try:
+        names = cache.listdir(root)[0]
+    except EnvironmentError:
+        return jobs
+    for name in sorted(names):
+        jobs.append((os.path.join(root, name), True))
+    return jobs
 
-def iter_paths(root, exclude=[], skip_hidden=True):
+
+def _os_walk(root):
+    for path, dnames, fnames in os.walk(root):
+        yield path, dnames, [(f, None) for f in fnames]
+
+
+def iter_paths(root, exclude=[], skip_hidden=True, recursive=True,
+               cache=None):
     """yields paths contained in root (symlinks dereferenced)
 
     Any path starting with any of the path parts included in exclude
@@ -482,6 +755,9 @@ def iter_paths(root, exclude=[], skip_hidden=True):
         exclude (List[fsnative])
         skip_hidden (bool): Ignore files which are hidden or where any
             of the parent directories are hidden.
+        recursive (bool): Include files in sub directories
+        cache (DirectoryCache): reuse the listings of unchanged
+            directories
     Yields:
         fsnative: absolute dereferenced paths
     """
@@ -499,15 +775,20 @@ def iter_paths(root, exclude=[], skip_hidden=True):
     if skip_hidden and ishidden(root):
         return
 
-    for path, dnames, fnames in os.walk(root):
-        if skip_hidden:
+    walk = _os_walk(root) if cache is None else cache.walk(root)
+    for path, dnames, files in walk:
+        if not recursive:
+            del dnames[:]
+        elif skip_hidden:
             dnames[:] = list(filter(
                 lambda d: not ishidden(os.path.join(path, d)), dnames))
-        for filename in fnames:
+        for filename, realpath in files:
             fullfilename = os.path.join(path, filename)
             if skip(fullfilename):
                 continue
-            fullfilename = os.path.realpath(fullfilename)
+            if realpath is None:
+                realpath = os.path.realpath(fullfilename)
+            fullfilename = realpath
             if skip(fullfilename):
                 continue
             yield fullfilename
@@ -524,6 +805,13 @@ class FileLibrary(PicklingLibrary):
         super(FileLibrary, self).__init__(name)
         self._masked = {}
 
+    @util.cached_property
+    def _dir_cache(self):
+        filename = None
+        if self.filename:
+            filename = self.filename + fsnative(u".dirs")
+        return DirectoryCache(filename)
+
     def _load_init(self, items):
         """Add many items to the library, check if the
         mountpoints are available and mark items as masked if not.
@@ -661,10 +949,18 @@ class FileLibrary(PicklingLibrary):
         if cofuncid:
             task.copool(cofuncid)
         changed, removed = set(), set()
-        for i, (key, item) in task.list(enumerate(sorted(self.items()))):
-            if key in self._contents and force or not item.valid():
-                self.reload(item, changed, removed)
-                # These numbers are pretty empirical. We should yield more
+        # The mtime checks can take a while on network shares, so they
+        # happen in the background. Reloading changes items others might
+        # look at, so that happens here.
+        entries = sorted(self.items())
+        i = 0
+        for done in iter_parallel(_check_valid, entries):
+            for (key, item), valid in done:
+                if key in self._contents and force or not valid:
+                    self.reload(item, changed, removed)
+                i += 1
+            task.update(float(i) / len(entries))
+            # These numbers are pretty empirical. We should yield more
             # often than we emit signals; that way the main loop stays
             # interactive and doesn't get bogged down in updates.
             if len(changed) > 100:
@@ -673,8 +969,8 @@ class FileLibrary(PicklingLibrary):
             if len(removed) > 100:
                 self.emit('removed', removed)
                 removed = set()
-            if len(changed) > 5 or i % 100 == 0:
-                yield True
+            yield True
+        task.finish()
         print_d("Removing %d, changing %d." % (len(removed), len(changed)),
                 self)
         if removed:
@@ -693,6 +989,15 @@ class FileLibrary(PicklingLibrary):
 
         raise NotImplementedError
 
+    def load_filename(self, filename):
+        """Returns a new item for the file or None.
+
+        Gets called from threads during `scan` and must not look at or
+        change the library. Subclasses must override this.
+        """
+
+        raise NotImplementedError
+
     def contains_filename(self, filename):
         """Returns if a song for the passed filename is in the library.
 
@@ -703,13 +1008,13 @@ class FileLibrary(PicklingLibrary):
         raise NotImplementedError
 
     def scan(self, paths, exclude=[], cofuncid=None):
+        """Adds all new files found in `paths`.
 
-        def need_yield(last_yield=[0]):
-            current = time.time()
-            if abs(current - last_yield[0]) > 0.015:
-                last_yield[0] = current
-                return True
-            return False
+        Walking the directories and loading the files happens in the
+        background thread pool, the items get added in batches.
+        Directories which haven't changed since the last scan don't
+        get listed again, see `DirectoryCache`.
+        """
 
         def need_added(last_added=[0]):
             current = time.time()
@@ -719,6 +1024,8 @@ class FileLibrary(PicklingLibrary):
             return False
 
         # first scan each path for new files
+        cache = self._dir_cache
+        scan = cache.start(paths)
         paths_to_load = []
         for scan_path in paths:
             print_d("Scanning %r." % scan_path)
@@ -727,18 +1034,24 @@ class FileLibrary(PicklingLibrary):
                 if cofuncid:
                     task.copool(cofuncid)
 
-                for real_path in iter_paths(scan_path, exclude=exclude):
-                    if need_yield():
-                        task.pulse()
-                        yield
+                def find_paths(job):
+                    path, recursive = job
                     # skip unknown file extensions
-                    if not formats.filter(real_path):
-                        continue
-                    # already loaded
-                    if self.contains_filename(real_path):
-                        continue
-                    paths_to_load.append(real_path)
+                    return [p for p in iter_paths(
+                        path, exclude=exclude, recursive=recursive,
+                        cache=cache) if formats.filter(p)]
+
+                jobs = _walk_jobs(scan_path, cache)
+                for done in iter_parallel(find_paths, jobs):
+                    task.pulse()
+                    for job, found in done:
+                        for real_path in found:
+                            # already loaded
+                            if not self.contains_filename(real_path):
+                                paths_to_load.append(real_path)
+                    yield
 
+        cache.finish(scan)
         yield
 
         # then (try to) load all new files
@@ -747,16 +1060,19 @@ class FileLibrary(PicklingLibrary):
                 task.copool(cofuncid)
 
             added = []
-            for real_path in task.gen(paths_to_load):
-                item = self.add_filename(real_path, False)
-                if item is not None:
-                    added.append(item)
-                    if len(added) > 100 or need_added():
-                        self.add(added)
-                        added = []
-                        yield
-                if added and need_yield():
-                    yield
+            i = 0
+            for done in iter_parallel(self.load_filename, paths_to_load):
+                for real_path, item in done:
+                    i += 1
+                    # could have been added in the meantime
+                    if item is not None and \
+                            not self.contains_filename(real_path):
+                        added.append(item)
+                task.update(float(i) / len(paths_to_load))
+                if len(added) > 100 or (added and need_added()):
+                    self.add(added)
+                    added = []
+                yield
             if added:
                 self.add(added)
                 added = []
@@ -776,6 +1092,14 @@ class FileLibrary(PicklingLibrary):
 
         return items
 
+    def _get_saved_item(self, key):
+        item = self._contents.get(key)
+        if item is None:
+            for items in itervalues(self._masked):
+                if key in items:
+                    return items[key]
+        return item
+
     def masked(self, item):
         """Return true if the item is in the library but masked."""
         try:
@@ -838,6 +1162,9 @@ class SongFileLibrary(SongLibrary, FileLibrary):
         key = normalize_path(filename, True)
         return self._contents.get(key)
 
+    def load_filename(self, filename):
+        return MusicFile(filename)
+
     def add_filename(self, filename, add=True):
         """Add a song to the library based on filename.
 
@@ -854,7 +1181,7 @@ class SongFileLibrary(SongLibrary, FileLibrary):
         key = normalize_path(filename, True)
         song = None
         if key not in self._contents:
-            song = MusicFile(filename)
+            song = self.load_filename(filename)
             if song and add:
                 self.add([song])
         else:
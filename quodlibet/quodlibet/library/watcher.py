@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017 Quod Libet contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation
+
+"""Keeps a file library up to date by watching the scan directories"""
+
+import os
+
+from gi.repository import Gio, GLib
+from senf import fsnative
+
+from quodlibet import formats
+from quodlibet.util import copool
+from quodlibet.util.dprint import print_d, print_w
+from quodlibet.util.path import ishidden
+from quodlibet.util.thread import iter_parallel
+
+
+_EVENTS = (
+    Gio.FileMonitorEvent.CREATED,
+    Gio.FileMonitorEvent.DELETED,
+    Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+)
+
+_DIRECTORY = object()
+_GONE = object()
+
+
+def _check_valid(item):
+    return item.valid()
+
+
+class LibraryWatcher(object):
+    """Watches all directories below the passed paths using one
+    Gio.FileMonitor per directory and adds, reloads or removes songs of a
+    `SongFileLibrary` accordingly.
+
+    Events get collected for `DELAY` milliseconds and then handled in one
+    go, so a tagger rewriting thousands of files results in a few large
+    signals instead of thousands of small ones. Files get checked and
+    loaded in the background thread pool.
+
+    Args:
+        library (SongFileLibrary)
+        paths (List[fsnative]): the scan directories
+        exclude (List[fsnative]): paths to ignore
+    """
+
+    DELAY = 1500
+    """Time in ms to collect events before handling them"""
+
+    MAX_WATCHES = 8192
+    """Maximum number of directories to watch"""
+
+    MAX_PENDING = 2000
+    """If more files changed, rescan their directories instead"""
+
+    def __init__(self, library, paths, exclude=[]):
+        self._library = library
+        self._roots = [os.path.realpath(p) for p in paths]
+        self._exclude = list(exclude)
+        self._monitors = {}
+        self._pending_files = set()
+        self._pending_dirs = set()
+        self._timeout_id = None
+        self._updating = False
+        self._scanning = False
+        # directories to look for new files in
+        self._scan_queue = set()
+        self._warned = False
+
+    def start(self):
+        """Start watching, which happens in the background as well"""
+
+        copool.add(self._watch_trees, self._roots, funcid=self)
+
+    def destroy(self):
+        """Stop watching and drop all pending changes"""
+
+        if self._timeout_id is not None:
+            GLib.source_remove(self._timeout_id)
+            self._timeout_id = None
+        for funcid in [self, (self, "update"), (self, "scan")]:
+            try:
+                copool.remove(funcid)
+            except ValueError:
+                pass
+        self._updating = self._scanning = False
+        for path in list(self._monitors):
+            self._unwatch(path)
+        self._pending_files.clear()
+        self._pending_dirs.clear()
+        self._scan_queue.clear()
+
+    @property
+    def watch_count(self):
+        """Number of directories being watched"""
+
+        return len(self._monitors)
+
+    def _skip(self, path):
+        return ishidden(path) or path.startswith(tuple(self._exclude))
+
+    def _watch_trees(self, roots):
+        for root in roots:
+            if self._skip(root):
+                continue
+            for i, (path, dirs, files) in enumerate(os.walk(root)):
+                dirs[:] = [d for d in dirs
+                           if not self._skip(os.path.join(path, d))]
+                if not self._watch(path):
+                    return
+                if i % 50 == 0:
+                    yield True
+
+    def _watch(self, path):
+        if path in self._monitors:
+            return True
+
+        if len(self._monitors) >= self.MAX_WATCHES:
+            if not self._warned:
+                print_w("Not watching more than %d directories, "
+                        "rescan the library to find changes in the "
+                        "others." % self.MAX_WATCHES)
+                self._warned = True
+            return False
+
+        try:
+            monitor = Gio.File.new_for_path(path).monitor_directory(
+                Gio.FileMonitorFlags.NONE, None)
+        except GLib.GError as e:
+            print_w("Couldn't watch %r: %s" % (path, e))
+            return True
+        monitor.connect("changed", self._changed)
+        self._monitors[path] = monitor
+        return True
+
+    def _unwatch(self, path):
+        prefix = os.path.join(path, fsnative(u""))
+        for p in list(self._monitors):
+            if p == path or p.startswith(prefix):
+                self._monitors.pop(p).cancel()
+
+    def _changed(self, monitor, file_, other_file, event_type):
+        if event_type not in _EVENTS:
+            return
+
+        path = file_.get_path()
+        if path is None or self._skip(path):
+            return
+
+        if event_type == Gio.FileMonitorEvent.DELETED and \
+                path in self._monitors:
+            self._unwatch(path)
+
+        self._pending_files.add(path)
+        if len(self._pending_files) > self.MAX_PENDING:
+            # keep memory bounded, the directories are fewer
+            self._pending_dirs.update(
+                os.path.dirname(p) for p in self._pending_files)
+            self._pending_files.clear()
+
+        self._schedule()
+
+    def _schedule(self):
+        if self._timeout_id is None:
+            self._timeout_id = GLib.timeout_add(self.DELAY, self._process)
+
+    def _process(self):
+        self._timeout_id = None
+        # a running update picks up the new changes when it's done
+        if not self._updating:
+            self._updating = True
+            copool.add(self._update, funcid=(self, "update"))
+        return False
+
+    def _load(self, path):
+        # called from threads, must not look at the library
+        if os.path.isdir(path):
+            return _DIRECTORY
+        elif not os.path.exists(path):
+            # could have been a directory
+            return _GONE
+        elif formats.filter(path):
+            return self._library.load_filename(path)
+
+    def _update(self):
+        """Handles all pending changes. A generator for copool: files get
+        checked and loaded in the background, and the library changes in
+        batches.
+        """
+
+        library = self._library
+        files, self._pending_files = self._pending_files, set()
+        dirs, self._pending_dirs = self._pending_dirs, set()
+        gone = set()
+        added = []
+        changed, removed = set(), set()
+        check = []
+
+        try:
+            unknown = []
+            for path in files:
+                item = library.get_filename(path)
+                if item is not None:
+                    check.append(item)
+                else:
+                    unknown.append(path)
+
+            for done in iter_parallel(self._load, unknown):
+                for path, result in done:
+                    if result is _DIRECTORY:
+                        dirs.add(path)
+                    elif result is _GONE:
+                        gone.add(path)
+                    elif result is not None and \
+                            not library.contains_filename(path):
+                        added.append(result)
+                if len(added) > 100:
+                    library.add(added)
+                    added = []
+                yield True
+            if added:
+                library.add(added)
+
+            # songs in deleted directories, and ones which changed if
+            # there were too many to handle one by one
+            prefixes = tuple(os.path.join(p, fsnative(u"")) for p in gone)
+            dir_prefixes = tuple(
+                os.path.join(p, fsnative(u"")) for p in dirs)
+            if prefixes or dir_prefixes:
+                for i, item in enumerate(list(library.values())):
+                    key = item.key
+                    if key.startswith(prefixes):
+                        if item in library:
+                            library.reload(item, changed, removed)
+                    elif key.startswith(dir_prefixes):
+                        check.append(item)
+                    if i % 1000 == 0:
+                        yield True
+
+            for done in iter_parallel(_check_valid, check):
+                for item, valid in done:
+                    if not valid and item in library:
+                        library.reload(item, changed, removed)
+                if len(changed) > 100:
+                    library.emit("changed", changed)
+                    changed = set()
+                if len(removed) > 100:
+                    library.emit("removed", removed)
+                    removed = set()
+                yield True
+
+            print_d("Changing %d, removing %d" % (
+                len(changed), len(removed)))
+            if changed:
+                library.emit("changed", changed)
+            if removed:
+                library.emit("removed", removed)
+        finally:
+            self._updating = False
+
+        # new files in new or changed directories
+        if dirs:
+            self._scan_queue.update(dirs)
+            if not self._scanning:
+                self._scanning = True
+                copool.add(self._scan_dirs, funcid=(self, "scan"))
+
+        if self._pending_files or self._pending_dirs:
+            self._schedule()
+
+    def _scan_dirs(self):
+        try:
+            while self._scan_queue:
+                dirs = sorted(self._scan_queue)
+                self._scan_queue.clear()
+                for value in self._watch_trees(dirs):
+                    yield value
+                for value in self._library.scan(dirs, self._exclude):
+                    yield value
+        finally:
+            self._scanning = False
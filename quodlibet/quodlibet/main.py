@@ -20,6 +20,9 @@ def main(argv=None):
     if argv is None:
         argv = sys_argv
 
+    from quodlibet.util.timeline import Timeline
+    timeline = Timeline()
+
     import quodlibet
 
     config_file = os.path.join(quodlibet.get_user_dir(), "config")
@@ -34,6 +37,7 @@ def main(argv=None):
         sys.modules.pop("gi.repository.Gtk", None)
 
     quodlibet.init()
+    timeline.mark("init")
 
     from quodlibet import app
     from quodlibet.qltk import add_signal_watch, Icons
@@ -56,6 +60,7 @@ def main(argv=None):
 
     library = quodlibet.library.init(library_path)
     app.library = library
+    timeline.mark("library")
 
     # this assumes that nullbe will always succeed
     from quodlibet.player import PlayerError
@@ -72,6 +77,7 @@ def main(argv=None):
 
     environ["PULSE_PROP_media.role"] = "music"
     environ["PULSE_PROP_application.icon_name"] = "quodlibet"
+    timeline.mark("player")
 
     browsers.init()
 
@@ -90,9 +96,12 @@ def main(argv=None):
     for Kind in browsers.browsers:
         if Kind.headers is not None:
             Kind.headers.extend(in_all)
-        Kind.init(library)
+    # the others get initialized once they are shown
+    browsers.setup(library, lazy=True)
+    timeline.mark("browsers")
 
-    pm = quodlibet.init_plugins("no-plugins" in startup_actions)
+    # plugins get imported after the main window is up, see load_plugins()
+    pm = quodlibet.init_plugins("no-plugins" in startup_actions, rescan=False)
 
     if hasattr(player, "init_plugins"):
         player.init_plugins()
@@ -104,18 +113,55 @@ def main(argv=None):
     SongsMenu.init_plugins()
 
     from quodlibet.util.cover import CoverManager
-    app.cover_manager = CoverManager()
+    from quodlibet.util.path import xdg_get_cache_home
+    app.cover_manager = CoverManager(
+        cache_filename=os.path.join(quodlibet.get_user_dir(), "cover_paths"),
+        image_cache_dir=os.path.join(
+            xdg_get_cache_home(), "quodlibet", "embedded"))
     app.cover_manager.init_plugins()
+    from quodlibet.util.cover.built_in import EmbeddedCover
+    EmbeddedCover.image_cache = app.cover_manager.image_cache
 
     from quodlibet.plugins.playlist import PLAYLIST_HANDLER
     PLAYLIST_HANDLER.init_plugins()
 
     from quodlibet.plugins.query import QUERY_HANDLER
     QUERY_HANDLER.init_plugins()
+    timeline.mark("plugin handlers")
 
     from gi.repository import GLib
 
+    plugins_loaded = []
+
+    def load_plugins():
+        if plugins_loaded:
+            return False
+        plugins_loaded.append(True)
+        timeline.mark("window shown")
+
+        pm.rescan()
+        for module in pm.modules:
+            timeline.add("  import %s" % module.name,
+                         module.load_start, module.load_time)
+        timeline.mark("plugins")
+
+        # the restored search could use query plugins, which didn't
+        # exist when it got parsed
+        browser = window.browser
+        if browser.can_filter_text():
+            text = browser.get_filter_text()
+            if u"@(" in text:
+                browser.filter_text(text)
+
+        print_d("Startup took %.0f ms" % (timeline.total * 1000))
+        if "print-startup-times" in startup_actions:
+            print_(timeline.format())
+        return False
+
     def exec_commands(*args):
+        if cmds_todo:
+            # queries can depend on plugins
+            load_plugins()
         for cmd in cmds_todo:
             try:
                 resp = cmd_registry.run(app, *cmd)
@@ -143,11 +189,13 @@ def main(argv=None):
     pm.register_handler(EventPluginHandler(library.librarian, player,
                                            app.window.songlist))
     pm.register_handler(UserInterfacePluginHandler())
+    timeline.mark("main window")
 
     from quodlibet.mmkeys import MMKeysHandler
     from quodlibet.remote import Remote, RemoteError
     from quodlibet.commands import registry as cmd_registry, CommandError
     from quodlibet.qltk.tracker import SongTracker, FSInterface
+    from quodlibet.util.collection import Playlist
     try:
         from quodlibet.qltk.dbus_ import DBusHandler
     except ImportError:
@@ -178,11 +226,16 @@ def main(argv=None):
     if "start-hidden" in startup_actions:
         Window.prevent_inital_show(True)
 
+    timeline.mark("services")
+
     # restore browser windows
     from quodlibet.qltk.browser import LibraryBrowser
     GLib.idle_add(LibraryBrowser.restore, library, player,
                   priority=GLib.PRIORITY_HIGH)
 
+    # after the main window got drawn
+    GLib.idle_add(load_plugins, priority=GLib.PRIORITY_LOW)
+
     def before_quit():
         print_d("Saving active browser state")
         try:
@@ -202,7 +255,12 @@ def main(argv=None):
     fsiface.destroy()
 
     tracker.destroy()
+    from quodlibet.util.library import stop_library_watcher
+    stop_library_watcher()
+    Playlist.write_pending()
     quodlibet.library.save()
+    app.cover_manager.save()
+    print_d("Cover surfaces: %s" % app.cover_manager.surfaces.stats())
 
     config.save()
 
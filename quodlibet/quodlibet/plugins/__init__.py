@@ -276,7 +276,9 @@ class PluginManager(object):
         print_d("Rescanning done.")
 
     @property
-    def _modules(self):
+    def modules(self):
+        """All successfully imported plugin modules (`Module`)"""
+
         return itervalues(self.__scanner.modules)
 
     @property
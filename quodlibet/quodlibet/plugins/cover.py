@@ -57,6 +57,28 @@ class CoverSourcePlugin(GObject.Object):
 
         return
 
+    @property
+    def cover_dirs(self):
+        """
+        After `cover` was accessed, the directories the result depends on,
+        so the cover manager can reuse it for the whole group (see
+        `group_by`) until the contents of one of them change.
+
+        This default implementation returns None, meaning the result can't
+        be reused.
+        """
+        return None
+
+    @classmethod
+    def cover_settings(cls):
+        """
+        Returns a hashable of the settings the result of `cover` depends
+        on, a reused result gets dropped once they change.
+
+        This default implementation returns None.
+        """
+        return None
+
     @staticmethod
     def priority():
         """
@@ -264,6 +264,7 @@ class LibraryBrowser(Window, util.InstanceTracker, PersistentWindowMixin):
         sw.add(view)
         sw.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
 
+        browsers.prepare(Kind)
         self.browser = browser = Kind(library)
         if browser.can_reorder:
             view.enable_drop()
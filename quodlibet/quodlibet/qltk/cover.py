@@ -12,7 +12,8 @@ from senf import fsnative
 from quodlibet import qltk
 from quodlibet import app
 from quodlibet.util import thumbnails, print_w
-from quodlibet.qltk.image import pixbuf_from_file, \
+from quodlibet.util.path import mtime
+from quodlibet.qltk.image import pixbuf_from_file, get_border_style, \
     calc_scale_size, scale, add_border_widget, get_surface_for_pixbuf
 
 
@@ -100,11 +101,47 @@ def get_no_cover_pixbuf(width, height, scale_factor=1):
         return
 
 
+def get_cover_surface(widget, group, source, size, get_pixbuf):
+    """Returns a surface for the widget showing the pixbuf returned by
+    `get_pixbuf` with a border, or None if there is no pixbuf.
+
+    Surfaces are shared by all widgets and only get created if there is
+    none for the same `source`, `size`, scale factor and border yet.
+    Album covers should use the album key as `group`, so their surfaces
+    get dropped once `CoverManager.cover_changed()` gets called for them.
+
+    Args:
+        widget (Gtk.Widget)
+        group: a hashable for dropping all surfaces of a cover at once
+        source: a hashable identifying the image in the group
+        size (Tuple[int, int]): the size of the pixbuf or the box it
+            gets scaled into
+        get_pixbuf (Callable[[], GdkPixbuf.Pixbuf or None])
+    """
+
+    color, width, radius = get_border_style(widget)
+    border = ((color.red, color.green, color.blue, color.alpha), width, radius)
+    key = (source, size, widget.get_scale_factor(), border)
+
+    cache = app.cover_manager.surfaces
+    surface = cache.get(group, key)
+    if surface is None:
+        pixbuf = get_pixbuf()
+        if pixbuf is None:
+            return
+        pixbuf = add_border_widget(pixbuf, widget)
+        surface = get_surface_for_pixbuf(widget, pixbuf)
+        cache.put(group, key, surface,
+                  pixbuf.get_rowstride() * pixbuf.get_height())
+    return surface
+
+
 class ResizeImage(Gtk.Bin):
     def __init__(self, resize=False, size=1):
         Gtk.Bin.__init__(self)
         self._dirty = True
         self._path = None
+        self._mtime = None
         self._file = None
         self._pixbuf = None
         self._no_cover = None
@@ -125,6 +162,8 @@ class ResizeImage(Gtk.Bin):
 
         self._file = fileobj
         self._path = path
+        # the file can change while the path stays the same
+        self._mtime = path and mtime(path)
         self._dirty = True
         self.queue_resize()
 
@@ -195,15 +234,19 @@ class ResizeImage(Gtk.Bin):
         if self._path:
             if width < (2 * scale_factor) or height < (2 * scale_factor):
                 return
-            pixbuf = scale(
-                pixbuf, (width - 2 * scale_factor, height - 2 * scale_factor))
-            pixbuf = add_border_widget(pixbuf, self)
+
+            def get_pixbuf():
+                return scale(pixbuf, (width - 2 * scale_factor,
+                                      height - 2 * scale_factor))
+
+            surface = get_cover_surface(
+                self, self._path, self._mtime, (width, height), get_pixbuf)
         else:
             pixbuf = scale(pixbuf, (width, height))
+            surface = get_surface_for_pixbuf(self, pixbuf)
 
         style_context = self.get_style_context()
 
-        surface = get_surface_for_pixbuf(self, pixbuf)
         Gtk.render_icon_surface(style_context, cairo_context, surface, 0, 0)
 
 
@@ -98,9 +98,9 @@ def add_border(pixbuf, color, width=1, radius=0):
     return Gdk.pixbuf_get_from_surface(surface, 0, 0, w, h)
 
 
-def add_border_widget(pixbuf, widget):
-    """Like add_border() but uses the widget to get a border color and a
-    border width.
+def get_border_style(widget):
+    """Returns a (color, width, radius) tuple of what add_border_widget()
+    would use for the widget. color is a Gdk.RGBA
     """
 
     context = widget.get_style_context()
@@ -108,7 +108,16 @@ def add_border_widget(pixbuf, widget):
     scale_factor = widget.get_scale_factor()
     border_radius = get_border_radius() * scale_factor
 
-    return add_border(pixbuf, color, width=scale_factor, radius=border_radius)
+    return color, scale_factor, border_radius
+
+
+def add_border_widget(pixbuf, widget):
+    """Like add_border() but uses the widget to get a border color and a
+    border width.
+    """
+
+    color, width, radius = get_border_style(widget)
+    return add_border(pixbuf, color, width=width, radius=radius)
 
 
 def scale(pixbuf, boundary, scale_up=True, force_copy=False):
@@ -259,8 +259,9 @@ class PlayOrderWidget(Gtk.HBox):
 
         self._shuffle_orders = PluggableOrders(DEFAULT_SHUFFLE_ORDERS, Reorder)
         self.__shuffle_widget = create_shuffle(self._shuffle_orders)
-        self._shuffle_orders.connect('updated',
-                                     self.__shuffle_widget.set_orders)
+        self._shuffle_orders.connect(
+            'updated', self.__orders_updated, self.__shuffle_widget,
+            self.__get_shuffle_class)
 
         def create_repeat(orders):
             repeat = ToggledPlayOrderMenu(
@@ -274,7 +275,9 @@ class PlayOrderWidget(Gtk.HBox):
             return repeat
         self._repeat_orders = PluggableOrders(DEFAULT_REPEAT_ORDERS, Repeat)
         self.__repeat_widget = create_repeat(self._repeat_orders)
-        self._repeat_orders.connect('updated', self.__repeat_widget.set_orders)
+        self._repeat_orders.connect(
+            'updated', self.__orders_updated, self.__repeat_widget,
+            self.__get_repeat_class)
 
         self.__compose_order()
         self.pack_start(self.__shuffle_widget, False, True, 0)
@@ -315,6 +318,20 @@ class PlayOrderWidget(Gtk.HBox):
     def repeated(self, enabled):
         self.__repeat_widget.enabled = bool(enabled)
 
+    def __orders_updated(self, orders, widget, get_class):
+        # Plugins providing the configured order can get loaded after
+        # the widget got created, or the one in use can go away
+        cls = get_class()
+        if widget.current is not cls:
+            inhibit = self.__inhibit
+            self.__inhibit = True
+            widget.current = cls
+            self.__inhibit = inhibit
+            widget.set_orders(orders)
+            self.__compose_order()
+        else:
+            widget.set_orders(orders)
+
     def __repeat_updated(self, widget, repeat_cls):
         if self.__inhibit:
             return
@@ -30,7 +30,8 @@ from quodlibet.qltk.x import Button, Align
 from quodlibet.qltk import Icons
 from quodlibet.util import copool, format_time_preferred
 from quodlibet.util.dprint import print_d
-from quodlibet.util.library import emit_signal, get_scan_dirs, scan_library
+from quodlibet.util.library import emit_signal, get_scan_dirs, \
+    scan_library, update_library_watcher
 from quodlibet.util import connect_obj
 
 
@@ -640,6 +641,13 @@ class PreferencesWindow(UniqueWindow):
 
             cb = CCB(_("Scan library _on start"),
                      "library", "refresh_on_start", populate=True)
+
+            watch = CCB(_("_Watch directories for changes"),
+                        "library", "watch", populate=True,
+                        tooltip=_("Add, update and remove songs as soon "
+                                  "as their files change"))
+            watch.connect(
+                "toggled", lambda *x: update_library_watcher(app.library))
             scan_dirs = ScanBox()
 
             vb3 = Gtk.VBox(spacing=6)
@@ -664,6 +672,7 @@ class PreferencesWindow(UniqueWindow):
             grid = Gtk.Grid(column_spacing=6, row_spacing=6)
             cb.props.hexpand = True
             grid.attach(cb, 0, 0, 1, 1)
+            grid.attach(watch, 0, 1, 1, 1)
             grid.attach(refresh, 1, 0, 1, 1)
             grid.attach(reload_, 1, 1, 1, 1)
 
@@ -737,3 +746,4 @@ class PreferencesWindow(UniqueWindow):
         if self.current_scan_dirs != get_scan_dirs():
             print_d("Library paths have changed, re-scanning...")
             scan_library(app.library, force=False)
+            update_library_watcher(app.library)
@@ -57,7 +57,8 @@ from quodlibet.qltk.about import AboutDialog
 from quodlibet.util import copool, connect_destroy, connect_after_destroy
 from quodlibet.util.library import get_scan_dirs
 from quodlibet.util import connect_obj, print_d
-from quodlibet.util.library import background_filter, scan_library
+from quodlibet.util.library import background_filter, scan_library, \
+    update_library_watcher
 from quodlibet.util.path import uri_is_valid
 from quodlibet.qltk.window import PersistentWindowMixin, Window, on_first_map
 from quodlibet.qltk.songlistcolumns import SongListColumn
@@ -827,6 +828,7 @@ class QuodLibetWindow(Window, PersistentWindowMixin, AppWindow):
 
         if config.getboolean('library', 'refresh_on_start'):
             self.__rebuild(None, False)
+        update_library_watcher(library)
 
         self.connect("key-press-event", self.__key_pressed, player)
 
@@ -1241,6 +1243,7 @@ class QuodLibetWindow(Window, PersistentWindowMixin, AppWindow):
                 self.remove_accel_group(self.browser.accelerators)
             container.destroy()
             self.browser.destroy()
+        browsers.prepare(Browser)
         self.browser = Browser(library)
         self.browser.connect('songs-selected',
             self.__browser_cb, library, player)
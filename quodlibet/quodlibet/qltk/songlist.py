@@ -134,6 +134,23 @@ def set_columns(vals):
     config.setstringlist("settings", "columns", vals)
 
 
+def _sort_by_keys(items, sort_keys):
+    """Sorts `items` in place, with the same result as sorting by each
+    (key function, reverse) in `sort_keys` one after another.
+    """
+
+    reverses = {r for k, r in sort_keys}
+    if len(reverses) == 1:
+        # all in the same direction, so sort once using all keys,
+        # the last one being the most significant
+        funcs = [k for k, r in reversed(sort_keys)]
+        items.sort(key=lambda i: [f(i) for f in funcs],
+                   reverse=reverses.pop())
+    else:
+        for key, reverse in sort_keys:
+            items.sort(key=key, reverse=reverse)
+
+
 def get_sort_tag(tag):
     """Returns a tag that can be used for sorting for the given column tag.
 
@@ -486,11 +503,7 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
                 c.set_sort_indicator(False)
 
         if refresh:
-            songs = self.get_songs()
-            if reversed_:
-                # python sort is faster if presorted
-                songs.reverse()
-            self.set_songs(songs, scroll_select=True)
+            self._resort(reversed_)
 
         self.emit("orders-changed")
 
@@ -734,9 +747,12 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
             return []
         return model.get()
 
-    def _sort_songs(self, songs):
-        """Sort passed songs in place based on the column sort orders"""
+    def _get_sort_keys(self):
+        """Returns a list of (key function, reverse) tuples. Sorting
+        the songs by each of them in order gives the column sort order.
+        """
 
+        keys = []
         last_tag = None
         last_order = None
         first = True
@@ -746,7 +762,7 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
             # always sort using the default sort key first
             if first:
                 first = False
-                songs.sort(key=lambda s: s.sort_key, reverse=reverse)
+                keys.append((lambda s: s.sort_key, reverse))
                 last_order = reverse
                 last_tag = ""
 
@@ -757,10 +773,39 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
             last_tag = tag
 
             if tag == "":
-                songs.sort(key=lambda s: s.sort_key, reverse=reverse)
+                keys.append((lambda s: s.sort_key, reverse))
             else:
-                sort_func = AudioFile.sort_by_func(tag)
-                songs.sort(key=sort_func, reverse=reverse)
+                keys.append((AudioFile.sort_by_func(tag), reverse))
+        return keys
+
+    def _sort_songs(self, songs):
+        """Sort passed songs in place based on the column sort orders"""
+
+        _sort_by_keys(songs, self._get_sort_keys())
+
+    def _resort(self, presort_reversed=False):
+        """Sort the songs in the model again by moving the rows, which
+        keeps the selection and is cheaper than filling the model again.
+        """
+
+        model = self.get_model()
+        songs = model.get()
+        order = list(xrange(len(songs)))
+        if presort_reversed:
+            # python sort is faster if presorted
+            order.reverse()
+
+        sort_keys = [((lambda i, f=f: f(songs[i])), r)
+                     for f, r in self._get_sort_keys()]
+        _sort_by_keys(order, sort_keys)
+        if len(order) > 1:
+            model.reorder(order)
+
+        # scroll to the first selected or current song
+        paths = self.get_selection().get_selected_rows()[1]
+        path = paths[0] if paths else model.current_path
+        if path is not None:
+            self.scroll_to_cell(path, use_align=True, row_align=0.5)
 
     def add_songs(self, songs):
         """Add songs to the list in the right order and position"""
@@ -777,14 +822,55 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
             model.append_many(songs)
             return
 
-        # FIXME: Replace with something fast
+        songs = list(songs)
+        self._sort_songs(songs)
+
+        # the last sort is the most significant one and songs which
+        # compare equal keep their order, so compare the keys in
+        # reverse and put new songs after equal old ones
+        sort_keys = self._get_sort_keys()[::-1]
+        funcs = [k for k, r in sort_keys]
+        reverses = [r for k, r in sort_keys]
+
+        def get_keys(song):
+            return [f(song) for f in funcs]
+
+        def sorts_before(a, b):
+            for ka, kb, reverse in zip(a, b, reverses):
+                if ka != kb:
+                    return ka > kb if reverse else ka < kb
+            return False
+
         old_songs = self.get_songs()
-        old_songs.extend(songs)
+        old_keys = {}
 
-        self._sort_songs(old_songs)
+        def get_old_keys(index):
+            try:
+                return old_keys[index]
+            except KeyError:
+                keys = old_keys[index] = get_keys(old_songs[index])
+                return keys
+
+        # new songs are sorted, so each position is at least the last one
+        runs = []
+        lo = 0
+        for song in songs:
+            keys = get_keys(song)
+            hi = len(old_songs)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if sorts_before(keys, get_old_keys(mid)):
+                    hi = mid
+                else:
+                    lo = mid + 1
+            if runs and runs[-1][0] == lo:
+                runs[-1][1].append(song)
+            else:
+                runs.append((lo, [song]))
 
-        for index, song in sorted(zip(map(old_songs.index, songs), songs)):
-            model.insert(index, row=[song])
+        # back to front, so the positions stay valid
+        for index, run in reversed(runs):
+            model.insert_many(index, run)
 
     def set_songs(self, songs, sorted=False, scroll=True, scroll_select=False):
         """Fill the song list.
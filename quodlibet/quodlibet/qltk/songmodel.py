@@ -6,12 +6,11 @@
 # it under the terms of the GNU General Public License version 2 as
 # published by the Free Software Foundation
 
-from gi.repository import Gtk
+from gi.repository import Gtk, GObject
 
 from quodlibet.qltk.playorder import OrderInOrder
 from quodlibet.qltk.models import ObjectStore
 from quodlibet.util import print_d
-from quodlibet.compat import izip
 
 
 class PlaylistMux(object):
@@ -123,10 +122,44 @@ class TrackCurrentModel(ObjectStore):
     def __init__(self, *args, **kwargs):
         super(TrackCurrentModel, self).__init__(*args, **kwargs)
         self.__iter = None
+        # value -> list of iters of rows containing it, which works since
+        # ListStore iters stay valid as long as their row exists
+        self.__index = {}
 
     last_current = None
     """The last valid current song"""
 
+    def insert_with_valuesv(self, position, columns, values):
+        iter_ = super(TrackCurrentModel, self).insert_with_valuesv(
+            position, columns, values)
+        value = values[0]
+        if isinstance(value, GObject.Value):
+            value = self.get_value(iter_)
+        self.__index.setdefault(value, []).append(iter_.copy())
+        return iter_
+
+    def set_value(self, iter_, column, value):
+        self.__unindex(iter_)
+        super(TrackCurrentModel, self).set_value(iter_, column, value)
+        self.__index.setdefault(self.get_value(iter_), []).append(
+            iter_.copy())
+
+    def __unindex(self, iter_):
+        value = self.get_value(iter_)
+        iters = self.__index.get(value)
+        if iters is None:
+            return
+        user_data = iter_.user_data
+        for i, other in enumerate(iters):
+            if other.user_data == user_data:
+                del iters[i]
+                break
+        if not iters:
+            del self.__index[value]
+
+    def __position(self, iter_):
+        return self.get_path(iter_).get_indices()[0]
+
     def set(self, songs):
         """Clear the model and add the passed songs"""
 
@@ -134,10 +167,10 @@ class TrackCurrentModel(ObjectStore):
         self.clear()
         self.__iter = None
 
+        self.append_many(songs)
         oldsong = self.last_current
-        for iter_, song in izip(self.iter_append_many(songs), songs):
-            if song is oldsong:
-                self.__iter = iter_
+        if oldsong is not None:
+            self.__iter = self.find(oldsong)
 
     def get(self):
         """A list of all contained songs"""
@@ -182,36 +215,38 @@ class TrackCurrentModel(ObjectStore):
         if self.current == song:
             return self.current_iter
 
-        # search the rest
-        for iter_, value in self.iterrows():
-            if value == song:
-                return iter_
-        return
+        iters = self.__index.get(song)
+        if not iters:
+            return
+        if len(iters) == 1:
+            return iters[0].copy()
+        return min(iters, key=self.__position).copy()
 
     def find_all(self, songs):
         """Returns a list of iters for all occurrences of all songs.
         (since a song can be in the model multiple times)
         """
 
-        songs = set(songs)
+        index = self.__index
         found = []
-        append = found.append
-        for iter_, value in self.iterrows():
-            if value in songs:
-                append(iter_)
-        return found
+        for song in set(songs):
+            found.extend(index.get(song, []))
+        found.sort(key=self.__position)
+        return [iter_.copy() for iter_ in found]
 
     def remove(self, iter_):
         if self.__iter and self[iter_].path == self[self.__iter].path:
             self.__iter = None
+        self.__unindex(iter_)
         super(TrackCurrentModel, self).remove(iter_)
 
     def clear(self):
         self.__iter = None
+        self.__index.clear()
         super(TrackCurrentModel, self).clear()
 
     def __contains__(self, song):
-        return bool(self.find(song))
+        return song in self.__index
 
 
 class PlaylistModel(TrackCurrentModel):
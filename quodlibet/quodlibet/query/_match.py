@@ -14,7 +14,7 @@ import operator
 from senf import fsn2text, fsnative
 
 from quodlibet.unisearch import compile
-from quodlibet.compat import floordiv, text_type
+from quodlibet.compat import floordiv, text_type, exec_
 from quodlibet.util import parse_date
 from quodlibet.formats import FILESYSTEM_TAGS, TIME_TAGS
 
@@ -35,6 +35,40 @@ class Node(object):
     def filter(self, sequence):
         return [s for s in sequence if self.search(s)]
 
+    def candidates(self, index):
+        """Returns a set containing at least all songs matching, using
+        the lookup tables of a `SongIndex`, or None if the index can't
+        narrow things down.
+        """
+
+        return None
+
+    def _compile(self, scope):
+        """Returns a Python expression which is true if the object `s`
+        matches. Objects it references get added to `scope`.
+        """
+
+        return "%s(s)" % _add_to_scope(scope, self.search)
+
+    def _estimate(self, index):
+        """Returns a (cost, fraction of songs matching) tuple.
+
+        The cost is relative to looking up a plain tag, see `COST_TAG`.
+        With a `SongIndex` the fractions come from the library content.
+        """
+
+        return COST_UNKNOWN, 0.5
+
+    def _optimize(self, index):
+        """Returns a node with the same result where the cheaper and more
+        decisive parts get evaluated first, and its `_estimate`.
+
+        Every node of the tree gets planned once, so nodes combining
+        others compute their estimate while optimizing.
+        """
+
+        return self, self._estimate(index)
+
     def _unpack(self):
         return self
 
@@ -48,11 +82,122 @@ class Node(object):
         return Neg(self._unpack())
 
 
+COST_NUMERIC = 1
+COST_TAG = 2
+COST_SYNTHESIZED = 8
+COST_FILESYSTEM = 16
+COST_UNKNOWN = 20
+COST_EXTENSION = 100
+
+
+def _and_rank(estimate):
+    # cheap and likely to fail first
+    cost, fraction = estimate
+    return cost / (1.0 - fraction) if fraction < 1 else float("inf")
+
+
+def _or_rank(estimate):
+    # cheap and likely to succeed first
+    cost, fraction = estimate
+    return cost / fraction if fraction > 0 else float("inf")
+
+
+def _reorder(res, index, rank):
+    """Returns the optimized children sorted by rank and their combined
+    (cost, fraction) estimate for short-circuit evaluation, `and` if
+    `rank` is `_and_rank` else `or`.
+    """
+
+    planned = [re._optimize(index) for re in res]
+    res = [node for node, estimate in planned]
+    estimates = [estimate for node, estimate in planned]
+    order = sorted(range(len(res)), key=lambda i: rank(estimates[i]))
+
+    is_and = rank is _and_rank
+    cost = 0.0
+    # the fraction of songs getting past the children so far
+    todo = 1.0
+    for i in order:
+        sub_cost, fraction = estimates[i]
+        cost += todo * sub_cost
+        todo *= fraction if is_and else 1.0 - fraction
+    fraction = todo if is_and else 1.0 - todo
+    return [res[i] for i in order], (cost, fraction)
+
+
+def _describe(node):
+    if isinstance(node, (Union, Inter)):
+        return type(node).__name__
+    elif isinstance(node, Neg):
+        return "Neg"
+    return repr(node)
+
+
+def explain(node, index=None):
+    """Returns a text describing the optimized evaluation order of the
+    node tree, with the estimated cost and fraction of matching songs
+    for each node.
+    """
+
+    lines = []
+
+    def add(node, depth):
+        cost, fraction = node._estimate(index)
+        lines.append(u"%s%s (cost=%.1f, matches=%.0f%%)" % (
+            u"  " * depth, _describe(node), cost, fraction * 100))
+        if isinstance(node, (Union, Inter)):
+            for sub in node.res:
+                add(sub, depth + 1)
+        elif isinstance(node, Neg):
+            add(node.res, depth + 1)
+
+    add(node._optimize(index)[0], 0)
+    return u"\n".join(lines)
+
+
+_REGEX_SPECIAL = u".^$*+?{}[]|()"
+
+
+def _literal_prefix(pattern):
+    """If the regex only matches lines starting with a fixed ASCII text
+    returns a (lower cased text, matches whole line) tuple, else None.
+    """
+
+    if pattern[:1] != u"^":
+        return None
+
+    text = []
+    exact = False
+    chars = iter(pattern[1:])
+    for c in chars:
+        if c == u"\\":
+            c = next(chars, u"")
+            if not c or c.isalnum():
+                # things like \d or \n
+                return None
+        elif c == u"$":
+            if next(chars, None) is not None:
+                return None
+            exact = True
+            break
+        elif c in _REGEX_SPECIAL:
+            return None
+        text.append(c)
+
+    text = u"".join(text)
+    try:
+        text.encode("ascii")
+    except UnicodeError:
+        return None
+    return text.lower(), exact
+
+
 class Regex(Node):
 
     def __init__(self, pattern, mod_string):
         self.pattern = text_type(pattern)
         self.mod_string = text_type(mod_string)
+        self.literal = _literal_prefix(self.pattern)
 
         ignore_case = "c" not in self.mod_string or "i" in self.mod_string
         dot_all = "s" in self.mod_string
@@ -73,6 +218,12 @@ class True_(Node):
     def search(self, data):
         return True
 
+    def _compile(self, scope):
+        return "True"
+
+    def _estimate(self, index):
+        return 0, 1.0
+
     def filter(self, list_):
         return list(list_)
 
@@ -93,9 +244,18 @@ class False_(Node):
     def search(self, data):
         return False
 
+    def _compile(self, scope):
+        return "False"
+
+    def _estimate(self, index):
+        return 0, 0.0
+
     def filter(self, list_):
         return []
 
+    def candidates(self, index):
+        return set()
+
     def __repr__(self):
         return "<False>"
 
@@ -119,6 +279,36 @@ class Union(Node):
                 return True
         return False
 
+    def candidates(self, index):
+        result = set()
+        for re in self.res:
+            found = re.candidates(index)
+            if found is None:
+                return None
+            result |= found
+        return result
+
+    def _compile(self, scope):
+        parts = []
+        for re in self.res:
+            part = re._compile(scope)
+            if part == "True":
+                return part
+            elif part != "False":
+                parts.append(part)
+        if not parts:
+            return "False"
+        elif len(parts) == 1:
+            return parts[0]
+        return "(%s)" % " or ".join(parts)
+
+    def _estimate(self, index):
+        return self._optimize(index)[1]
+
+    def _optimize(self, index):
+        res, estimate = _reorder(self.res, index, _or_rank)
+        return (res[0] if len(res) == 1 else Union(res)), estimate
+
     def __repr__(self):
         return "<Union %r>" % self.res
 
@@ -161,6 +351,39 @@ class Inter(Node):
             current = list(current)
         return current
 
+    def candidates(self, index):
+        result = None
+        for re in self.res:
+            found = re.candidates(index)
+            if found is None:
+                continue
+            if result is None:
+                result = found
+            else:
+                result &= found
+        return result
+
+    def _compile(self, scope):
+        parts = []
+        for re in self.res:
+            part = re._compile(scope)
+            if part == "False":
+                return part
+            elif part != "True":
+                parts.append(part)
+        if not parts:
+            return "True"
+        elif len(parts) == 1:
+            return parts[0]
+        return "(%s)" % " and ".join(parts)
+
+    def _estimate(self, index):
+        return self._optimize(index)[1]
+
+    def _optimize(self, index):
+        res, estimate = _reorder(self.res, index, _and_rank)
+        return (res[0] if len(res) == 1 else Inter(res)), estimate
+
     def __repr__(self):
         return "<Inter %r>" % self.res
 
@@ -191,6 +414,22 @@ class Neg(Node):
     def search(self, data):
         return not self.res.search(data)
 
+    def _compile(self, scope):
+        part = self.res._compile(scope)
+        if part == "True":
+            return "False"
+        elif part == "False":
+            return "True"
+        return "(not %s)" % part
+
+    def _estimate(self, index):
+        cost, fraction = self.res._estimate(index)
+        return cost, 1.0 - fraction
+
+    def _optimize(self, index):
+        res, (cost, fraction) = self.res._optimize(index)
+        return Neg(res), (cost, 1.0 - fraction)
+
     def __repr__(self):
         return "<Neg %r>" % self.res
 
@@ -223,6 +462,15 @@ class Numcmp(Node):
         "!=": operator.ne,
     }
 
+    _reversed = {
+        operator.lt: operator.gt,
+        operator.le: operator.ge,
+        operator.gt: operator.lt,
+        operator.ge: operator.le,
+        operator.eq: operator.eq,
+        operator.ne: operator.ne,
+    }
+
     def __init__(self, expr, op, expr2):
         self._expr = expr
         self._op = self.operators[op]
@@ -237,6 +485,52 @@ class Numcmp(Node):
             return self._op(val, val2)
         return False
 
+    def _range(self):
+        """Returns a (tag, lower, upper) tuple of the range of stored
+        values which can match, or None
+        """
+
+        expr, op, expr2 = self._expr, self._op, self._expr2
+        if isinstance(expr, NumexprNumber):
+            expr, expr2 = expr2, expr
+            op = self._reversed.get(op)
+        if type(expr) is not NumexprTag or type(expr2) is not NumexprNumber \
+                or expr.use_date() or ":" in expr._ftag:
+            return None
+
+        value = expr2._value
+        if expr._ftag in TIME_TAGS:
+            # compared to the age: now - stored value. The query might
+            # get evaluated a bit later, so leave some room
+            value = time.time() - value
+            op = self._reversed.get(op)
+            margin = 60
+        else:
+            # to cover rounding to two decimals
+            margin = 0.01
+
+        lower = upper = None
+        if op in (operator.lt, operator.le, operator.eq):
+            upper = value + margin
+        if op in (operator.gt, operator.ge, operator.eq):
+            lower = value - margin
+        if lower is None and upper is None:
+            return None
+        return expr._ftag, lower, upper
+
+    def candidates(self, index):
+        range_ = self._range()
+        if range_ is None:
+            return None
+        return index.numeric_candidates(*range_)
+
+    def _estimate(self, index):
+        range_ = self._range()
+        if range_ is None or index is None or not len(index):
+            return COST_NUMERIC, 0.5
+        count = index.numeric_count(*range_)
+        return COST_NUMERIC, min(float(count) / len(index), 1.0)
+
     def __repr__(self):
         return "<Numcmp expr=%r, op=%r, expr2=%r>" % (
             self._expr, self._op.__name__, self._expr2)
@@ -524,14 +818,7 @@ class Tag(Node):
         fs_default = fsnative()
 
         for name in self._names:
-            val = data.get(name)
-            if val is None:
-                if name in ("filename", "mountpoint"):
-                    val = fsn2text(data.get("~" + name, fs_default))
-                else:
-                    val = data.get("~" + name, u"")
-
-            if search(val):
+            if search(_tag_value(data, name)):
                 return True
 
         for name in self.__intern:
@@ -544,6 +831,55 @@ class Tag(Node):
 
         return False
 
+    def _compile(self, scope):
+        res = self.res._unpack()
+        if isinstance(res, True_):
+            return "True" if self._names or self.__intern or self.__fs \
+                else "False"
+        elif isinstance(res, False_):
+            return "False"
+
+        search = _add_to_scope(scope, res.search)
+        parts = []
+        for name in self._names:
+            parts.append("%s(_tag_value(s, %r))" % (search, name))
+        for name in self.__intern:
+            parts.append("%s(s(%r))" % (search, name))
+        for name in self.__fs:
+            parts.append(
+                "%s(_fsn2text(s(%r, _fs_default)))" % (search, name))
+
+        if not parts:
+            return "False"
+        return "(%s)" % " or ".join(parts)
+
+    def _estimate(self, index):
+        cost = (COST_TAG * len(self._names) +
+                COST_SYNTHESIZED * len(self.__intern) +
+                COST_FILESYSTEM * len(self.__fs))
+
+        # chance of no name matching
+        missing = 1.0
+        for name in self._names:
+            missing *= 1.0 - _value_fraction(self.res, index, name)
+        for name in self.__intern + self.__fs:
+            missing *= 1.0 - _value_fraction(self.res, None, name)
+        return cost, 1.0 - missing
+
+    def candidates(self, index):
+        if self.__intern or self.__fs:
+            return None
+
+        result = set()
+        for name in self._names:
+            if name in ("filename", "mountpoint"):
+                return None
+            found = _value_candidates(self.res, index, name)
+            if found is None:
+                return None
+            result |= found
+        return result
+
     def __repr__(self):
         names = self._names + self.__intern
         return ("<Tag names=%r, res=%r>" % (names, self.res))
@@ -561,6 +897,107 @@ class Tag(Node):
         return Union([self, other])
 
 
+def _tag_value(data, name):
+    """The value Tag matches against for a plain tag name"""
+
+    val = data.get(name)
+    if val is None:
+        if name in ("filename", "mountpoint"):
+            val = fsn2text(data.get("~" + name, fsnative()))
+        else:
+            val = data.get("~" + name, u"")
+    return val
+
+
+def _add_to_scope(scope, obj):
+    name = "_%d" % len(scope)
+    scope[name] = obj
+    return name
+
+
+def compile_search(node):
+    """Returns a function taking an object and returning whether the node
+    matches it. Same result as node.search, but without the method calls
+    for each node in the tree and with constant sub trees folded.
+    """
+
+    scope = {}
+    try:
+        expr = node._compile(scope)
+        code = "def f(s):\n  return True if %s else False" % expr
+        scope.update({
+            "_tag_value": _tag_value,
+            "_fsn2text": fsn2text,
+            "_fs_default": fsnative(),
+        })
+        exec_(code, scope)
+    except (SyntaxError, RuntimeError, MemoryError):
+        # too deeply nested for the Python parser
+        return node.search
+    return scope["f"]
+
+
+def _value_candidates(node, index, name):
+    """Like Node.candidates() but for the value part of a Tag"""
+
+    if isinstance(node, Regex):
+        if node.literal is None:
+            return None
+        text, exact = node.literal
+        return index.text_candidates(name, text, exact)
+    elif isinstance(node, Union):
+        result = set()
+        for sub in node.res:
+            found = _value_candidates(sub, index, name)
+            if found is None:
+                return None
+            result |= found
+        return result
+    elif isinstance(node, Inter):
+        result = None
+        for sub in node.res:
+            found = _value_candidates(sub, index, name)
+            if found is not None:
+                result = found if result is None else result & found
+        return result
+    return None
+
+
+def _value_fraction(node, index, name):
+    """Estimates the fraction of songs for which the value of the tag
+    `name` matches the value node of a Tag.
+    """
+
+    node = node._unpack()
+    if isinstance(node, True_):
+        return 1.0
+    elif isinstance(node, False_):
+        return 0.0
+    elif isinstance(node, Regex):
+        if node.literal is None:
+            return 0.5
+        text, exact = node.literal
+        if index is not None and len(index) and \
+                name not in ("filename", "mountpoint"):
+            count = index.text_count(name, text, exact)
+            return min(float(count) / len(index), 1.0)
+        # the longer the text, the fewer values start with it
+        return 0.05 if exact else 0.5 / (len(text) + 1)
+    elif isinstance(node, Neg):
+        return 1.0 - _value_fraction(node.res, index, name)
+    elif isinstance(node, Union):
+        missing = 1.0
+        for sub in node.res:
+            missing *= 1.0 - _value_fraction(sub, index, name)
+        return 1.0 - missing
+    elif isinstance(node, Inter):
+        fraction = 1.0
+        for sub in node.res:
+            fraction *= _value_fraction(sub, index, name)
+        return fraction
+    return 0.5
+
+
 class Extension(Node):
     """Plugin-defined query extension
 
@@ -592,6 +1029,11 @@ class Extension(Node):
     def search(self, data):
         return self.__valid and self.__plugin.search(data, self.__body)
 
+    def _estimate(self, index):
+        if not self.__valid:
+            return 0, 0.0
+        return COST_EXTENSION, 0.5
+
     def __repr__(self):
         return ('<Extension name=%r valid=%r body=%r>'
                 % (self.__name, self.__valid, self.__body))
@@ -7,6 +7,9 @@
 # it under the terms of the GNU General Public License version 2 as
 # published by the Free Software Foundation
 
+import re
+import unicodedata
+
 from quodlibet import print_d
 from quodlibet.util.dprint import frame_info
 from . import _match as match
@@ -14,6 +17,15 @@ from ._match import error, Node, False_
 from ._parser import QueryParser
 from quodlibet.util import re_escape, enum, cached_property
 from quodlibet.compat import PY2, text_type
+from quodlibet.unisearch.db import get_replacement_mapping
+
+
+def _filter_func(search):
+
+    def filter_(sequence):
+        return [s for s in sequence if search(s)]
+
+    return filter_
 
 
 @enum
@@ -40,6 +52,9 @@ class Query(Node):
     stars = None
     """List of default tags used"""
 
+    _words = None
+    """The search words in case of a TEXT query"""
+
     def __init__(self, string, star=None):
         """Parses the query string and returns a match object.
 
@@ -76,13 +91,15 @@ class Query(Node):
             pass
 
         if not set("#=").intersection(string):
-            parts = ["/%s/d" % re_escape(s) for s in string.split()]
+            words = string.split()
+            parts = ["/%s/d" % re_escape(s) for s in words]
             string = "&(" + ",".join(parts) + ")"
             self.string = string
 
             try:
                 self.type = QueryType.TEXT
                 self._match = QueryParser(string, star=star).StartQuery()
+                self._words = words
                 return
             except self.error:
                 pass
@@ -108,11 +125,53 @@ class Query(Node):
 
     @cached_property
     def search(self):
-        return self._match.search
+        return match.compile_search(self._match._optimize(None)[0])
+
+    def planned_filter(self, index):
+        """Returns a function like `filter`, but with the evaluation order
+        planned using the statistics of a `SongIndex` (e.g.
+        `SongLibrary.index`), so the parts which rule out the most songs
+        for the least work get checked first.
+        """
+
+        if self.matches_all:
+            return self._match.filter
+
+        plan = self._match._optimize(index)[0]
+        return _filter_func(match.compile_search(plan))
+
+    def explain(self, index=None):
+        """Returns a text describing in which order the query gets
+        evaluated and the estimated cost and matches of each part.
+        """
+
+        return match.explain(self._match, index)
 
     @cached_property
     def filter(self):
-        return self._match.filter
+        if self.matches_all:
+            return self._match.filter
+
+        return _filter_func(self.search)
+
+    def candidates(self, index):
+        return self._match.candidates(index)
+
+    def is_refinement_of(self, other):
+        """Whether all songs matching this query are known to match
+        `other` as well.
+
+        Only detects TEXT queries containing extended versions of the
+        words of the other one, like when typing "foo" after "fo", so
+        the result of `other` can be filtered instead of the library.
+        """
+
+        if self.type != QueryType.TEXT or other.type != QueryType.TEXT or \
+                self.star != other.star:
+            return False
+
+        return all(any(_contains_word(new, old) for new in self._words)
+                   for old in other._words)
 
     @property
     def valid(self):
@@ -157,3 +216,47 @@ class Query(Node):
         elif type_ == QueryType.INVALID:
             return False
         return None
+
+
+_variants_re = None
+
+
+def _variant_spans(text):
+    """The spans of `text` which the unisearch module replaces with
+    variants, found the same way it does.
+    """
+
+    global _variants_re
+
+    if _variants_re is None:
+        keys = sorted(get_replacement_mapping(), key=len, reverse=True)
+        _variants_re = re.compile(
+            u"(%s)" % u"|".join(map(re_escape, keys)), re.UNICODE)
+    return [m.span() for m in _variants_re.finditer(text)]
+
+
+def _contains_word(word, part):
+    """If the search pattern of `part` matches whenever the one of `word`
+    does.
+
+    True if `word` contains `part` and the characters around it don't
+    change how it gets matched, unlike "s" in "ss", which also matches
+    "\xdf", or "e" followed by a combining accent.
+    """
+
+    if part not in word or unicodedata.normalize("NFC", word) != word:
+        return False
+
+    word_spans = _variant_spans(word)
+    part_spans = _variant_spans(part)
+    start = word.find(part)
+    while start != -1:
+        end = start + len(part)
+        spans = []
+        for s, e in word_spans:
+            if s < end and e > start:
+                spans.append((s - start, e - start))
+        if spans == part_spans:
+            return True
+        start = word.find(part, start + 1)
+    return False
@@ -11,6 +11,7 @@ from __future__ import absolute_import
 
 import os
 import random
+import hashlib
 
 from senf import fsnative, fsn2bytes, bytes2fsn
 
@@ -23,7 +24,8 @@ from quodlibet.compat import xrange, text_type, number_types, string_types, \
     swap_to_string, listmap
 from collections import Iterable
 from quodlibet.util.path import escape_filename, unescape_filename
-from quodlibet.util.dprint import print_d
+from quodlibet.util.atomic import atomic_save
+from quodlibet.util.dprint import print_d, print_w
 from quodlibet.util.misc import total_ordering, hashable
 from .collections import HashedList
 
@@ -45,9 +47,13 @@ def avg(nums):
 def bayesian_average(nums, c=None, m=None):
     """Returns the Bayesian average of an iterable of numbers,
     with parameters defaulting to config specific to ~#rating."""
+    return _bayesian_average(sum(nums), len(nums), c, m)
+
+
+def _bayesian_average(total, count, c=None, m=None):
     m = m or config.RATINGS.default
     c = c or config.getfloat("settings", "bayesian_rating_factor", 0.0)
-    ret = float(m * c + sum(nums)) / (c + len(nums))
+    ret = float(m * c + total) / (c + count)
     return ret
 
 NUM_DEFAULT_FUNCS = {
@@ -72,6 +78,228 @@ NUM_FUNCS = {
     "bav": bayesian_average
 }
 
+# same as NUM_FUNCS but using _NumericStats
+_STATS_FUNCS = {
+    "max": lambda s: s.max,
+    "min": lambda s: s.min,
+    "sum": lambda s: s.total,
+    "avg": lambda s: float(s.total) / s.count,
+    "bav": lambda s: _bayesian_average(s.total, s.count),
+}
+
+
+class _NumericStats(object):
+    """Count, sum, minimum and maximum of the values of a numeric tag.
+
+    Songs without a value aren't counted. Songs without a rating get
+    the current default rating.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.count = 0
+        # song -> [value or None for the default, number of occurrences]
+        self._values = {}
+        self._defaults = 0
+        # None if they need to be computed again
+        self._total = 0
+        self._min = None
+        self._max = None
+
+    def _value(self, song):
+        key = self.key
+        if key == "~#rating" and key not in song:
+            return None
+        return song(key)
+
+    def add(self, songs):
+        values = self._values
+        for song in songs:
+            entry = values.get(song)
+            if entry is None:
+                value = self._value(song)
+                if value == "":
+                    continue
+                entry = values[song] = [value, 0]
+            entry[1] += 1
+            self.count += 1
+
+            value = entry[0]
+            if value is None:
+                self._defaults += 1
+                continue
+            if self._total is not None:
+                self._total += value
+            if self._min is not None and value < self._min:
+                self._min = value
+            if self._max is not None and value > self._max:
+                self._max = value
+
+    def remove(self, songs):
+        values = self._values
+        for song in songs:
+            entry = values.get(song)
+            if entry is None:
+                continue
+            entry[1] -= 1
+            if not entry[1]:
+                del values[song]
+            self.count -= 1
+
+            value = entry[0]
+            if value is None:
+                self._defaults -= 1
+                continue
+            if isinstance(value, float):
+                # don't let rounding errors add up
+                self._total = None
+            elif self._total is not None:
+                self._total -= value
+            if value == self._min:
+                self._min = None
+            if value == self._max:
+                self._max = None
+
+    def _numbers(self):
+        return [e[0] for e in self._values.values() if e[0] is not None]
+
+    @property
+    def total(self):
+        if self._total is None:
+            self._total = sum(
+                e[0] * e[1] for e in self._values.values()
+                if e[0] is not None)
+        if self._defaults:
+            return self._total + self._defaults * config.RATINGS.default
+        return self._total
+
+    @property
+    def min(self):
+        if self._min is None and self.count > self._defaults:
+            self._min = min(self._numbers())
+        if self._defaults:
+            if self._min is None:
+                return config.RATINGS.default
+            return min(self._min, config.RATINGS.default)
+        return self._min
+
+    @property
+    def max(self):
+        if self._max is None and self.count > self._defaults:
+            self._max = max(self._numbers())
+        if self._defaults:
+            if self._max is None:
+                return config.RATINGS.default
+            return max(self._max, config.RATINGS.default)
+        return self._max
+
+
+class _PeopleScores(object):
+    """Ranks people by "relevance" -- artists before composers before
+    performers, then by number of appearances.
+    """
+
+    def __init__(self):
+        self.scores = {"people": {}, "peoplesort": {}}
+        # song -> [people scores, peoplesort scores, number of occurrences]
+        self._songs = {}
+        self._ranked = {}
+
+    def _song_scores(self, song):
+        people = []
+        peoplesort = []
+        for w, k in enumerate(ELPOEP):
+            persons = song.list(k)
+            for person in persons:
+                people.append((person, PEOPLE_SCORE[w]))
+            if k in TAG_TO_SORT:
+                persons = song.list(TAG_TO_SORT[k]) or persons
+            for person in persons:
+                peoplesort.append((person, PEOPLE_SCORE[w]))
+        return people, peoplesort
+
+    def _apply(self, entry, sign):
+        for key, pairs in zip(["people", "peoplesort"], entry):
+            scores = self.scores[key]
+            for person, score in pairs:
+                value = scores.get(person, 0) - sign * score
+                if value:
+                    scores[person] = value
+                else:
+                    del scores[person]
+        self._ranked.clear()
+
+    def add(self, songs):
+        for song in songs:
+            entry = self._songs.get(song)
+            if entry is None:
+                people, peoplesort = self._song_scores(song)
+                entry = self._songs[song] = [people, peoplesort, 0]
+            entry[2] += 1
+            self._apply(entry[:2], 1)
+
+    def remove(self, songs):
+        for song in songs:
+            entry = self._songs.get(song)
+            if entry is None:
+                continue
+            entry[2] -= 1
+            if not entry[2]:
+                del self._songs[song]
+            self._apply(entry[:2], -1)
+
+    def get(self, key):
+        """Returns the newline separated people for "people" or
+        "peoplesort", or None
+        """
+
+        try:
+            return self._ranked[key]
+        except KeyError:
+            scores = self.scores[key]
+            ranked = sorted(scores.keys(), key=scores.__getitem__)[:100]
+            value = self._ranked[key] = "\n".join(ranked) or None
+            return value
+
+
+class _Aggregates(object):
+    """Values of a collection computed from all its songs, which can be
+    updated when songs get added, removed or changed instead of looking
+    at all songs again. Things only get computed when first needed.
+    """
+
+    def __init__(self):
+        self._numeric = {}
+        self._people = None
+
+    def _tables(self):
+        tables = list(self._numeric.values())
+        if self._people is not None:
+            tables.append(self._people)
+        return tables
+
+    def numeric(self, key, songs):
+        try:
+            return self._numeric[key]
+        except KeyError:
+            stats = self._numeric[key] = _NumericStats(key)
+            stats.add(songs)
+            return stats
+
+    def people(self, songs):
+        if self._people is None:
+            self._people = _PeopleScores()
+            self._people.add(songs)
+        return self._people
+
+    def add(self, songs):
+        for table in self._tables():
+            table.add(songs)
+
+    def remove(self, songs):
+        for table in self._tables():
+            table.remove(songs)
+
 
 class Collection(object):
     """A collection of songs which implements some methods similar to the
@@ -90,6 +318,7 @@ class Collection(object):
         self.__cache = {}
         self.__default = set()
         self.__used = []
+        self.__aggregates = _Aggregates()
 
     def finalize(self):
         """Finalize the collection.
@@ -97,6 +326,23 @@ class Collection(object):
         self.__cache.clear()
         self.__default.clear()
         self.__used = []
+        self.__aggregates = _Aggregates()
+
+    def update(self, added=(), removed=(), changed=()):
+        """Like finalize(), but instead of computing the numeric values
+        and people again from all songs, update them with the songs which
+        got added to, removed from or changed in `songs` since the last
+        call.
+        """
+
+        self.__cache.clear()
+        self.__default.clear()
+        self.__used = []
+        aggregates = self.__aggregates
+        aggregates.remove(removed)
+        aggregates.remove(changed)
+        aggregates.add(changed)
+        aggregates.add(added)
 
     def get(self, key, default=u"", connector=u" - "):
         if not self.songs:
@@ -183,55 +429,20 @@ class Collection(object):
                 func = NUM_DEFAULT_FUNCS.get(key, "avg")
 
             key = "~#" + key
-            func = NUM_FUNCS.get(func)
+            func = _STATS_FUNCS.get(func)
             if func:
                 # If none of the songs can return a numeric key,
                 # the album returns default
-                values = (song(key) for song in self.songs)
-                values = [v for v in values if v != ""]
-                return func(values) if values else None
+                stats = self.__aggregates.numeric(key, self.songs)
+                return func(stats) if stats.count else None
             elif key in NUMERIC_ZERO_DEFAULT:
                 return 0
             return None
         elif key[:1] == "~":
             key = key[1:]
             numkey = key.split(":")[0]
-            keys = {"people": {}, "peoplesort": {}}
-            if key in keys:
-                people = keys["people"]
-                peoplesort = keys["peoplesort"]
-                for song in self.songs:
-                    # Rank people by "relevance" -- artists before composers
-                    # before performers, then by number of appearances.
-                    for w, k in enumerate(ELPOEP):
-                        persons = song.list(k)
-                        for person in persons:
-                            people[person] = (people.get(person, 0) -
-                                              PEOPLE_SCORE[w])
-                        if k in TAG_TO_SORT:
-                            persons = song.list(TAG_TO_SORT[k]) or persons
-                        for person in persons:
-                            peoplesort[person] = (peoplesort.get(person, 0) -
-                                                  PEOPLE_SCORE[w])
-                # It's cheaper to get people and peoplesort in one go
-                keys["people"] = sorted(people.keys(),
-                                        key=people.__getitem__)[:100]
-                keys["peoplesort"] = sorted(peoplesort.keys(),
-                                            key=peoplesort.__getitem__)[:100]
-
-                ret = keys.pop(key)
-                ret = (ret and "\n".join(ret)) or None
-
-                other, values = keys.popitem()
-                other = "~" + other
-                if not values:
-                    self.__default.add(other)
-                else:
-                    if other in self.__used:
-                        self.__used.remove(other)
-                    self.__used.append(other)
-                    self.__cache[other] = "\n".join(values)
-                return ret
+            if key in ("people", "peoplesort"):
+                return self.__aggregates.people(self.songs).get(key)
             elif numkey == "length":
                 length = self.__get_value("~#" + key)
                 return None if length is None else util.format_time(length)
@@ -309,10 +520,70 @@ class Album(Collection):
         self.__dict__.pop("peoplesort", None)
         self.__dict__.pop("genre", None)
 
+    def update(self, *args, **kwargs):
+        super(Album, self).update(*args, **kwargs)
+        self.__dict__.pop("peoplesort", None)
+        self.__dict__.pop("genre", None)
+
     def __repr__(self):
         return "Album(%s)" % repr(self.key)
 
 
+class _PlaylistItems(HashedList):
+    """The items of a playlist, which keep `Playlist.playlists_featuring`
+    up to date.
+    """
+
+    # song -> set of playlists containing it
+    featuring = {}
+
+    def __init__(self, playlist):
+        super(_PlaylistItems, self).__init__()
+        self._playlist = playlist
+        # lowest index changed since reset, None if nothing changed
+        self.dirty_from = 0
+
+    def _touch(self, index):
+        if index is None or \
+                (self.dirty_from is not None and self.dirty_from <= index):
+            return
+        self.dirty_from = index
+
+    def __setitem__(self, index, item):
+        self._touch(self._first_index(index))
+        super(_PlaylistItems, self).__setitem__(index, item)
+
+    def __delitem__(self, index):
+        self._touch(self._first_index(index))
+        super(_PlaylistItems, self).__delitem__(index)
+
+    def insert(self, index, item):
+        length = len(self)
+        if index < 0:
+            index += length
+        self._touch(max(0, min(index, length)))
+        super(_PlaylistItems, self).insert(index, item)
+
+    def _first_index(self, index):
+        length = len(self)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(length)
+            indices = xrange(start, stop, step)
+            return min(indices) if len(indices) else start
+        if index < 0:
+            index += length
+        return index if 0 <= index < length else None
+
+    def _item_added(self, item):
+        self.featuring.setdefault(item, set()).add(self._playlist)
+
+    def _item_removed(self, item):
+        playlists = self.featuring[item]
+        playlists.discard(self._playlist)
+        if not playlists:
+            del self.featuring[item]
+
+
 @hashable
 @swap_to_string
 @total_ordering
@@ -323,15 +594,18 @@ class Playlist(Collection, Iterable):
 
     __instances = []
 
+    __pending = set()
+    __pending_id = None
+
+    WRITE_DELAY = 1000
+    """Time in ms write_later() waits for more changes"""
+
     @classmethod
     def playlists_featuring(cls, song):
-        """Returns the list of playlists in which this song appears"""
+        """Returns the list of playlists in which this song appears,
+        sorted by name"""
 
-        playlists = []
-        for instance in cls.__instances:
-            if song in instance._list:
-                playlists.append(instance)
-        return playlists
+        return sorted(_PlaylistItems.featuring.get(song, ()))
 
     def get(self, key, default=u"", connector=u" - "):
         if key == "~name":
@@ -391,7 +665,7 @@ class Playlist(Collection, Iterable):
 
         self.name = name
         self.library = library
-        self._list = HashedList()
+        self._list = _PlaylistItems(self)
 
     @classmethod
     def suggested_name_for(cls, songs):
@@ -436,6 +710,14 @@ class Playlist(Collection, Iterable):
             self._emit_changed(changed, msg="add")
         return bool(changed)
 
+    def songs_changed(self, songs):
+        """Call if `songs` in the playlist changed, so the next write()
+        doesn't get skipped if that changes the content, e.g. because
+        one got renamed.
+        """
+
+        self._list._touch(0)
+
     def remove_songs(self, songs, leave_dupes=False):
         """Removes `songs` from this playlist if they are there,
          removing only the first reference if `leave_dupes` is True
@@ -496,12 +778,47 @@ class Playlist(Collection, Iterable):
 
     def delete(self):
         self.clear()
+        self.__pending.discard(self)
         if self in self.__instances:
             self.__instances.remove(self)
 
     def write(self):
         pass
 
+    def write_later(self):
+        """Like write(), but waits for further changes up to WRITE_DELAY
+        ms, so many small changes result in one write.
+        """
+
+        from gi.repository import GLib
+
+        cls = Playlist
+        cls.__pending.add(self)
+        if cls.__pending_id is None:
+            cls.__pending_id = GLib.timeout_add(
+                self.WRITE_DELAY, cls.write_pending)
+
+    @classmethod
+    def write_pending(cls):
+        """Write all playlists waiting because of write_later() now"""
+
+        cls = Playlist
+        if cls.__pending_id is not None:
+            from gi.repository import GLib
+
+            GLib.source_remove(cls.__pending_id)
+            cls.__pending_id = None
+
+        pending = list(cls.__pending)
+        cls.__pending.clear()
+        for playlist in pending:
+            try:
+                playlist.write()
+            except EnvironmentError as e:
+                print_w("Couldn't save playlist %r: %s" % (
+                    playlist.name, e))
+        return False
+
     @property
     def has_duplicates(self):
         """Returns True if there are any duplicated files in this playlist"""
@@ -547,13 +864,20 @@ class FileBackedPlaylist(Playlist):
         if validate:
             self.name = self._validated_name(name)
         self._last_fn = self.filename
+        # number of items in the file, None if unknown
+        self.__written = None
+        self.__digest = None
+        # song -> filename it got written with
+        self.__filenames = {}
         self.__populate_from_file()
 
     def __populate_from_file(self):
         library = self.library
+        lines = 0
         try:
             with open(self.filename, "rb") as h:
                 for line in h:
+                    lines += 1
                     assert library is not None
                     try:
                         line = bytes2fsn(line.rstrip(), "utf-8")
@@ -564,6 +888,10 @@ class FileBackedPlaylist(Playlist):
                         self._list.append(library[line])
                     elif library and library.masked(line):
                         self._list.append(line)
+            if lines == len(self._list):
+                self.__written = lines
+                self._list.dirty_from = None
+                self.__remember_filenames(self._list)
         except IOError:
             if self.name:
                 util.print_d(
@@ -618,14 +946,62 @@ class FileBackedPlaylist(Playlist):
         except EnvironmentError:
             pass
 
+    def __remember_filenames(self, items):
+        for song in items:
+            if not isinstance(song, string_types):
+                self.__filenames[song] = song("~filename")
+
+    def songs_changed(self, songs):
+        filenames = self.__filenames
+        for song in songs:
+            filename = filenames.get(song)
+            if filename is not None and filename != song("~filename"):
+                self._list._touch(0)
+                break
+
+    @staticmethod
+    def __serialize(items):
+        lines = []
+        for song in items:
+            if isinstance(song, string_types):
+                lines.append(fsn2bytes(song, "utf-8") + b"\n")
+            else:
+                lines.append(fsn2bytes(song("~filename"), "utf-8") + b"\n")
+        return b"".join(lines)
+
     def write(self):
+        """Saves the playlist if it has changed since the last write.
+
+        If songs only got appended they get appended to the file,
+        otherwise the whole file gets replaced atomically.
+        """
+
         fn = self.filename
-        with open(fn, "wb") as f:
-            for song in self._list:
-                if isinstance(song, string_types):
-                    f.write(fsn2bytes(song, "utf-8") + b"\n")
-                else:
-                    f.write(fsn2bytes(song("~filename"), "utf-8") + b"\n")
-        if self._last_fn != fn:
+        items = self._list
+        start = items.dirty_from
+        written = self.__written
+        renamed = self._last_fn != fn
+
+        if not renamed and start is None and written is not None:
+            return
+
+        if not renamed and written is not None and start >= written:
+            with open(fn, "ab") as f:
+                f.write(self.__serialize(items[written:]))
+            self.__remember_filenames(items[written:])
+            self.__digest = None
+        else:
+            data = self.__serialize(items)
+            digest = hashlib.sha1(data).digest()
+            if renamed or digest != self.__digest:
+                with atomic_save(fn, "wb") as f:
+                    f.write(data)
+            self.__digest = digest
+            self.__filenames = {}
+            self.__remember_filenames(items)
+
+        items.dirty_from = None
+        self.__written = len(items)
+        if renamed:
             self.__delete_file(self._last_fn)
             self._last_fn = fn
@@ -154,7 +154,28 @@ class HashedList(MutableSequence):
 
         self._data = list(arg)
         for item in arg:
-            self._map[item] += 1
+            self._add_item(item)
+
+    def _add_item(self, item):
+        self._map[item] += 1
+        if self._map[item] == 1:
+            self._item_added(item)
+
+    def _remove_item(self, item):
+        self._map[item] -= 1
+        if not self._map[item]:
+            del self._map[item]
+            self._item_removed(item)
+
+    def _item_added(self, item):
+        """Gets called if `item` wasn't contained before"""
+
+        pass
+
+    def _item_removed(self, item):
+        """Gets called if the last `item` got removed"""
+
+        pass
 
     def __setitem__(self, index, item):
         old_items = self._data[index]
@@ -162,9 +183,7 @@ class HashedList(MutableSequence):
             old_items = [old_items]
 
         for old in old_items:
-            self._map[old] -= 1
-            if not self._map[old]:
-                del self._map[old]
+            self._remove_item(old)
 
         self._data[index] = item
 
@@ -173,7 +192,7 @@ class HashedList(MutableSequence):
             items = [items]
 
         for item in items:
-            self._map[item] += 1
+            self._add_item(item)
 
     def __getitem__(self, index):
         return self._data[index]
@@ -183,9 +202,7 @@ class HashedList(MutableSequence):
         if not isinstance(index, slice):
             items = [items]
         for item in items:
-            self._map[item] -= 1
-            if not self._map[item]:
-                del self._map[item]
+            self._remove_item(item)
         del self._data[index]
 
     def __len__(self):
@@ -193,7 +210,7 @@ class HashedList(MutableSequence):
 
     def insert(self, index, item):
         self._data.insert(index, item)
-        self._map[item] += 1
+        self._add_item(item)
 
     def __contains__(self, item):
         return item in self._map
@@ -202,6 +219,9 @@ class HashedList(MutableSequence):
         for item in self._data:
             yield item
 
+    def count(self, item):
+        return self._map.get(item, 0)
+
     def has_duplicates(self):
         """Returns True if any item is contained more than once"""
         return len(self._map) != len(self)
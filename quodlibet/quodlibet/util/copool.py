@@ -101,7 +101,7 @@ class CoPool(object):
     def _get(self, funcid):
         if funcid in self.__routines:
             return self.__routines[funcid]
-        raise ValueError("no pooled routine %r" % funcid)
+        raise ValueError("no pooled routine %r" % (funcid,))
 
     def remove(self, funcid):
         """Stop a registered routine."""
@@ -28,6 +28,10 @@ class EmbeddedCover(CoverSourcePlugin):
 
     embedded = True
 
+    image_cache = None
+    """An `EmbeddedImageCache` to extract the images into or None, e.g.
+    the one of the `CoverManager`"""
+
     @classmethod
     def group_by(cls, song):
         # one group per song
@@ -40,6 +44,14 @@ class EmbeddedCover(CoverSourcePlugin):
     @property
     def cover(self):
         if self.song.has_images:
+            cache = self.image_cache
+            if cache is not None and self.song.is_file:
+                path = cache.extract(self.song)
+                if path is not None:
+                    try:
+                        return open(path, "rb")
+                    except IOError:
+                        cache.invalidate(self.song)
             image = self.song.get_primary_image()
             return image.file if image else None
 
@@ -62,11 +74,22 @@ class FilesystemCover(CoverSourcePlugin):
     cover_negative_regexes = frozenset(
         [re.compile(r'(\b|_|)' + s + r'(\b|_)') for s in cover_negative_words])
 
+    _cover_dirs = None
+
     @classmethod
     def group_by(cls, song):
         # in the common case this means we only search once per album
         return song('~dirname'), song.album_key
 
+    @property
+    def cover_dirs(self):
+        return self._cover_dirs
+
+    @classmethod
+    def cover_settings(cls):
+        return (config.getboolean("albumart", "force_filename"),
+                config.get("albumart", "filename"))
+
     @staticmethod
     def priority():
         return 0.80
@@ -86,6 +109,7 @@ class FilesystemCover(CoverSourcePlugin):
             if os.path.isfile(path):
                 images = [(100, path)]
         else:
+            dirs = [base]
             entries = []
             try:
                 entries = os.listdir(base)
@@ -99,6 +123,7 @@ class FilesystemCover(CoverSourcePlugin):
                     fns.append((None, entry))
                 if lentry in self.cover_subdirs:
                     subdir = os.path.join(base, entry)
+                    dirs.append(subdir)
                     sub_entries = []
                     try:
                         sub_entries = os.listdir(subdir)
@@ -138,6 +163,7 @@ class FilesystemCover(CoverSourcePlugin):
                         fn = os.path.join(sub, fn)
                     images.append((score, os.path.join(base, fn)))
             images.sort(reverse=True)
+            self._cover_dirs = dirs
 
         for score, path in images:
             # could be a directory
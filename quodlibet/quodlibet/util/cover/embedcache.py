@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017 Quod Libet contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation
+
+"""A disk cache for embedded images.
+
+Getting an embedded image means opening and parsing the whole audio file,
+which is slow for large images or files on network storage. Extracted
+images get named after a hash of their data, so the songs of an album
+sharing a picture also share the file (and its thumbnails).
+"""
+
+import os
+import hashlib
+import threading
+
+from senf import fsnative
+
+from quodlibet import _
+from quodlibet.qltk.notif import Task
+from quodlibet.util.atomic import atomic_save
+from quodlibet.util.path import mkdir, mtime
+from quodlibet.util.picklehelper import pickle_loads, pickle_dumps, \
+    PickleError
+from quodlibet.util.dprint import print_d, print_w
+from quodlibet.util.thread import iter_parallel
+
+
+class EmbeddedImageCache(object):
+    """Primary embedded images extracted into `directory`, looked up by
+    song filename as long as the mtime of the song stays the same.
+
+    Can be used from multiple threads.
+
+    Args:
+        directory (fsnative): where to put the images and the index
+    """
+
+    INDEX_NAME = fsnative(u"index")
+
+    def __init__(self, directory):
+        assert isinstance(directory, fsnative)
+
+        self.directory = directory
+        # song filename -> (song mtime, image name)
+        self._index = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.directory, self.INDEX_NAME)
+
+    def _load(self):
+        try:
+            with open(self._index_path, "rb") as fileobj:
+                index = pickle_loads(fileobj.read())
+        except EnvironmentError:
+            return
+        except PickleError:
+            print_w("Couldn't load embedded image index %r" %
+                    self._index_path)
+            return
+
+        if isinstance(index, dict):
+            self._index = index
+
+    def save(self):
+        """Save the index if anything changed since it got loaded"""
+
+        if not self._dirty:
+            return
+
+        with self._lock:
+            data = pickle_dumps(self._index, 2)
+            self._dirty = False
+
+        print_d("Saving %d embedded image entries" % len(self._index))
+        try:
+            mkdir(self.directory)
+            with atomic_save(self._index_path, "wb") as fileobj:
+                fileobj.write(data)
+        except EnvironmentError:
+            print_w("Couldn't save embedded image index %r" %
+                    self._index_path)
+
+    def lookup(self, song):
+        """Returns the path of the extracted image or None if it isn't
+        in the cache (anymore).
+        """
+
+        filename = song("~filename")
+        entry = self._index.get(filename)
+        if entry is None:
+            return
+
+        song_mtime, name = entry
+        path = os.path.join(self.directory, name)
+        if mtime(filename) != song_mtime or not os.path.isfile(path):
+            self.invalidate(song)
+            return
+        return path
+
+    def extract(self, song):
+        """Makes sure the primary embedded image of the song is in the
+        cache.
+
+        Returns:
+            fsnative or None: the image path, None if the song has no
+                image or it couldn't be stored
+        """
+
+        path = self.lookup(song)
+        if path is not None:
+            return path
+
+        filename = song("~filename")
+        song_mtime = mtime(filename)
+        image = song.get_primary_image()
+        if image is None:
+            return
+
+        try:
+            data = image.read()
+        except EnvironmentError:
+            return
+        finally:
+            image.file.close()
+
+        name = fsnative(u"%s" % hashlib.sha1(data).hexdigest())
+        path = os.path.join(self.directory, name)
+        if not os.path.isfile(path):
+            try:
+                mkdir(self.directory)
+                with atomic_save(path, "wb") as fileobj:
+                    fileobj.write(data)
+            except EnvironmentError:
+                print_w("Couldn't save embedded image %r" % path)
+                return
+
+        with self._lock:
+            self._index[filename] = (song_mtime, name)
+            self._dirty = True
+        return path
+
+    def invalidate(self, song):
+        """Forget the image of the song"""
+
+        with self._lock:
+            if self._index.pop(song("~filename"), None) is not None:
+                self._dirty = True
+
+    def prune(self, filenames=None):
+        """Removes images no song refers to anymore.
+
+        If `filenames` is given, the entries of all other songs get dropped
+        first, e.g. of ones which were removed from the library.
+        """
+
+        with self._lock:
+            if filenames is not None:
+                for filename in list(self._index):
+                    if filename not in filenames:
+                        del self._index[filename]
+                        self._dirty = True
+            used = {name for song_mtime, name in self._index.values()}
+
+        try:
+            names = os.listdir(self.directory)
+        except EnvironmentError:
+            return
+
+        for name in names:
+            if name == self.INDEX_NAME or name in used:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except EnvironmentError:
+                pass
+
+    def extract_many(self, songs, cofuncid=None):
+        """Extracts the images of all songs which have some and aren't in
+        the cache yet, and removes the ones not needed anymore. `songs`
+        has to contain all songs, e.g. the whole library, entries of
+        others get dropped.
+
+        A generator for copool, the songs get read in the background.
+        If copooled, set `cofuncid` to enable pause/stop buttons in the
+        UI.
+        """
+
+        songs = list(songs)
+        filenames = {s("~filename") for s in songs}
+        songs = [s for s in songs if s.is_file and s.has_images]
+        if songs:
+            print_d("Extracting embedded images of %d songs" % len(songs))
+            task = Task(_("Library"), _("Extracting embedded covers"))
+            if cofuncid:
+                task.copool(cofuncid)
+            i = 0
+            for done in iter_parallel(self.extract, songs):
+                i += len(done)
+                task.update(float(i) / len(songs))
+                yield True
+            task.finish()
+
+        self.prune(filenames)
+        self.save()
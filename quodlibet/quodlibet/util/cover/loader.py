@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017 Quod Libet contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation
+
+"""Loads cover pixbufs for many views at once without blocking the main
+loop, e.g. for all the albums around the visible area of a browser.
+"""
+
+import heapq
+import itertools
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from gi.repository import GLib
+
+from quodlibet import util
+from quodlibet.util.thread import Priority
+
+
+class _Request(object):
+
+    def __init__(self, key, songs, width, height, priority):
+        self.key = key
+        self.songs = songs
+        self.width = width
+        self.height = height
+        self.priority = priority
+        self.started = False
+        self.waiters = []
+
+    def is_cancelled(self):
+        for cancellable, callback in self.waiters:
+            if cancellable is None or not cancellable.is_cancelled():
+                return False
+        return True
+
+
+class CoverLoader(object):
+    """Finds and loads covers in a few worker threads.
+
+    Requests get handled by priority, and in the order they were made for
+    the same priority. Requests for the same key and size share one load
+    and ones which got cancelled before a worker got to them get dropped.
+
+    Args:
+        manager (CoverManager)
+    """
+
+    MAX_WORKERS = 2
+    """Number of covers loaded at the same time"""
+
+    def __init__(self, manager):
+        self._manager = manager
+        self._lock = threading.Lock()
+        self._queue = []
+        self._requests = {}
+        self._counter = itertools.count()
+        self._pool = None
+
+    def _push(self, request):
+        heapq.heappush(
+            self._queue, (request.priority, next(self._counter), request))
+
+    def load(self, key, songs, width, height, cancellable, callback,
+             priority=Priority.HIGH):
+        """Calls `callback` in the main loop with a pixbuf fitting into
+        `width` and `height`, or None if there is no cover. It doesn't get
+        called if `cancellable` gets cancelled in the meantime.
+
+        Args:
+            key: a hashable identifying the songs, e.g. the album key
+            songs (List[AudioFile]): songs to search the cover for
+            width (int)
+            height (int)
+            cancellable (Cancellable or None)
+            callback (Callable[[GdkPixbuf.Pixbuf or None], None])
+            priority (Priority): HIGH for covers which are visible
+        """
+
+        request_key = (key, width, height)
+        with self._lock:
+            request = self._requests.get(request_key)
+            is_new = request is None
+            if is_new:
+                request = self._requests[request_key] = _Request(
+                    request_key, list(songs), width, height, priority)
+                self._push(request)
+            elif priority < request.priority and not request.started:
+                # the old queue entry gets skipped
+                request.priority = priority
+                self._push(request)
+            request.waiters.append((cancellable, callback))
+
+        if is_new:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.MAX_WORKERS)
+            self._pool.submit(self._work)
+
+    def _next_request(self):
+        with self._lock:
+            while self._queue:
+                priority, count, request = heapq.heappop(self._queue)
+                if request.started or priority != request.priority:
+                    continue
+                if request.is_cancelled():
+                    del self._requests[request.key]
+                    continue
+                request.started = True
+                return request
+
+    def _work(self):
+        # Every request submits one call, but calls take whatever is most
+        # important at the time they run.
+        request = self._next_request()
+        if request is None:
+            return
+
+        try:
+            pixbuf = self._manager.get_pixbuf_many(
+                request.songs, request.width, request.height)
+        except Exception:
+            util.print_exc()
+            pixbuf = None
+
+        with self._lock:
+            # later requests for the same key have to load again
+            del self._requests[request.key]
+
+        GLib.idle_add(self._deliver, request, pixbuf)
+
+    def _deliver(self, request, pixbuf):
+        for cancellable, callback in request.waiters:
+            if cancellable is None or not cancellable.is_cancelled():
+                callback(pixbuf)
+        return False
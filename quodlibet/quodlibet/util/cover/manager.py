@@ -13,12 +13,20 @@ from gi.repository import GObject
 from quodlibet import config
 from quodlibet.plugins import PluginManager, PluginHandler
 from quodlibet.util.cover import built_in
-from quodlibet.util import print_d
+from quodlibet.util.cover.pathcache import CoverPathCache
+from quodlibet.util.cover.loader import CoverLoader
+from quodlibet.util.cover.surfacecache import SurfaceCache
+from quodlibet.util.cover.embedcache import EmbeddedImageCache
+from quodlibet.util import print_d, print_w
 from quodlibet.util.thread import call_async
 from quodlibet.util.thumbnails import get_thumbnail_from_file
 from quodlibet.plugins.cover import CoverSourcePlugin
 
 
+def _source_id(plugin):
+    return getattr(plugin, "PLUGIN_ID", plugin.__name__)
+
+
 class CoverPluginHandler(PluginHandler):
     """A plugin handler for CoverSourcePlugin implementation"""
 
@@ -59,9 +67,34 @@ class CoverManager(GObject.Object):
 
     plugin_handler = None
 
-    def __init__(self, use_built_in=True):
+    loader = None
+    """A `CoverLoader` for views showing many covers at once"""
+
+    surfaces = None
+    """A `SurfaceCache` shared by all widgets drawing covers, grouped by
+    album key"""
+
+    image_cache = None
+    """An `EmbeddedImageCache` or None"""
+
+    def __init__(self, use_built_in=True, cache_filename=None,
+                 image_cache_dir=None):
+        """
+        Args:
+            use_built_in (bool): if the built in sources should be used
+            cache_filename (fsnative or None): where to persist which
+                covers were found, see `save()`
+            image_cache_dir (fsnative or None): where to extract embedded
+                images to, see `image_cache`
+        """
+
         super(CoverManager, self).__init__()
         self.plugin_handler = CoverPluginHandler(use_built_in)
+        self._path_cache = CoverPathCache(cache_filename)
+        self.loader = CoverLoader(self)
+        self.surfaces = SurfaceCache()
+        if image_cache_dir is not None:
+            self.image_cache = EmbeddedImageCache(image_cache_dir)
 
     def init_plugins(self):
         """Register the cover sources plugin handler with the global
@@ -74,6 +107,14 @@ class CoverManager(GObject.Object):
     def sources(self):
         return self.plugin_handler.sources
 
+    def save(self):
+        """Save which covers were found and which images were extracted,
+        if the caches are persistent"""
+
+        self._path_cache.save()
+        if self.image_cache is not None:
+            self.image_cache.save()
+
     def cover_changed(self, songs):
         """Notify the world that the artwork for some songs or collections
         containing that songs might have changed (For example a new image was
@@ -83,6 +124,12 @@ class CoverManager(GObject.Object):
         to re-fetch the cover and do a display update.
         """
 
+        cache = self._path_cache
+        for plugin in self.sources:
+            for key in {plugin.group_by(song) for song in songs}:
+                cache.invalidate(_source_id(plugin), key)
+        self.surfaces.invalidate({song.album_key for song in songs})
+
         self.emit("cover-changed", songs)
 
     def acquire_cover(self, callback, cancellable, song):
@@ -157,10 +204,32 @@ class CoverManager(GObject.Object):
             # the same result for the same set of songs
             for key, group in sorted(groups.items()):
                 song = sorted(group, key=lambda s: s.key)[0]
-                cover = plugin(song).cover
+                cover = self.__get_group_cover(plugin, key, song)
                 if cover:
                     return cover
 
+    def __get_group_cover(self, plugin, key, song):
+        cache = self._path_cache
+        plugin_id = _source_id(plugin)
+        settings = plugin.cover_settings()
+        found, path = cache.lookup(plugin_id, key, settings)
+        if found:
+            if path is None:
+                return
+            try:
+                return open(path, "rb")
+            except IOError:
+                print_w("Failed reading album art \"%s\"" % path)
+                cache.invalidate(plugin_id, key)
+
+        provider = plugin(song)
+        cover = provider.cover
+        dirs = provider.cover_dirs
+        if dirs is not None:
+            cache.store(plugin_id, key, dirs, cover.name if cover else None,
+                        settings)
+        return cover
+
     def get_cover(self, song):
         """Returns a cover file object for one song or None.
 
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017 Quod Libet contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation
+
+"""A persistent cache of which cover file a cover source found for a group
+of songs, or that it didn't find any.
+
+Sources like `FilesystemCover` list directories and score every image in
+them, which is too slow to repeat whenever an album gets displayed. The
+result only depends on the contents of those directories, so it can be
+reused as long as their modification times stay the same.
+"""
+
+import os
+import threading
+import time
+
+from senf import fsnative
+
+from quodlibet.util.atomic import atomic_save
+from quodlibet.util.picklehelper import pickle_loads, pickle_dumps, \
+    PickleError
+from quodlibet.util.dprint import print_d, print_w
+
+
+class CoverPathCache(object):
+    """Cover paths (or None) keyed by source and group key, valid as long as
+    the mtimes of the directories the source looked at don't change.
+
+    Can be used from multiple threads.
+
+    Args:
+        filename (fsnative or None): where to persist the cache
+    """
+
+    MTIME_SLACK = 2
+    """Directories changed less than this many seconds before looking at
+    them don't get cached, the mtime resolution of some file systems is
+    too coarse to notice further changes"""
+
+    def __init__(self, filename=None):
+        assert filename is None or isinstance(filename, fsnative)
+
+        self.filename = filename
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if filename is not None:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.filename, "rb") as fileobj:
+                entries = pickle_loads(fileobj.read())
+        except EnvironmentError:
+            return
+        except PickleError:
+            print_w("Couldn't load cover cache %r" % self.filename)
+            return
+
+        if isinstance(entries, dict):
+            # entries of older versions lack the settings
+            self._entries = {
+                k: v for k, v in entries.items() if len(v) == 3}
+
+    def save(self):
+        """Save the cache if anything changed since it got loaded"""
+
+        if self.filename is None or not self._dirty:
+            return
+
+        with self._lock:
+            data = pickle_dumps(self._entries, 2)
+            self._dirty = False
+
+        print_d("Saving %d cover paths" % len(self._entries))
+        try:
+            with atomic_save(self.filename, "wb") as fileobj:
+                fileobj.write(data)
+        except EnvironmentError:
+            print_w("Couldn't save cover cache %r" % self.filename)
+
+    def lookup(self, source, key, settings=None):
+        """Returns a (found, path) tuple. If `found` is False nothing is
+        known, otherwise `path` is the cover path or None if there is no
+        cover.
+
+        Args:
+            source (str): the cover source ID
+            key: the group key of the source, see
+                `CoverSourcePlugin.group_by`
+            settings: the settings of the source, see
+                `CoverSourcePlugin.cover_settings`
+        """
+
+        entry = self._entries.get((source, key))
+        if entry is None:
+            return False, None
+
+        stamps, path, entry_settings = entry
+        if entry_settings != settings:
+            self.invalidate(source, key)
+            return False, None
+
+        for dirpath, mtime in stamps:
+            try:
+                if os.stat(dirpath).st_mtime != mtime:
+                    break
+            except EnvironmentError:
+                if mtime is not None:
+                    break
+        else:
+            if path is None or os.path.isfile(path):
+                return True, path
+
+        self.invalidate(source, key)
+        return False, None
+
+    def store(self, source, key, dirs, path, settings=None):
+        """Remember `path` as the result of `source` for the group `key`
+        until one of `dirs` or the `settings` of the source change.
+        """
+
+        now = time.time()
+        stamps = []
+        for dirpath in dirs:
+            try:
+                mtime = os.stat(dirpath).st_mtime
+            except EnvironmentError:
+                # only valid as long as it doesn't exist
+                mtime = None
+            else:
+                if now - mtime <= self.MTIME_SLACK:
+                    return
+            stamps.append((dirpath, mtime))
+
+        with self._lock:
+            self._entries[(source, key)] = (tuple(stamps), path, settings)
+            self._dirty = True
+
+    def invalidate(self, source, key):
+        """Forget the result of `source` for the group `key`"""
+
+        with self._lock:
+            if self._entries.pop((source, key), None) is not None:
+                self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017 Quod Libet contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation
+
+"""A memory bound cache for the cairo surfaces covers get drawn from.
+
+Turning a cover pixbuf into a surface with a border is done for every
+redraw otherwise, once per widget showing the cover.
+"""
+
+from collections import OrderedDict
+
+
+class SurfaceCache(object):
+    """Keeps the least recently used surfaces until they take up more than
+    `max_bytes` in total.
+
+    Every surface belongs to a group, e.g. the album key of the cover, so
+    all surfaces of a cover can be dropped at once when it changes.
+    Only to be used from the main thread.
+
+    Args:
+        max_bytes (int): how much memory the surfaces can take up
+    """
+
+    MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (group, key) -> (surface, nbytes), least recently used first
+        self._entries = OrderedDict()
+        # group -> set of keys
+        self._groups = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        """The share of lookups which found a surface, from 0.0 to 1.0"""
+
+        total = self.hits + self.misses
+        if not total:
+            return 0.0
+        return float(self.hits) / total
+
+    def stats(self):
+        """A short summary of the cache usage, for debug output"""
+
+        return ("%d surfaces, %d KiB, %d hits, %d misses (%.0f%% hit rate), "
+                "%d evicted" % (
+                    len(self), self.nbytes // 1024, self.hits, self.misses,
+                    self.hit_rate * 100, self.evictions))
+
+    def get(self, group, key):
+        """Returns the surface stored for `group` and `key` or None"""
+
+        entry_key = (group, key)
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries[entry_key] = entry
+        self.hits += 1
+        return entry[0]
+
+    def put(self, group, key, surface, nbytes):
+        """Store a surface which takes up `nbytes`, dropping the least
+        recently used ones if the cache gets too large.
+        """
+
+        if nbytes > self.max_bytes:
+            return
+
+        entry_key = (group, key)
+        self._remove(entry_key)
+        self._entries[entry_key] = (surface, nbytes)
+        self._groups.setdefault(group, set()).add(key)
+        self.nbytes += nbytes
+
+        while self.nbytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, entry_key):
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return
+
+        self.nbytes -= entry[1]
+        group, key = entry_key
+        keys = self._groups[group]
+        keys.discard(key)
+        if not keys:
+            del self._groups[group]
+
+    def invalidate(self, groups):
+        """Drop all surfaces of the given groups"""
+
+        for group in groups:
+            for key in self._groups.pop(group, ()):
+                surface, nbytes = self._entries.pop((group, key))
+                self.nbytes -= nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self._groups.clear()
+        self.nbytes = 0
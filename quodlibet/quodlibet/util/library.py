@@ -109,10 +109,57 @@ def scan_library(library, force):
 
     paths = get_scan_dirs()
     exclude = get_exclude_dirs()
-    copool.add(library.rebuild, paths, force, exclude,
+    copool.add(_rebuild, library, paths, force, exclude,
                cofuncid="library", funcid="library")
 
 
+def _rebuild(library, paths, force, exclude, cofuncid):
+    for value in library.rebuild(paths, force, exclude, cofuncid):
+        yield value
+
+    # so showing covers doesn't have to parse the files later on
+    image_cache = app.cover_manager and app.cover_manager.image_cache
+    if image_cache is not None:
+        for value in image_cache.extract_many(library.values(), cofuncid):
+            yield value
+
+
+_watcher = None
+
+
+def update_library_watcher(library):
+    """Start or stop watching the scan directories for changes depending
+    on the config, or restart if the directories have changed.
+
+    Args:
+        library (SongFileLibrary)
+    """
+
+    global _watcher
+
+    # pulls in Gio
+    from quodlibet.library.watcher import LibraryWatcher
+
+    stop_library_watcher()
+
+    if config.getboolean("library", "watch"):
+        _watcher = LibraryWatcher(
+            library, get_scan_dirs(), get_exclude_dirs())
+        _watcher.start()
+
+
+def stop_library_watcher():
+    """Stop watching the scan directories, if started by
+    update_library_watcher()
+    """
+
+    global _watcher
+
+    if _watcher is not None:
+        _watcher.destroy()
+        _watcher = None
+
+
 def emit_signal(songs, signal="changed", block_size=50, name=None,
                 cofuncid=None):
     """
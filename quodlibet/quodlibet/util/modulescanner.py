@@ -7,6 +7,7 @@
 
 import sys
 import imp
+import time
 
 from os.path import dirname
 from traceback import format_exception
@@ -19,10 +20,14 @@ from quodlibet.compat import iteritems, listitems
 
 class Module(object):
 
-    def __init__(self, name, module, deps, path):
+    def __init__(self, name, module, deps, path, load_start=0,
+                 load_time=0):
         self.name = name
         self.module = module
         self.path = path
+        # when and for how long (in seconds) importing it took
+        self.load_start = load_start
+        self.load_time = load_time
 
         self.deps = {}
         for dep in deps:
@@ -134,8 +139,10 @@ class ModuleScanner(object):
                     sys.modules[parent] = imp.new_module(parent)
                 vars(sys.modules["quodlibet"])["fake"] = sys.modules[parent]
 
+                load_start = time.time()
                 mod = load_module(name, parent + ".plugins",
                                   dirname(path), reload=True)
+                load_time = time.time() - load_start
                 if mod is None:
                     continue
 
@@ -144,7 +151,8 @@ class ModuleScanner(object):
                 self.__failures[name] = ModuleImportError(name, err, text)
             else:
                 added.append(name)
-                self.__modules[name] = Module(name, mod, deps, path)
+                self.__modules[name] = Module(
+                    name, mod, deps, path, load_start, load_time)
 
         print_d("Rescanning done: %d added, %d removed, %d error(s)" %
                 (len(added), len(removed), len(self.__failures)))
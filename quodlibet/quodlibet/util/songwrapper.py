@@ -124,10 +124,11 @@ def check_wrapper_changed(library, parent, songs):
                 break
         win.destroy()
 
-    changed = []
-    for song in songs:
-        if song._was_updated():
-            changed.append(song._song)
-        elif not song.valid() and song.exists():
-            library.reload(song._song)
-    library.changed(changed)
+    with library.batch():
+        changed = []
+        for song in songs:
+            if song._was_updated():
+                changed.append(song._song)
+            elif not song.valid() and song.exists():
+                library.reload(song._song)
+        library.changed(changed)
@@ -9,7 +9,7 @@
 
 from multiprocessing import cpu_count
 try:
-    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 except ImportError as e:
     raise ImportError("python-futures is missing: %r" % e)
 
@@ -147,3 +147,48 @@ def call_async_background(function, cancellable, callback, args=None,
 
     _call_async(Priority.BACKGROUND, function, cancellable, callback,
                 args, kwargs)
+
+
+def iter_parallel(function, items, max_pending=64, timeout=0.015):
+    """Calls `function` for each item in `items` in the background pool.
+
+    A generator for routines running in the main loop (e.g. copool): each
+    step waits at most `timeout` seconds and yields a (possibly empty)
+    list of (item, result) tuples for the calls finished in the meantime.
+    Only `max_pending` calls get queued at once, so the workers stop soon
+    after the consumer stops asking for results. Calls which haven't
+    started yet get cancelled once the generator is closed.
+
+    If `function` raises, the exception gets printed and the item skipped.
+    """
+
+    pool = _get_pool(Priority.BACKGROUND)
+    items = iter(items)
+    pending = {}
+    done_items = False
+
+    try:
+        while True:
+            while not done_items and len(pending) < max_pending:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    done_items = True
+                else:
+                    pending[pool.submit(function, item)] = item
+
+            if not pending:
+                break
+
+            done = wait(pending, timeout, FIRST_COMPLETED)[0]
+            results = []
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    results.append((item, future.result()))
+                except Exception:
+                    util.print_exc()
+            yield results
+    finally:
+        for future in pending:
+            future.cancel()
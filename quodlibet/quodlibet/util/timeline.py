@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017 Quod Libet contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation
+
+import time
+
+
+class Timeline(object):
+    """Records how long the phases of something (e.g. the startup) take.
+
+    Phases follow each other and get ended by `mark()`, things measured
+    separately can be added with `add()`.
+    """
+
+    def __init__(self):
+        self.start = self._last = time.time()
+        self.entries = []
+        """A list of (name, start, duration) tuples in seconds, start is
+        relative to the creation of the timeline"""
+
+    def add(self, name, start, duration):
+        """Add a step which started at the time `start`"""
+
+        self.entries.append((name, start - self.start, duration))
+
+    def mark(self, name):
+        """End the current phase and start the next one"""
+
+        now = time.time()
+        self.add(name, self._last, now - self._last)
+        self._last = now
+
+    @property
+    def total(self):
+        """Seconds from the creation to the last mark"""
+
+        return self._last - self.start
+
+    def format(self):
+        """Returns a text table of all entries, sorted by start time"""
+
+        lines = ["%10s %10s  %s" % ("start", "duration", "name")]
+        for name, start, duration in sorted(
+                self.entries, key=lambda e: e[1]):
+            lines.append("%7.1f ms %7.1f ms  %s" % (
+                start * 1000, duration * 1000, name))
+        lines.append("%7.1f ms total" % (self.total * 1000))
+        return "\n".join(lines)
@@ -61,3 +61,28 @@ class TBrowsers(TestCase):
                          browsers.get("Paned"))
         self.assertEqual(browsers.get("PlaylistsBrowser"),
                          browsers.get("Playlists"))
+
+    def test_setup_lazy(self):
+        calls = []
+
+        class Lazy(object):
+            lazy_init = True
+
+            @classmethod
+            def init(cls, library):
+                calls.append((cls, library))
+
+        class Eager(Lazy):
+            lazy_init = False
+
+        old = browsers.browsers
+        browsers.browsers = [Lazy, Eager]
+        try:
+            browsers.setup("lib", lazy=True)
+            self.assertEqual(calls, [(Eager, "lib")])
+            browsers.prepare(Lazy)
+            browsers.prepare(Lazy)
+            browsers.prepare(Eager)
+            self.assertEqual(calls, [(Eager, "lib"), (Lazy, "lib")])
+        finally:
+            browsers.browsers = old
@@ -16,6 +16,7 @@ from quodlibet.browsers._base import DisplayPatternMixin
 from . import TestCase
 from .helper import realized
 
+from quodlibet import app
 from quodlibet import config
 
 from quodlibet.browsers.albums import AlbumList
@@ -26,6 +27,7 @@ from quodlibet.browsers.albums.main import (compare_title, compare_artist,
 from quodlibet.formats import AudioFile
 from quodlibet.library import SongLibrary, SongLibrarian
 from quodlibet.util.collection import Album
+from quodlibet.util.thread import Cancellable
 
 
 SONGS = [
@@ -70,6 +72,53 @@ class TAlbumPrefs(TestCase):
         widget.destroy()
 
 
+class TAlbumItem(TestCase):
+
+    def setUp(self):
+        config.init()
+        self.loads = []
+        loads = self.loads
+
+        class Loader(object):
+            def load(self, key, songs, width, height, cancel, callback,
+                     priority):
+                loads.append((key, callback))
+
+        self._loader = app.cover_manager.loader
+        app.cover_manager.loader = Loader()
+
+    def tearDown(self):
+        app.cover_manager.loader = self._loader
+        config.quit()
+
+    def test_reset_cover(self):
+        album = Album(SONGS[0])
+        album.songs.add(SONGS[0])
+        item = AlbumItem(album)
+        done = []
+
+        def scan():
+            item.scan_cover(
+                callback=lambda: done.append(True), cancel=Cancellable())
+
+        scan()
+        scan()
+        self.assertEqual(len(self.loads), 1)
+
+        # a reset loads again, and the pending old cover gets ignored
+        item.reset_cover()
+        scan()
+        self.assertEqual(len(self.loads), 2)
+        self.assertNotEqual(self.loads[0][0], self.loads[1][0])
+        self.loads[0][1]("old")
+        self.assertFalse(item.scanned)
+        self.assertIsNone(item.cover)
+        self.loads[1][1]("new")
+        self.assertTrue(item.scanned)
+        self.assertEqual(item.cover, "new")
+        self.assertEqual(done, [True])
+
+
 class TAlbumSort(TestCase):
 
     def _get_album(self, dict_):
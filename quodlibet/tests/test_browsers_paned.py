@@ -4,7 +4,7 @@
 # published by the Free Software Foundation
 
 from tests import TestCase
-from .helper import realized
+from .helper import realized, capture_output
 
 from gi.repository import Gtk
 from senf import fsnative
@@ -379,6 +379,28 @@ class TMultiPane(TestCase):
             self.assertEqual(song("genre"), VALUE)
         self.assertEqual(self.count, 2)
 
+    def test_fill_async(self):
+        self.p1.ASYNC_FILL = 0
+        self.p1.fill(SONGS[:1])
+        self.p1.fill(iter(SONGS))
+        self.assertTrue(self.p1.filling)
+        while self.p1.filling:
+            Gtk.main_iteration_do(False)
+        self.assertEqual(self.last, set(SONGS))
+        self.assertEqual(self.count, 1)
+
+    def test_fill_async_error(self):
+        def group_songs(songs, cancellable=None):
+            raise Exception
+
+        self.p1.ASYNC_FILL = 0
+        self.p1.get_model().group_songs = group_songs
+        with capture_output():
+            self.p1.fill(SONGS)
+            while self.p1.filling:
+                Gtk.main_iteration_do(False)
+        self.assertEqual(self.count, 0)
+
     def tearDown(self):
         self.p1.destroy()
         self.p2.destroy()
@@ -522,6 +544,26 @@ class TPaneModel(TestCase):
             m.remove_songs([song], True)
             self._verify_model(m)
 
+    def test_add_remove_incremental(self):
+        conf = PaneConfig("artist")
+        m = PaneModel(conf)
+        m.add_songs(SONGS[:1])
+        m.add_songs(SONGS[2:])
+        m.add_songs(SONGS[1:3])
+        self._verify_model(m)
+        keys = [e.key for e in m.itervalues()]
+        self.assertEqual(keys, [None, "boris", "mu", "piman", ""])
+
+        # like on library changes, first keep the emptied row
+        m.remove_songs([SONGS[1]], False)
+        self.assertEqual(len(m), 5)
+        m.add_songs([])
+        m.remove_songs([], True)
+        self.assertEqual(
+            [e.key for e in m.itervalues()], [None, "boris", "piman", ""])
+        m.add_songs([SONGS[1]])
+        self.assertEqual([e.key for e in m.itervalues()], keys)
+
     def test_matches(self):
         conf = PaneConfig("artist")
         m = PaneModel(conf)
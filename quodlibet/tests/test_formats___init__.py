@@ -198,6 +198,21 @@ class TPickle(TestCase):
             items = load_audio_files(data, process=False)
             assert isinstance(list(items[0].keys())[0], bytes)
 
+    def test_load_shares_strings(self):
+        songs = []
+        for i in range(3):
+            song = AudioFile({"~filename": fsnative(u"song%d" % i)})
+            song["artist"] = u"".join([u"art", u"ist"])
+            song["comment"] = u"x" * 1000
+            songs.append(song)
+
+        items = load_audio_files(dump_audio_files(songs))
+        keys = [k for i in items for k in i.keys() if k == "artist"]
+        assert len(keys) == 3
+        assert keys[0] is keys[1] is keys[2]
+        assert items[0]["artist"] is items[2]["artist"]
+        assert items[0]["comment"] == items[1]["comment"]
+
     def test_dump_empty(self):
         data = dump_audio_files([])
         assert load_audio_files(data) == []
@@ -750,6 +750,17 @@ class TAudioFile(TestCase):
             f(bar_1_2)
             f(bar_2_1)
 
+    def test_sort_func_cache(self):
+        song = AudioFile({"~filename": "/dev/null", "album": "b"})
+        f = AudioFile.sort_by_func("album")
+        key = f(song)
+        self.assertEqual(f(song), key)
+        song["album"] = "a"
+        key = f(song)
+        self.assertTrue(key < f(AudioFile({"album": "b"})))
+        del song["album"]
+        self.assertTrue(f(song) < key)
+
     def test_uri(self):
         # On windows where we have unicode paths (windows encoding is utf-16)
         # we need to encode to utf-8 first, then escape.
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import os
+import shutil
+
+from senf import fsnative
+
+from tests import TestCase, mkdtemp
+
+from quodlibet.library.dircache import DirectoryCache
+
+
+class TDirectoryCache(TestCase):
+
+    def setUp(self):
+        self.dir = os.path.realpath(mkdtemp())
+        self.root = os.path.join(self.dir, fsnative(u"root"))
+        self.filename = os.path.join(self.dir, fsnative(u"dirs"))
+        os.mkdir(self.root)
+        os.mkdir(os.path.join(self.root, fsnative(u"sub")))
+        for name in [u"a", u"sub/b"]:
+            with open(os.path.join(self.root, fsnative(name)), "wb"):
+                pass
+        self._age()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _age(self):
+        # so the listings don't count as too recent to cache
+        old = 1000000000
+        for path in [self.root, os.path.join(self.root, fsnative(u"sub"))]:
+            os.utime(path, (old, old))
+
+    def _walk(self, cache):
+        found = []
+        for path, dirs, files in cache.walk(self.root):
+            found.extend(os.path.join(path, f[0]) for f in files)
+        return sorted(found)
+
+    def test_walk(self):
+        cache = DirectoryCache()
+        expected = sorted(
+            os.path.join(path, f)
+            for path, dirs, files in os.walk(self.root) for f in files)
+        self.assertEqual(self._walk(cache), expected)
+
+    def test_persist(self):
+        cache = DirectoryCache(self.filename)
+        scan = cache.start([self.root])
+        first = self._walk(cache)
+        cache.finish(scan)
+        self.assertTrue(os.path.exists(self.filename))
+
+        # unchanged directories don't get listed
+        shutil.rmtree(self.root)
+        os.mkdir(self.root)
+        os.mkdir(os.path.join(self.root, fsnative(u"sub")))
+        self._age()
+        cache = DirectoryCache(self.filename)
+        self.assertEqual(self._walk(cache), first)
+
+        # a changed one does
+        os.utime(self.root, None)
+        self.assertEqual(self._walk(cache), first[1:])
+
+    def test_recent_not_cached(self):
+        os.utime(self.root, None)
+        cache = DirectoryCache()
+        cache.listdir(self.root)
+        with open(os.path.join(self.root, fsnative(u"c")), "wb"):
+            pass
+        os.utime(self.root, (os.stat(self.root).st_mtime,) * 2)
+        self.assertEqual(len(cache.listdir(self.root)[1]), 2)
+
+    def test_finish_prunes(self):
+        cache = DirectoryCache(self.filename)
+        scan = cache.start([self.root])
+        self._walk(cache)
+        cache.finish(scan)
+        scan = cache.start([self.root])
+        cache.listdir(self.root)
+        cache.finish(scan)
+        self.assertEqual(
+            list(DirectoryCache(self.filename)._entries), [self.root])
+
+        # only the scanned roots get pruned
+        scan = cache.start([os.path.join(self.root, fsnative(u"sub"))])
+        cache.finish(scan)
+        self.assertEqual(
+            list(DirectoryCache(self.filename)._entries), [self.root])
+
+    def test_concurrent_scans(self):
+        sub = os.path.join(self.root, fsnative(u"sub"))
+        cache = DirectoryCache(self.filename)
+        first = cache.start([sub])
+        self._walk(cache)
+
+        # starting another scan doesn't reset what the first one used
+        second = cache.start([self.root])
+        cache.listdir(self.root)
+        cache.finish(first)
+        self.assertEqual(
+            sorted(DirectoryCache(self.filename)._entries),
+            sorted([self.root, sub]))
+
+        cache.listdir(sub)
+        cache.finish(second)
+        self.assertEqual(
+            sorted(DirectoryCache(self.filename)._entries),
+            sorted([self.root, sub]))
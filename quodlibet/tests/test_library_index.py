@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import time
+
+from senf import fsnative
+
+from tests import TestCase
+
+from quodlibet import config
+from quodlibet.formats import AudioFile
+from quodlibet.library.index import SongIndex
+from quodlibet.query import Query
+
+
+class FakeLibrary(object):
+
+    def __init__(self, songs):
+        self.songs = list(songs)
+
+    def values(self):
+        return self.songs
+
+    def __len__(self):
+        return len(self.songs)
+
+
+def song(i, **kwargs):
+    s = AudioFile(kwargs)
+    s["~filename"] = fsnative(u"/dir/%d.ogg" % i)
+    return s
+
+
+class TSongIndex(TestCase):
+
+    def setUp(self):
+        config.init()
+        self.songs = [
+            song(0, artist=u"Foo", album=u"Bar", **{"~#playcount": 3}),
+            song(1, artist=u"foo\nBaz", **{"~#playcount": 0}),
+            song(2, artist=u"Föö", **{"~#playcount": 10}),
+            song(3, artist=u"Foobar",
+                 **{"~#lastplayed": int(time.time()) - 3600}),
+        ]
+        self.library = FakeLibrary(self.songs)
+        self.index = SongIndex(self.library)
+
+    def tearDown(self):
+        config.quit()
+
+    def _check(self, text):
+        query = Query(text)
+        expected = set(query.filter(self.songs))
+        found = query.candidates(self.index)
+        if found is not None:
+            self.assertTrue(found.issuperset(expected), msg=text)
+        return found, expected
+
+    def test_exact(self):
+        found, expected = self._check(u'artist="foo"')
+        self.assertEqual(expected, set(self.songs[:2]))
+        # non ASCII values always get returned
+        self.assertEqual(found, set(self.songs[:3]))
+
+    def test_prefix(self):
+        found, expected = self._check(u'artist=/^foo/')
+        self.assertEqual(found, set(self.songs))
+
+    def test_union_inter(self):
+        found, expected = self._check(u'|(artist="baz", album="bar")')
+        self.assertEqual(found, set(self.songs[:3]))
+        found, expected = self._check(u'&(artist="baz", album="bar")')
+        self.assertEqual(found, set())
+
+    def test_not_indexed(self):
+        for text in [u"foo", u'!artist="foo"', u'~people="foo"',
+                     u"artist=foo", u'artist=/^\\d/']:
+            found, expected = self._check(text)
+            self.assertTrue(found is None, msg=text)
+
+    def test_numeric(self):
+        found, expected = self._check(u"#(playcount > 2)")
+        self.assertEqual(found, set([self.songs[0], self.songs[2]]))
+        found, expected = self._check(u"#(2 >= playcount)")
+        self.assertEqual(found, set([self.songs[1], self.songs[3]]))
+        found, expected = self._check(u"#(rating > 0.5)")
+        self.assertEqual(found, set(self.songs))
+        self._check(u"#(lastplayed < 2 hours)")
+        # never played counts as played a long time ago
+        found, expected = self._check(u"#(lastplayed > 2 hours)")
+        self.assertEqual(found, set(self.songs[:3]))
+        found, expected = self._check(u"#(playcount != 2)")
+        self.assertTrue(found is None)
+
+    def test_update(self):
+        self._check(u'artist="foo"')
+        self._check(u'#(playcount > 2)')
+        new = song(5, artist=u"foo", **{"~#playcount": 5})
+        self.songs.append(new)
+        self.index.add([new])
+        self._check(u'artist="foo"')
+        self._check(u'#(playcount > 2)')
+
+        self.songs[0]["artist"] = u"other"
+        self.songs[0]["~#playcount"] = 0
+        self.index.change([self.songs[0]])
+        found, expected = self._check(u'artist="foo"')
+        self.assertFalse(self.songs[0] in found)
+        found, expected = self._check(u'#(playcount > 2)')
+        self.assertFalse(self.songs[0] in found)
+
+        self.index.remove([new])
+        del self.songs[-1]
+        found, expected = self._check(u'artist="foo"')
+        self.assertFalse(new in found)
+
+    def test_optimize(self):
+        query = Query(u'|(#(playcount > 5), artist="foo")')
+        # by default the numeric comparison is cheaper
+        self.assertTrue(u"Numcmp" in query.explain().splitlines()[1])
+        # but more songs match the artist
+        lines = query.explain(self.index).splitlines()
+        self.assertTrue(u"Tag" in lines[1])
+        self.assertTrue(u"matches=75%" in lines[1])
+        self.assertTrue(u"matches=25%" in lines[2])
+
+        filter_ = query.planned_filter(self.index)
+        self.assertEqual(filter_(self.songs), self.songs[:3])
+        self.assertFalse("search" in query.__dict__)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import os
+import shutil
+
+from senf import fsnative
+
+from tests import TestCase, mkdtemp
+
+from quodlibet.formats import AudioFile, dump_audio_files
+from quodlibet.library.journal import LibraryJournal
+
+
+def song(name, **kwargs):
+    s = AudioFile(kwargs)
+    s["~filename"] = fsnative(name)
+    return s
+
+
+class TLibraryJournal(TestCase):
+
+    def setUp(self):
+        self.dir = mkdtemp()
+        self.filename = os.path.join(self.dir, fsnative(u"songs"))
+        self.journal = LibraryJournal(self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_no_journal(self):
+        items = [song(u"/a"), song(u"/b")]
+        self.assertEqual(self.journal.replay(items), items)
+
+    def test_append_replay(self):
+        a, b, c = song(u"/a"), song(u"/b"), song(u"/c")
+        new_b = song(u"/b", title=u"new")
+        self.journal.append([c], [])
+        self.journal.append([new_b], [u"/a"])
+        result = self.journal.replay([a, b])
+        self.assertEqual(
+            sorted((s.key, s.get("title")) for s in result),
+            [(u"/b", u"new"), (u"/c", None)])
+
+    def test_truncated(self):
+        self.journal.append([song(u"/c")], [])
+        self.journal.append([song(u"/d")], [])
+        with open(self.journal.path, "rb") as h:
+            data = h.read()
+        with open(self.journal.path, "wb") as h:
+            h.write(data[:-3])
+        result = self.journal.replay([])
+        self.assertEqual([s.key for s in result], [u"/c"])
+
+    def test_rotate(self):
+        self.journal.append([song(u"/a", title=u"1")], [])
+        self.journal.rotate()
+        self.assertFalse(os.path.exists(self.journal.path))
+        self.journal.append([song(u"/a", title=u"2")], [])
+        # interrupted compaction, the new journal gets appended
+        self.journal.rotate()
+        self.journal.append([song(u"/a", title=u"3")], [])
+        result = self.journal.replay([])
+        self.assertEqual(result[0]("title"), u"3")
+
+        # the snapshot includes everything before the rotation
+        with open(self.filename, "wb") as h:
+            h.write(dump_audio_files([song(u"/a", title=u"2")]))
+        result = self.journal.replay([song(u"/a", title=u"2")])
+        self.assertEqual(result[0]("title"), u"3")
+
+        self.journal.finish_compaction()
+        self.assertFalse(os.path.exists(self.journal.old_path))
+        self.journal.clear()
+        self.assertFalse(os.path.exists(self.journal.path))
+
+    def test_needs_compaction(self):
+        self.assertFalse(self.journal.needs_compaction())
+        self.journal.COMPACT_MIN_SIZE = 0
+        self.journal.append([song(u"/a")], [])
+        self.assertTrue(self.journal.needs_compaction())
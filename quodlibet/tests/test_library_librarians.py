@@ -83,6 +83,40 @@ class TLibrarian(TestCase):
         self.lib2.add(self.Frange(12, 24))
         self.failUnlessEqual(sorted(self.added), self.Frange(24))
 
+    def test_batch(self):
+        self.lib1.add(self.Frange(5))
+        del self.added[:]
+        del self.added_1[:]
+
+        with self.librarian.batch():
+            self.lib1.add(self.Frange(5, 10))
+            with self.librarian.batch():
+                self.lib2.add(self.Frange(10, 15))
+            self.lib1.changed(self.Frange(3))
+            self.lib1.remove(self.Frange(2) + self.Frange(9, 10))
+            self.lib1.changed(self.Frange(6))
+            self.failIf(self.added or self.added_1 or self.added_2)
+            self.failIf(self.changed or self.removed)
+
+        self.failUnlessEqual(sorted(self.added_1), self.Frange(5, 9))
+        self.failUnlessEqual(sorted(self.added_2), self.Frange(10, 15))
+        self.failUnlessEqual(sorted(self.added), self.Frange(5, 9) +
+                             self.Frange(10, 15))
+        self.failUnlessEqual(sorted(self.removed_1), self.Frange(2))
+        self.failUnlessEqual(sorted(self.changed_1), self.Frange(2, 5))
+        self.failUnlessEqual(sorted(self.changed), self.Frange(2, 5))
+
+    def test_batch_changed_after_removed(self):
+        self.lib1.add(self.Frange(5))
+
+        with self.librarian.batch():
+            self.lib1.remove(self.Frange(2))
+            self.lib1.emit("changed", set(self.Frange(3)))
+
+        self.failUnlessEqual(sorted(self.removed_1), self.Frange(2))
+        self.failUnlessEqual(sorted(self.changed_1), self.Frange(2, 3))
+        self.failUnlessEqual(sorted(self.changed), self.Frange(2, 3))
+
     def test_removed(self):
         self.lib1.add(self.Frange(12))
         self.lib2.add(self.Frange(12, 24))
@@ -20,7 +20,8 @@ from tests import TestCase, get_data_path, mkstemp, mkdtemp, skipIf
 from .helper import capture_output, get_temp_copy
 
 from quodlibet.library.libraries import Library, PicklingMixin, SongLibrary, \
-    FileLibrary, AlbumLibrary, SongFileLibrary, iter_paths
+    FileLibrary, AlbumLibrary, SongFileLibrary, iter_paths, _walk_jobs
+from quodlibet.query import Query
 
 
 class Fake(int):
@@ -313,6 +314,33 @@ class TPicklingMixin(TestCase):
         finally:
             os.unlink(filename)
 
+    def test_save_journal(self):
+        fd, filename = mkstemp()
+        os.close(fd)
+        os.unlink(filename)
+        try:
+            self.library.load(filename)
+            self.library.add(self.Frange(10))
+            self.library.save()
+            assert os.path.exists(filename)
+
+            # changes after the first full save only go to the journal
+            item = self.library[fsnative(u"3")]
+            item["title"] = u"changed"
+            del self.library._contents[fsnative(u"5")]
+            self.library._journal_note([fsnative(u"3"), fsnative(u"5")])
+            self.library.save()
+            assert os.path.exists(self.library._journal.path)
+
+            library = self.Library()
+            library.load(filename)
+            assert len(library) == 9
+            assert fsnative(u"5") not in library
+            assert library[fsnative(u"3")]("title") == u"changed"
+        finally:
+            self.library._journal.clear()
+            os.unlink(filename)
+
 
 class TSongLibrary(TLibrary):
     Fake = FakeSong
@@ -339,6 +367,58 @@ class TSongLibrary(TLibrary):
         self.failUnless(song.key in self.library)
         self.failUnlessEqual(song.key, 20)
 
+    def test_query_index(self):
+        songs = ASrange(12)
+        self.library.add(songs)
+        self.assertEqual(
+            set(self.library.query(u'album="album 1"')), set(songs[::3]))
+
+        songs[0]["album"] = u"Album 2"
+        self.library.changed([songs[0]])
+        self.assertEqual(
+            set(self.library.query(u'album="album 1"')), set(songs[3::3]))
+        self.assertTrue(songs[0] in self.library.query(u'album="album 2"'))
+
+        self.library.remove([songs[1]])
+        self.assertFalse(songs[1] in self.library.query(u'album="album 2"'))
+
+    def test_query_refine(self):
+        songs = ASrange(12)
+        self.library.add(songs)
+        self.assertEqual(len(self.library.query(u"song 1")), 4)
+        self.assertEqual(len(self.library._query_results), 1)
+        self.assertEqual(
+            set(self.library.query(u"song 11")), set([songs[10]]))
+        self.assertEqual(len(self.library._query_results), 2)
+
+        # the cached result is a copy
+        self.library.query(u"song 1").append(None)
+        self.assertEqual(len(self.library.query(u"song 1")), 4)
+
+        songs[0]["title"] = u"Song 11"
+        self.library.changed([songs[0]])
+        self.assertFalse(self.library._query_results)
+        self.assertEqual(
+            set(self.library.query(u"song 11")), set(songs[:11:10]))
+
+        for i in range(self.library.QUERY_CACHE_SIZE + 2):
+            self.library.query(u"song %d" % i)
+        self.assertEqual(
+            len(self.library._query_results), self.library.QUERY_CACHE_SIZE)
+
+    def test_query_plan(self):
+        songs = ASrange(12)
+        self.library.add(songs)
+        query = Query(u'album="album 2"')
+        found = self.library.filter_query(query)
+        filter_ = self.library._query_plans[query]
+        self.assertEqual(self.library.filter_query(query), found)
+        self.assertTrue(self.library._query_plans[query] is filter_)
+        self.assertFalse("search" in query.__dict__)
+
+        self.library.changed([songs[0]])
+        self.assertFalse(self.library._query_plans)
+
     def test_rename_changed(self):
         song = self.Fake(10)
         self.library.add([song])
@@ -630,6 +710,26 @@ class TAlbumLibrary(TestCase):
         self.failUnlessEqual(album2.key, key)
         self.failUnlessEqual(len(album2.songs), 4)
 
+    def test_change_album(self):
+        song = self.underlying.get("file_1.mp3")
+        old = self.library[song.album_key]
+        song["labelid"] = "Album 2"
+        self.underlying.changed([song])
+        new = self.library[song.album_key]
+        self.failIf(song in old.songs)
+        self.failUnless(song in new.songs)
+        self.failUnlessEqual(len(old.songs), 3)
+        self.failUnlessEqual(len(new.songs), 5)
+
+        # moving the last song of an album removes it
+        other = AlbumSong(20, "Other")
+        self.underlying.add([other])
+        other_key = other.album_key
+        other["labelid"] = "Album 2"
+        self.underlying.changed([other])
+        self.failUnlessEqual(self.library.get(other_key), None)
+        self.failUnless(other in new.songs)
+
     def test_misc(self):
         # It shouldn't implement FileLibrary etc
         self.failIf(getattr(self.library, "filename", None))
@@ -684,6 +784,17 @@ class TAlbumLibrarySignals(TestCase):
         self.failUnlessEqual(self.received,
             ["added", "a_added", "changed", "a_changed"])
 
+    def test_change_swap(self):
+        # the emptied album gets filled again in the same go
+        songs = [AlbumSong(1, "a1"), AlbumSong(2, "a2")]
+        self.lib.add(songs)
+        songs[0]["labelid"] = "a2"
+        songs[1]["labelid"] = "a1"
+        del self.received[:]
+        self.lib.changed(songs)
+        self.failUnlessEqual(self.received, ["changed", "a_changed"])
+        self.failUnlessEqual(len(self.albums.values()), 2)
+
     def tearDown(self):
         for s in self._asigs:
             self.albums.disconnect(s)
@@ -758,3 +869,27 @@ class Titer_paths(TestCase):
         os.close(fd)
 
         assert list(iter_paths(self.root)) == []
+
+    def test_not_recursive(self):
+        child = mkdtemp(dir=self.root)
+        fd, name = mkstemp(dir=self.root)
+        os.close(fd)
+        fd, child_name = mkstemp(dir=child)
+        os.close(fd)
+
+        assert list(iter_paths(self.root, recursive=False)) == [name]
+        assert sorted(iter_paths(self.root)) == sorted([name, child_name])
+
+    def test_walk_jobs(self):
+        child = mkdtemp(dir=self.root)
+        hidden = mkdtemp(dir=self.root, prefix=".")
+        for path in [self.root, child, hidden]:
+            fd, name = mkstemp(dir=path)
+            os.close(fd)
+        if not is_windows():
+            os.symlink(child, os.path.join(self.root, "foo"))
+
+        found = []
+        for path, recursive in _walk_jobs(self.root):
+            found.extend(iter_paths(path, recursive=recursive))
+        assert sorted(found) == sorted(iter_paths(self.root))
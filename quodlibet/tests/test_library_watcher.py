@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import os
+import shutil
+
+from gi.repository import Gio
+from senf import fsnative
+
+from tests import TestCase, mkdtemp, get_data_path
+
+from quodlibet.library import SongFileLibrary
+from quodlibet.library.watcher import LibraryWatcher
+
+
+class TLibraryWatcher(TestCase):
+
+    def setUp(self):
+        self.root = os.path.realpath(mkdtemp())
+        self.sub = os.path.join(self.root, fsnative(u"sub"))
+        os.mkdir(self.sub)
+        self.library = SongFileLibrary()
+        self.watcher = LibraryWatcher(self.library, [self.root])
+
+    def tearDown(self):
+        self.watcher.destroy()
+        self.library.destroy()
+        shutil.rmtree(self.root)
+
+    def _event(self, path, event_type):
+        self.watcher._changed(
+            None, Gio.File.new_for_path(path), None, event_type)
+
+    def _process(self):
+        for step in self.watcher._update():
+            pass
+
+    def _add_file(self, name):
+        path = os.path.join(self.sub, fsnative(name))
+        shutil.copy(get_data_path("silence-44-s.flac"), path)
+        self._event(path, Gio.FileMonitorEvent.CREATED)
+        return path
+
+    def test_watch(self):
+        list(self.watcher._watch_trees([self.root]))
+        self.assertEqual(self.watcher.watch_count, 2)
+        self.watcher.MAX_WATCHES = 1
+        self.watcher.destroy()
+        list(self.watcher._watch_trees([self.root]))
+        self.assertEqual(self.watcher.watch_count, 1)
+
+    def test_add_remove(self):
+        path = self._add_file(u"a.flac")
+        self._process()
+        self.assertTrue(self.library.contains_filename(path))
+
+        os.remove(path)
+        self._event(path, Gio.FileMonitorEvent.DELETED)
+        self._process()
+        self.assertFalse(self.library.contains_filename(path))
+
+    def test_remove_dir(self):
+        path = self._add_file(u"a.flac")
+        self._process()
+        shutil.rmtree(self.sub)
+        self._event(self.sub, Gio.FileMonitorEvent.DELETED)
+        self._process()
+        self.assertFalse(self.library.contains_filename(path))
+
+    def test_many_changes(self):
+        self.watcher.MAX_PENDING = 1
+        self._add_file(u"a.flac")
+        self._add_file(u"b.flac")
+        self.assertEqual(self.watcher._pending_dirs, set([self.sub]))
+        self.assertFalse(self.watcher._pending_files)
+
+    def test_changed_dir(self):
+        path = self._add_file(u"a.flac")
+        self._process()
+        song = self.library.get_filename(path)
+        os.remove(path)
+        self.watcher._pending_dirs.add(self.sub)
+        self._process()
+        self.assertFalse(song in self.library)
+        self.assertFalse(self.watcher._updating)
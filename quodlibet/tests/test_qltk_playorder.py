@@ -63,6 +63,30 @@ class TPlayOrderWidget(TestCase):
         self.assertEqual(self.po.shuffler, OrderWeighted)
         self.failUnlessEqual(type(self.po.order), OrderWeighted)
 
+    def test_plugin_order_loaded_later(self):
+        quodlibet.config.set("memory", "shuffle", True)
+        quodlibet.config.set("memory", "shuffle_mode", "fake_shuffle")
+        self.po.destroy()
+        self.po = PlayOrderWidget(self, self)
+        self.assertEqual(self.po.shuffler, OrderShuffle)
+
+        orders = self.po._shuffle_orders
+        orders.append(FakeShuffle)
+        try:
+            self.assertEqual(self.po.shuffler, FakeShuffle)
+            self.assertTrue(isinstance(self.order, FakeShuffle))
+            self.assertEqual(
+                quodlibet.config.get("memory", "shuffle_mode"),
+                "fake_shuffle")
+        finally:
+            orders.remove(FakeShuffle)
+        self.assertEqual(self.po.shuffler, OrderShuffle)
+        self.assertTrue(isinstance(self.order, OrderShuffle))
+
+
+class FakeShuffle(OrderShuffle):
+    name = "fake_shuffle"
+
 
 class FakeOrder(Order):
     name = "fake"
@@ -169,6 +169,39 @@ class TSongList(TestCase):
 
         self.assertEqual(self.songlist.get_songs(), [song] * 4)
 
+    def test_add_songs_sorted(self):
+        songs = [AudioFile({"~filename": "/dev/null", "foo": v})
+                 for v in ["b", "d", "a", "c", "b", "e"]]
+        self.songlist.set_column_headers(["foo"])
+        self.songlist.toggle_column_sort(self.songlist.get_columns()[0])
+        self.songlist.set_songs(songs[:2])
+        self.songlist.add_songs(songs[2:])
+        self.assertEqual(
+            self.songlist.get_songs(),
+            [songs[2], songs[0], songs[4], songs[3], songs[1], songs[5]])
+
+        self.songlist.toggle_column_sort(self.songlist.get_columns()[0])
+        self.songlist.set_songs(songs[:2])
+        self.songlist.add_songs(songs[2:])
+        self.assertEqual(
+            self.songlist.get_songs(),
+            [songs[5], songs[1], songs[3], songs[0], songs[4], songs[2]])
+
+    def test_resort(self):
+        songs = [AudioFile({"~filename": "/dev/null", "foo": v})
+                 for v in ["b", "a", "c"]]
+        self.songlist.set_column_headers(["foo"])
+        self.songlist.toggle_column_sort(self.songlist.get_columns()[0])
+        self.songlist.set_songs(songs)
+        self.assertEqual(
+            self.songlist.get_songs(), [songs[1], songs[0], songs[2]])
+        self.songlist.get_selection().select_path(Gtk.TreePath((2,)))
+
+        self.songlist.toggle_column_sort(self.songlist.get_columns()[0])
+        self.assertEqual(
+            self.songlist.get_songs(), [songs[2], songs[0], songs[1]])
+        self.assertEqual(self.songlist.get_selected_songs(), [songs[2]])
+
     def test_header_menu(self):
         from quodlibet import browsers
         from quodlibet.library import SongLibrary, SongLibrarian
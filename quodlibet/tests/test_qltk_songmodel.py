@@ -98,6 +98,23 @@ class TPlaylistModel(TestCase):
         iters = self.pl.find_all(to_find)
         self.failUnlessEqual(iters, [])
 
+    def test_find_after_changes(self):
+        self.pl.remove(self.pl.find(3))
+        self.assertIs(self.pl.find(3), None)
+        self.pl.insert(0, [7])
+        self.assertEqual(self.pl.get_path(self.pl.find(7)).get_indices(), [0])
+        self.assertEqual(
+            [self.pl.get_path(i).get_indices()[0]
+             for i in self.pl.find_all([7])], [0, 7])
+        self.pl.set_value(self.pl.find(5), 0, 42)
+        self.assertIs(self.pl.find(5), None)
+        self.assertEqual(self.pl[self.pl.find(42)][0], 42)
+        self.pl.reorder(list(reversed(range(len(self.pl)))))
+        self.assertEqual(
+            [self.pl[i][0] for i in self.pl.find_all([7, 9])], [9, 7, 7])
+        self.pl.clear()
+        self.assertFalse(7 in self.pl)
+
     def test_contains(self):
         self.failUnless(1 in self.pl)
         self.failUnless(8 in self.pl)
@@ -185,6 +185,85 @@ class TQuery(TestCase):
         assert not Query("album=.").search(self.s2)
         assert Query("album=/./").search(self.s2)
 
+    def test_compiled_same_as_tree(self):
+        songs = [self.s1, self.s2, self.s3, self.s4, self.s5]
+        for text in [u"album=foo", u"album!=foo", u"piman", u"!mu",
+                     u"&(artist=piman, title=/x/)", u"|(mu, ~filename=dir2)",
+                     u"~people=/^mu$/",
+                     u"#(playcount > 10)", u"|(#(length > 200), artist=mu)",
+                     u"!&(artist=piman, !title=quux)", u"", u"ångström",
+                     u"filename=foo", u"mountpoint=bla", u"t=|(quux, out)",
+                     u"&(|(), artist=mu)", u"a=&()"]:
+            query = Query(text)
+            for song in songs:
+                self.assertEqual(
+                    query.search(song), bool(query._match.search(song)),
+                    msg="%r %r" % (text, song))
+            self.assertEqual(
+                query.filter(songs), query._match.filter(songs), msg=text)
+
+    def test_compile_folding(self):
+        self.assertTrue(match.compile_search(match.True_())(self.s1))
+        self.assertFalse(match.compile_search(match.False_())(self.s1))
+        node = match.Inter([match.True_(), match.Neg(match.False_())])
+        self.assertTrue(match.compile_search(node)(self.s1))
+        node = match.Union([match.False_(), match.Neg(match.True_())])
+        self.assertFalse(match.compile_search(node)(self.s1))
+
+    def test_optimize_order(self):
+        plan = Query(u"&(~filename=foo, #(playcount > 1), artist=bar)")
+        plan = plan._match._optimize(None)[0]
+        self.assertTrue(isinstance(plan.res[0], match.Numcmp))
+        self.assertTrue(isinstance(plan.res[1], match.Tag))
+        self.assertEqual(len(plan.res), 3)
+
+        # exact matches rule out more songs, so go first for "and"
+        # and last for "or"
+        plan = Query(u'&(artist=foo, artist="foo")')._match._optimize(None)[0]
+        self.assertEqual(plan.res[0].res.literal, (u"foo", True))
+        plan = Query(u'|(artist="foo", artist=foo)')._match._optimize(None)[0]
+        self.assertEqual(plan.res[1].res.literal, (u"foo", True))
+
+    def test_optimize_nested(self):
+        # every node gets planned once, deep nesting used to take forever
+        text = u"artist=foo"
+        for i in range(20):
+            text = u"&(|(%s, title=bar), album=baz)" % text
+        query = Query(text)
+        self.assertEqual(query._match._optimize(None)[1],
+                         query._match._estimate(None))
+        self.assertEqual(query.planned_filter(None)([self.s1]), [])
+        self.assertFalse(query.search(self.s1))
+
+    def test_explain(self):
+        query = Query(u"&(~people=foo, !#(playcount > 1))")
+        lines = query.explain().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith(u"Inter (cost="))
+        self.assertTrue(lines[1].startswith(u"  Neg"), msg=lines)
+        self.assertTrue(lines[2].startswith(u"    <Numcmp"))
+        self.assertTrue(lines[3].startswith(u"  <Tag"))
+
+    def test_is_refinement_of(self):
+        def check(old, new, star=None):
+            return Query(new, star).is_refinement_of(Query(old, star))
+
+        self.assertTrue(check(u"ba", u"bar"))
+        self.assertTrue(check(u"foo", u"foo"))
+        self.assertTrue(check(u"foo b", u"bar foo"))
+        self.assertTrue(check(u"oo", u"foo bar"))
+        self.assertFalse(check(u"foo bar", u"foo"))
+        self.assertFalse(check(u"foo", u"fo"))
+        self.assertFalse(check(u"artist=foo", u"artist=fooo"))
+        self.assertTrue(check(u"foo", u"fooo", [u"artist"]))
+        self.assertFalse(
+            Query(u"foo", [u"title"]).is_refinement_of(Query(u"f")))
+        # "ss" matches "\xdf", "s" doesn't
+        self.assertFalse(check(u"s", u"ss"))
+        self.assertFalse(check(u"fo", u"foo"))
+        self.assertTrue(check(u"ss", u"ssa"))
+        self.assertFalse(check(u"e", u"e\u0301"))
+
     def test_inequality(self):
         self.failUnless(Query("album!=foo").search(self.s1))
         self.failIf(Query("album!=foo").search(self.s2))
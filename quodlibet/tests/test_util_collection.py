@@ -8,7 +8,7 @@ import shutil
 import os
 from collections import defaultdict
 
-from senf import fsnative
+from senf import fsnative, fsn2bytes
 
 from quodlibet import config
 
@@ -243,6 +243,41 @@ class TAlbum(TestCase):
         for p in NUMERIC_ZERO_DEFAULT:
             failUnlessEq(album(p, "x"), song(p, "x"))
 
+    def test_update(self):
+        songs = [Fakesong(dict(s)) for s in NUMERIC_SONGS]
+        album = Album(songs[0])
+        album.songs = set(songs[:2])
+        self.assertEqual(album("~#length"), 11)
+        self.assertEqual(album("~#lastplayed"), 88)
+        self.assertEqual(album.comma("~people"), "")
+
+        album.songs.add(songs[2])
+        album.update(added=[songs[2]])
+        self.assertEqual(album("~#length"), 12)
+        self.assertEqual(album("~#length:min"), 1)
+
+        songs[1]["~#lastplayed"] = 2
+        songs[1]["artist"] = "foo"
+        album.update(changed=[songs[1]])
+        self.assertEqual(album("~#lastplayed"), 43)
+        self.assertEqual(album.comma("~people"), "foo")
+
+        album.songs.remove(songs[2])
+        album.update(removed=[songs[2]])
+        self.assertEqual(album("~#length"), 11)
+        self.assertEqual(album("~#lastplayed"), 2)
+        self.assertAlmostEqual(album("~#rating:avg"), 0.2)
+
+        # the default rating isn't fixed
+        del songs[0]["~#rating"]
+        album.update(changed=[songs[0]])
+        config.RATINGS.default = 0.7
+        try:
+            self.assertAlmostEqual(album("~#rating:avg"), 0.5)
+            self.assertEqual(album("~#rating:max"), 0.7)
+        finally:
+            config.RATINGS.default = 0.5
+
     def test_methods(s):
         songs = [
             Fakesong({"b": "bb4\nbb1\nbb1", "c": "cc1\ncc3\ncc3"}),
@@ -479,6 +514,29 @@ class TPlaylist(TestCase):
                 playlists = Playlist.playlists_featuring(NUMERIC_SONGS[0])
                 s.failUnlessEqual(set(playlists), {pl, pl2})
 
+    def test_playlists_featuring_changes(self):
+        song, other = NUMERIC_SONGS[:2]
+        featuring = Playlist.playlists_featuring
+        with self.wrap("b") as pl:
+            with self.wrap("a") as pl2:
+                pl.extend([song, song, other])
+                pl2.append(song)
+                self.failUnlessEqual(featuring(song), [pl2, pl])
+
+                pl.remove_songs([song], leave_dupes=True)
+                self.failUnlessEqual(featuring(song), [pl2, pl])
+                pl.remove_songs([song])
+                self.failUnlessEqual(featuring(song), [pl2])
+
+                pl[0] = song
+                self.failUnlessEqual(featuring(song), [pl2, pl])
+                self.failUnlessEqual(featuring(other), [])
+
+                pl2.clear()
+                self.failUnlessEqual(featuring(song), [pl])
+            pl.delete()
+            self.failUnlessEqual(featuring(song), [])
+
     def test_playlists_tag(self):
         # Arguably belongs in _audio
         songs = NUMERIC_SONGS
@@ -564,6 +622,69 @@ class TFileBackedPlaylist(TPlaylist):
                 self.assertEqual(len(h.read().splitlines()),
                                  len(NUMERIC_SONGS) + 1)
 
+    def test_write_changes_only(self):
+        def lines():
+            with open(pl.filename, "rb") as h:
+                return h.read().splitlines()
+
+        with self.wrap("playlist") as pl:
+            pl.extend(NUMERIC_SONGS[:2])
+            pl.write()
+            with open(pl.filename, "wb") as h:
+                h.write(b"foo\nbar\n")
+
+            # nothing changed
+            pl.write()
+            self.assertEqual(lines(), [b"foo", b"bar"])
+
+            # only appended
+            pl.append(NUMERIC_SONGS[2])
+            pl.write()
+            self.assertEqual(lines()[:2], [b"foo", b"bar"])
+            self.assertEqual(len(lines()), 3)
+
+            # the rest gets rewritten
+            pl.remove_songs([NUMERIC_SONGS[0]])
+            pl.write()
+            self.assertEqual(
+                lines(), [fsn2bytes(s("~filename"), "utf-8")
+                          for s in NUMERIC_SONGS[1:]])
+
+    def test_write_songs_changed(self):
+        song = Fakesong({"~filename": fsnative(u"/old")})
+        with self.wrap("playlist") as pl:
+            pl.extend([song])
+            pl.write()
+            # other changes don't need a write
+            song["artist"] = u"foo"
+            pl.songs_changed([song])
+            self.assertTrue(pl._list.dirty_from is None)
+
+            song["~filename"] = fsnative(u"/new")
+            pl.songs_changed([song])
+            pl.write()
+            with open(pl.filename, "rb") as h:
+                self.assertEqual(h.read().splitlines(), [b"/new"])
+
+    def test_read_not_dirty(self):
+        with self.wrap("playlist") as pl:
+            pl.extend(NUMERIC_SONGS)
+            pl.write()
+            self.assertTrue(pl._list.dirty_from is None)
+
+            lib = FileLibrary("foobar")
+            lib.add(NUMERIC_SONGS)
+            pl2 = self.pl("playlist", lib)
+            self.assertTrue(pl2._list.dirty_from is None)
+            pl2[1] = NUMERIC_SONGS[2]
+            self.assertEqual(pl2._list.dirty_from, 1)
+            pl2.clear()
+
+            lib.remove(NUMERIC_SONGS[:1])
+            with self.wrap("playlist", lib) as pl2:
+                # not all lines got loaded, so the file has to be rewritten
+                self.assertEqual(pl2._list.dirty_from, 0)
+
     def test_make_dup(self):
         p1 = FileBackedPlaylist.new(self.temp, "Does not exist")
         p2 = FileBackedPlaylist.new(self.temp, "Does not exist")
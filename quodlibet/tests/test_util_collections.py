@@ -131,6 +131,13 @@ class THashedList(TestCase):
         new = [a for a in l]
         self.failUnlessEqual(new, [1, 2, 3, 3])
 
+    def test_count(self):
+        l = HashedList([1, 2, 3, 3])
+        self.failUnlessEqual(l.count(3), 2)
+        self.failUnlessEqual(l.count(4), 0)
+        l.remove(3)
+        self.failUnlessEqual(l.count(3), 1)
+
     def test_del_slice(self):
         l = HashedList([1, 2, 3, 3])
         del l[1:3]
@@ -5,14 +5,21 @@
 # published by the Free Software Foundation.
 
 import glob
+import io
 import os
 import shutil
 
+from gi.repository import Gtk
 from senf import fsnative, bytes2fsn
 
-from quodlibet.formats import AudioFile
+from quodlibet import config
+from quodlibet.formats import AudioFile, EmbeddedImage
+from quodlibet.util.cover.embedcache import EmbeddedImageCache
+from quodlibet.util.cover.loader import CoverLoader
 from quodlibet.util.cover.manager import CoverManager
+from quodlibet.util.cover.surfacecache import SurfaceCache
 from quodlibet.util.path import normalize_path, path_equal
+from quodlibet.util.thread import Cancellable, Priority
 from quodlibet.compat import text_type
 
 from tests import TestCase, mkdtemp
@@ -154,7 +161,208 @@ class TCoverManager(TestCase):
             assert path_equal(
                 actual, f, "\"%s\" should trump \"%s\"" % (f, actual))
 
+    def test_cache(self):
+        cache_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        filename = os.path.join(cache_dir, "cache")
+        manager = CoverManager(cache_filename=filename)
+        f = self.add_file("cover.jpg")
+        old = 1000000000
+        os.utime(self.dir, (old, old))
+        self.assertTrue(path_equal(manager.get_cover(self.song).name, f))
+
+        # unchanged directories don't get looked at again
+        f2 = self.add_file("front_folder_cover.jpg")
+        os.utime(self.dir, (old, old))
+        self.assertTrue(path_equal(manager.get_cover(self.song).name, f))
+        manager.save()
+        manager = CoverManager(cache_filename=filename)
+        self.assertTrue(path_equal(manager.get_cover(self.song).name, f))
+
+        manager.cover_changed([self.song])
+        self.assertTrue(path_equal(manager.get_cover(self.song).name, f2))
+
+        # changed ones do
+        os.remove(f2)
+        self.assertTrue(path_equal(manager.get_cover(self.song).name, f))
+
+    def test_cache_settings(self):
+        cache_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        manager = CoverManager(cache_filename=os.path.join(cache_dir, "c"))
+        f = self.add_file("cover.jpg")
+        f2 = self.add_file("other.jpg")
+        old = 1000000000
+        os.utime(self.dir, (old, old))
+        self.assertTrue(path_equal(manager.get_cover(self.song).name, f))
+
+        config.set("albumart", "force_filename", True)
+        config.set("albumart", "filename", "other.jpg")
+        self.addCleanup(config.reset, "albumart", "force_filename")
+        self.addCleanup(config.reset, "albumart", "filename")
+        self.assertTrue(path_equal(manager.get_cover(self.song).name, f2))
+
     def test_get_thumbnail(self):
         self.assertTrue(self.manager.get_pixbuf(self.song, 10, 10) is None)
         self.assertTrue(
             self.manager.get_pixbuf_many([self.song], 10, 10) is None)
+
+
+class _Pool(object):
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, func):
+        self.jobs.append(func)
+
+
+class TCoverLoader(TestCase):
+
+    def setUp(self):
+        self.loaded = []
+        self.loader = CoverLoader(self)
+        self.loader._pool = self.pool = _Pool()
+
+    def get_pixbuf_many(self, songs, width, height):
+        self.loaded.append(songs[0])
+        return songs[0]
+
+    def _run(self):
+        jobs, self.pool.jobs = self.pool.jobs, []
+        for job in jobs:
+            job()
+        while Gtk.events_pending():
+            Gtk.main_iteration()
+
+    def test_order(self):
+        results = []
+        cancel = Cancellable()
+        load = self.loader.load
+        load("a", ["a"], 10, 10, None, results.append, Priority.BACKGROUND)
+        load("b", ["b"], 10, 10, None, results.append, Priority.BACKGROUND)
+        load("c", ["c"], 10, 10, None, results.append)
+        load("c", ["c"], 10, 10, None, results.append)
+        load("d", ["d"], 10, 10, cancel, results.append)
+        load("b", ["b"], 10, 10, None, results.append)
+        cancel.cancel()
+        self._run()
+        self.assertEqual(self.loaded, ["c", "b", "a"])
+        self.assertEqual(results, ["c", "c", "b", "b", "a"])
+
+    def test_load_again(self):
+        results = []
+        self.loader.load("a", ["a"], 10, 10, None, results.append)
+        self._run()
+        self.loader.load("a", ["a"], 10, 10, None, results.append)
+        self.loader.load("a", ["a"], 20, 20, None, results.append)
+        self._run()
+        self.assertEqual(self.loaded, ["a", "a", "a"])
+        self.assertEqual(results, ["a", "a", "a"])
+
+
+class TSurfaceCache(TestCase):
+
+    def test_lru(self):
+        cache = SurfaceCache(max_bytes=30)
+        cache.put("a", 1, "a1", 10)
+        cache.put("a", 2, "a2", 10)
+        cache.put("b", 1, "b1", 10)
+        self.assertEqual(cache.get("a", 1), "a1")
+        cache.put("c", 1, "c1", 10)
+        self.assertEqual(cache.get("a", 2), None)
+        self.assertEqual(cache.get("a", 1), "a1")
+        self.assertEqual(cache.get("b", 1), "b1")
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.nbytes, 30)
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+        self.assertEqual(cache.hit_rate, 0.75)
+
+        cache.put("d", 1, "d1", 31)
+        self.assertEqual(cache.get("d", 1), None)
+        self.assertEqual(len(cache), 3)
+
+    def test_invalidate(self):
+        cache = SurfaceCache()
+        cache.put("a", 1, "a1", 10)
+        cache.put("a", 2, "a2", 10)
+        cache.put("b", 1, "b1", 10)
+        cache.invalidate(["a", "c"])
+        self.assertEqual(cache.get("a", 1), None)
+        self.assertEqual(cache.get("a", 2), None)
+        self.assertEqual(cache.get("b", 1), "b1")
+        self.assertEqual(cache.nbytes, 10)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.nbytes, 0)
+
+
+class _ImageSong(AudioFile):
+
+    reads = 0
+    data = b"image"
+
+    def get_primary_image(self):
+        self.reads += 1
+        return EmbeddedImage(io.BytesIO(self.data), "image/png")
+
+
+class TEmbeddedImageCache(TestCase):
+
+    def setUp(self):
+        self.dir = mkdtemp()
+        self.cache_dir = os.path.join(self.dir, "cache")
+        self.songs = []
+        for name in ["a.flac", "b.flac"]:
+            filename = os.path.join(self.dir, name)
+            open(filename, "wb").close()
+            song = _ImageSong({"~filename": filename, "~picture": "y"})
+            self.songs.append(song)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_extract(self):
+        a, b = self.songs
+        cache = EmbeddedImageCache(self.cache_dir)
+        self.assertIsNone(cache.lookup(a))
+        path = cache.extract(a)
+        with open(path, "rb") as h:
+            self.assertEqual(h.read(), b"image")
+        self.assertEqual(cache.extract(a), path)
+        self.assertEqual(a.reads, 1)
+
+        # the same image gets shared
+        self.assertEqual(cache.extract(b), path)
+        cache.save()
+        cache = EmbeddedImageCache(self.cache_dir)
+        self.assertEqual(cache.lookup(b), path)
+
+        # changed songs get read again
+        os.utime(b("~filename"), (1000000000, 1000000000))
+        b.data = b"other"
+        self.assertIsNone(cache.lookup(b))
+        other = cache.extract(b)
+        self.assertNotEqual(other, path)
+        self.assertEqual(b.reads, 2)
+
+        cache.invalidate(a)
+        cache.prune()
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(other))
+
+    def test_extract_many(self):
+        cache = EmbeddedImageCache(self.cache_dir)
+        for value in cache.extract_many(self.songs + [bar_2_1]):
+            pass
+        self.assertEqual([s.reads for s in self.songs], [1, 1])
+        self.assertTrue(
+            os.path.exists(os.path.join(self.cache_dir, cache.INDEX_NAME)))
+
+        # songs gone from the library lose their images
+        path = cache.lookup(self.songs[0])
+        self.assertTrue(os.path.exists(path))
+        for value in cache.extract_many([bar_2_1]):
+            pass
+        self.assertIsNone(cache.lookup(self.songs[0]))
+        self.assertFalse(os.path.exists(path))
@@ -7,12 +7,17 @@
 # (at your option) any later version.
 
 import os
+import shutil
+from tempfile import mkdtemp
 
 from senf import fsnative, expanduser
 
 from quodlibet import config
+from quodlibet.util import library as library_utils
 from quodlibet.util.library import split_scan_dirs, set_scan_dirs, \
-    get_exclude_dirs, get_scan_dirs
+    get_exclude_dirs, get_scan_dirs, update_library_watcher, \
+    stop_library_watcher
+from quodlibet.library import SongFileLibrary
 from quodlibet.util import is_windows
 from quodlibet.util.path import get_home_dir, unexpand
 
@@ -81,3 +86,32 @@ class Tset_scan_dirs(TestCase):
         set_scan_dirs([STANDARD_PATH, GVFS_PATH])
         expected = GVFS_PATH if is_windows() else GVFS_PATH_ESCAPED
         self.assertEqual(self.scan_dirs, "%s:%s" % (STANDARD_PATH, expected))
+
+
+class Tlibrary_watcher(TestCase):
+
+    def setUp(self):
+        self.root = os.path.realpath(mkdtemp())
+        set_scan_dirs([self.root])
+        self.library = SongFileLibrary()
+
+    def tearDown(self):
+        stop_library_watcher()
+        self.library.destroy()
+        shutil.rmtree(self.root)
+        config.reset("settings", "scan")
+        config.reset("library", "watch")
+
+    def test_start_stop(self):
+        config.set("library", "watch", True)
+        update_library_watcher(self.library)
+        watcher = library_utils._watcher
+        self.assertTrue(watcher is not None)
+        update_library_watcher(self.library)
+        self.assertFalse(library_utils._watcher is watcher)
+        stop_library_watcher()
+        self.assertTrue(library_utils._watcher is None)
+
+        config.set("library", "watch", False)
+        update_library_watcher(self.library)
+        self.assertTrue(library_utils._watcher is None)
@@ -136,6 +136,8 @@ class TModuleScanner(TestCase):
         self.failUnlessEqual(set(added), {"q1", "q2"})
         self.failUnlessEqual(len(s.modules), 2)
         self.failUnlessEqual(len(s.failures), 0)
+        self.assertTrue(s.modules["q1"].load_time >= 0)
+        self.assertTrue(s.modules["q1"].load_start > 0)
 
     def test_unimportable_package(self):
         self._create_pkg("_foobar").close()
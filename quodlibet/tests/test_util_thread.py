@@ -9,11 +9,12 @@
 import threading
 
 from tests import TestCase
+from .helper import capture_output
 
 from gi.repository import Gtk
 
 from quodlibet.util.thread import call_async, call_async_background, \
-    Cancellable, terminate_all
+    Cancellable, terminate_all, iter_parallel
 
 
 class Tcall_async(TestCase):
@@ -62,3 +63,36 @@ class Tcall_async(TestCase):
 
     def test_terminate_all(self):
         terminate_all()
+
+
+class Titer_parallel(TestCase):
+
+    def test_main(self):
+        results = []
+        for done in iter_parallel(lambda i: i * 2, range(100), max_pending=5):
+            results.extend(done)
+        self.assertEqual(sorted(results), [(i, i * 2) for i in range(100)])
+
+    def test_error(self):
+        def func(i):
+            if i == 3:
+                raise ValueError
+            return i
+
+        results = []
+        with capture_output():
+            for done in iter_parallel(func, range(5)):
+                results.extend(done)
+        self.assertEqual(sorted(r[0] for r in results), [0, 1, 2, 4])
+
+    def test_close(self):
+        started = []
+
+        def func(i):
+            started.append(i)
+            return i
+
+        gen = iter_parallel(func, range(1000), max_pending=2)
+        next(gen)
+        gen.close()
+        self.assertTrue(len(started) < 10)
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+from tests import TestCase
+
+from quodlibet.util.timeline import Timeline
+
+
+class TTimeline(TestCase):
+
+    def test_main(self):
+        timeline = Timeline()
+        timeline.mark("first")
+        timeline.add("inner", timeline.start, 0.5)
+        timeline.mark("second")
+        names = [e[0] for e in timeline.entries]
+        self.assertEqual(names, ["first", "inner", "second"])
+        first, inner, second = timeline.entries
+        self.assertEqual(first[1], 0)
+        self.assertEqual(inner[1:], (0, 0.5))
+        self.assertEqual(second[1], first[2])
+        self.assertAlmostEqual(timeline.total, first[2] + second[2])
+
+        text = timeline.format()
+        self.assertTrue("inner" in text)
+        self.assertTrue("total" in text)